@@ -0,0 +1,233 @@
+# benchmarks/load_test.py
+"""
+End-to-end load test for the real FastAPI app (src/api/app.py) against local upstream stubs.
+
+By default this starts two subprocesses:
+  - benchmarks.stub_server (fake OpenAI embeddings/responses + Pinecone query)
+  - uvicorn src.api.app:app, pointed at the stub via OPENAI_BASE_URL / PINECONE_INDEX_HOST
+then drives POST /rag with a closed-loop client at each concurrency level and reports
+throughput, latency percentiles and error rates.
+
+  python -m benchmarks.load_test --concurrency 1,4,16,64 --duration 15 --workers 2 \
+      --llm-latency 800:4000 --llm-errors 0.01 --out bench/load.json
+
+Use --target http://host:port to hit an already running app instead (no subprocesses).
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import List, Dict, Any
+
+import click
+import httpx
+
+from benchmarks.retrieval_bench import synthetic_corpus, percentiles
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url: str, timeout_s: float = 60.0):
+    deadline = time.time() + timeout_s
+    last = None
+    while time.time() < deadline:
+        try:
+            r = httpx.get(url, timeout=2.0)
+            if r.status_code < 500:
+                return
+        except Exception as e:
+            last = e
+        time.sleep(0.25)
+    raise SystemExit(f"[load] {url} did not come up within {timeout_s}s ({last})")
+
+
+def make_questions(chunks_path: Path, n: int, seed: int = 11) -> List[str]:
+    """Pseudo-questions: short word windows sampled from random chunks."""
+    rng = random.Random(seed)
+    texts = []
+    with chunks_path.open(encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                texts.append(json.loads(line)["text"])
+    out = []
+    for _ in range(n):
+        words = rng.choice(texts).split()
+        start = rng.randrange(max(1, len(words) - 8))
+        out.append(" ".join(words[start:start + 8]))
+    return out
+
+
+async def run_step(
+    base_url: str,
+    endpoint: str,
+    payload_base: Dict[str, Any],
+    questions: List[str],
+    concurrency: int,
+    duration_s: float,
+    warmup_s: float,
+    timeout_s: float,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    total = 0
+    rng = random.Random(concurrency)
+    t_start = time.perf_counter()
+    measure_from = t_start + warmup_s
+    stop_at = measure_from + duration_s
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout_s, limits=limits) as client:
+        async def worker():
+            nonlocal errors, total
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                payload = dict(payload_base, question=rng.choice(questions))
+                s = time.perf_counter()
+                try:
+                    r = await client.post(endpoint, json=payload)
+                    status = str(r.status_code)
+                    ok = r.status_code == 200
+                except Exception as e:
+                    status = type(e).__name__
+                    ok = False
+                elapsed = time.perf_counter() - s
+                if s < measure_from:
+                    continue
+                total += 1
+                statuses[status] = statuses.get(status, 0) + 1
+                if ok:
+                    latencies.append(elapsed * 1000.0)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    window = max(1e-9, time.perf_counter() - measure_from)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": total - errors,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round((total - errors) / window, 2),
+        "latency_ms": percentiles(latencies) | {"max": round(max(latencies), 2) if latencies else 0.0},
+        "status_counts": statuses,
+    }
+
+
+def _print_table(steps: List[Dict[str, Any]]):
+    print(f"{'conc':>5} {'reqs':>7} {'rps':>8} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'err%':>6}")
+    for s in steps:
+        lat = s["latency_ms"]
+        print(f"{s['concurrency']:>5} {s['requests']:>7} {s['throughput_rps']:>8.2f} {lat['p50']:>9.1f} "
+              f"{lat['p95']:>9.1f} {lat['p99']:>9.1f} {s['error_rate'] * 100:>5.1f}%")
+
+
+@click.command()
+@click.option("--target", default=None, help="Base URL of a running app; skips starting stub + app")
+@click.option("--chunks", "chunks_path", default=None, help="chunks.jsonl (default: synthetic corpus)")
+@click.option("--concurrency", default="1,2,4,8,16,32", help="Comma-separated concurrency ladder")
+@click.option("--duration", default=10.0, help="Measured seconds per concurrency step")
+@click.option("--warmup", default=2.0, help="Unmeasured seconds at the start of each step")
+@click.option("--timeout", default=60.0, help="Client timeout per request (s)")
+@click.option("--endpoint", default="/rag")
+@click.option("--payload", "payload_json", default="{}", help='Extra JSON fields for each request, e.g. \'{"reranker": "none"}\'')
+@click.option("--workers", default=1, help="uvicorn --workers for the app under test")
+@click.option("--embed-latency", default="40:200", help="stub <median_ms>[:<p99_ms>]")
+@click.option("--query-latency", default="30:120", help="stub <median_ms>[:<p99_ms>]")
+@click.option("--llm-latency", default="800:4000", help="stub <median_ms>[:<p99_ms>]")
+@click.option("--embed-errors", default=0.0)
+@click.option("--query-errors", default=0.0)
+@click.option("--llm-errors", default=0.0)
+@click.option("--error-status", default=500)
+@click.option("--out", "out_path", default=None, help="Write results JSON here")
+def main(target, chunks_path, concurrency, duration, warmup, timeout, endpoint, payload_json, workers,
+         embed_latency, query_latency, llm_latency, embed_errors, query_errors, llm_errors, error_status, out_path):
+    tmpdir = tempfile.TemporaryDirectory(prefix="rag-load-")
+    if chunks_path is None:
+        docs, _ = synthetic_corpus(num_chunks=500, num_queries=0)
+        p = Path(tmpdir.name) / "chunks.jsonl"
+        with p.open("w", encoding="utf-8") as fh:
+            for d in docs:
+                fh.write(json.dumps(d) + "\n")
+        chunks_path = str(p)
+    chunks_path = str(Path(chunks_path).resolve())
+
+    procs: List[subprocess.Popen] = []
+    try:
+        if target is None:
+            stub_port, app_port = _free_port(), _free_port()
+            procs.append(subprocess.Popen([
+                sys.executable, "-m", "benchmarks.stub_server", "--port", str(stub_port), "--chunks", chunks_path,
+                "--embed-latency", embed_latency, "--query-latency", query_latency, "--llm-latency", llm_latency,
+                "--embed-errors", str(embed_errors), "--query-errors", str(query_errors), "--llm-errors", str(llm_errors),
+                "--error-status", str(error_status),
+            ]))
+            _wait_http(f"http://127.0.0.1:{stub_port}/stub/stats")
+
+            env = dict(os.environ)
+            env.update({
+                "OPENAI_API_KEY": "stub",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{stub_port}/v1",
+                "PINECONE_API_KEY": "stub",
+                "PINECONE_INDEX_HOST": f"http://127.0.0.1:{stub_port}",
+            })
+            procs.append(subprocess.Popen([
+                sys.executable, "-m", "uvicorn", "src.api.app:app", "--host", "127.0.0.1", "--port", str(app_port),
+                "--workers", str(workers), "--log-level", "warning",
+            ], env=env))
+            target = f"http://127.0.0.1:{app_port}"
+            _wait_http(f"{target}/readyz")  # 503 until warm-up finishes
+
+        questions = make_questions(Path(chunks_path), 500)
+        payload = {"chunks_path": chunks_path} | json.loads(payload_json)
+        levels = [int(c) for c in concurrency.split(",") if c.strip()]
+
+        steps = []
+        for c in levels:
+            print(f"[load] concurrency={c} for {duration}s ...", file=sys.stderr)
+            steps.append(asyncio.run(run_step(target, endpoint, payload, questions, c, duration, warmup, timeout)))
+        _print_table(steps)
+
+        result = {
+            "config": {
+                "target": target,
+                "endpoint": endpoint,
+                "workers": workers,
+                "duration_s": duration,
+                "stub": {
+                    "embed_latency": embed_latency, "query_latency": query_latency, "llm_latency": llm_latency,
+                    "embed_errors": embed_errors, "query_errors": query_errors, "llm_errors": llm_errors,
+                },
+            },
+            "steps": steps,
+        }
+        if out_path:
+            Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(out_path).write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/quantization_bench.py
+"""
+Memory vs recall trade-off of the LocalIndex storage options.
+
+For every (dimensions, quantization) combination the benchmark builds a LocalIndex, runs the
+query set and compares the top-k against exact float32 search at full dimensionality:
+
+  resident MB / bytes per vector   codes kept in RAM (full precision is memory-mapped from disk)
+  recall@k                         overlap with the exact full-precision top-k
+  p50/p95 ms                       query latency including rescoring
+
+Usage:
+  # synthetic clustered vectors with a decaying spectrum (text-embedding-3 keeps most of its
+  # signal in the leading dimensions, which is what makes shortening usable)
+  python -m benchmarks.quantization_bench --num-vectors 50000 --dims 1536,512,256
+
+  # real embeddings: (n, dim) float32 .npy files for the corpus and the queries
+  python -m benchmarks.quantization_bench --vectors corpus.npy --query-vectors queries.npy
+"""
+import json
+import time
+import tempfile
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+
+import click
+import numpy as np
+
+from src.vectorstore.local_store import LocalIndex
+from src.vectorstore.quantization import QUANTIZATIONS
+from benchmarks.retrieval_bench import percentiles, peak_rss_mb
+
+
+def synthetic_vectors(num_vectors: int, num_queries: int, dim: int, clusters: int = 64, seed: int = 7) -> Tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors whose per-dimension variance decays like 1/sqrt(i)."""
+    rng = np.random.default_rng(seed)
+    spectrum = (1.0 / np.sqrt(np.arange(1, dim + 1))).astype(np.float32)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32) * spectrum
+    labels = rng.integers(0, clusters, size=num_vectors)
+    corpus = centers[labels] + 0.6 * rng.normal(size=(num_vectors, dim)).astype(np.float32) * spectrum
+    # queries are perturbed corpus vectors, so each has a meaningful neighbourhood
+    picks = rng.integers(0, num_vectors, size=num_queries)
+    queries = corpus[picks] + 0.3 * rng.normal(size=(num_queries, dim)).astype(np.float32) * spectrum
+    return corpus.astype(np.float32), queries.astype(np.float32)
+
+
+def _unit(m: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(n > 0, n, 1.0)
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    c, q = _unit(corpus), _unit(queries)
+    out = []
+    for i in range(0, q.shape[0], 256):
+        s = q[i:i + 256] @ c.T
+        top = np.argpartition(-s, k - 1, axis=1)[:, :k]
+        out.extend(set(map(str, row)) for row in top)
+    return out
+
+
+def run_mode(corpus: np.ndarray, queries: np.ndarray, truth: List[set], dims: int, quantization: str,
+             top_k: int, rescore_factor: Optional[int], workdir: Path) -> Dict[str, Any]:
+    index = LocalIndex(dim=dims, quantization=quantization, rescore_factor=rescore_factor, truncate=True)
+    for i in range(0, corpus.shape[0], 4096):
+        index.upsert(vectors=[{"id": str(i + j), "values": v} for j, v in enumerate(corpus[i:i + 4096])])
+    # reload from disk so full precision is memory-mapped, as a deployed index would be
+    path = workdir / f"{dims}-{quantization}"
+    index.save(str(path))
+    index = LocalIndex.load(str(path), rescore_factor=rescore_factor)
+    mem = index.memory_usage()
+
+    lat, hits = [], 0
+    for q, rel in zip(queries, truth):
+        t0 = time.perf_counter()
+        res = index.query(vector=q, top_k=top_k, include_metadata=False)
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        hits += len(rel.intersection(m.id for m in res.matches))
+    return {
+        "dims": dims,
+        "quantization": quantization,
+        "rescore_factor": index.rescore_factor,
+        "bytes_per_vector": mem["bytes_per_vector"],
+        "resident_mb": round(mem["resident_bytes"] / 2**20, 3),
+        "recall_at_k": round(hits / (top_k * len(truth)), 4),
+        "latency_ms": percentiles(lat),
+    }
+
+
+@click.command()
+@click.option("--vectors", "vectors_path", default=None, help="(n, dim) float32 .npy corpus (default: synthetic)")
+@click.option("--query-vectors", "queries_path", default=None, help="(m, dim) float32 .npy queries")
+@click.option("--num-vectors", default=20000, help="Synthetic corpus size")
+@click.option("--num-queries", default=200, help="Synthetic query count")
+@click.option("--dim", default=1536, help="Synthetic vector dimension")
+@click.option("--dims", default="", help="Comma-separated shortened dimensions to try in addition to the full one")
+@click.option("--quantizations", default=",".join(QUANTIZATIONS), help="Comma-separated subset of none,float16,int8,binary (none is always run as the baseline)")
+@click.option("--top-k", default=10)
+@click.option("--rescore-factor", default=None, type=int, help="Candidates rescored at full precision = top_k * factor (default: per quantization)")
+@click.option("--out", "out_path", default=None, help="Write results JSON here")
+def main(vectors_path, queries_path, num_vectors, num_queries, dim, dims, quantizations, top_k, rescore_factor, out_path):
+    if vectors_path:
+        if not queries_path:
+            raise SystemExit("--query-vectors is required with --vectors")
+        corpus = np.load(vectors_path).astype(np.float32)
+        queries = np.load(queries_path).astype(np.float32)
+    else:
+        corpus, queries = synthetic_vectors(num_vectors, num_queries, dim)
+    full = corpus.shape[1]
+    dim_list = [full] + sorted({int(d) for d in dims.split(",") if d.strip() and int(d) < full}, reverse=True)
+    kinds = [k.strip() for k in quantizations.split(",") if k.strip()]
+    if "none" not in kinds:
+        kinds.insert(0, "none")  # float32 at full dims is the baseline for memory_saved / recall_lost
+
+    truth = exact_top_k(corpus, queries, top_k)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for d in dim_list:
+            for kind in kinds:
+                row = run_mode(corpus, queries, truth, d, kind, top_k, rescore_factor, Path(tmp))
+                rows.append(row)
+                print(f"[quant-bench] dims={d:<5} {kind:<8} {row['bytes_per_vector']:>8.1f} B/vec "
+                      f"{row['resident_mb']:>9.2f} MB  recall@{top_k}={row['recall_at_k']:.4f}  "
+                      f"p50={row['latency_ms']['p50']:.2f}ms p95={row['latency_ms']['p95']:.2f}ms")
+
+    base = next(r for r in rows if r["dims"] == full and r["quantization"] == "none")
+    for r in rows:
+        r["memory_saved"] = round(1.0 - r["bytes_per_vector"] / base["bytes_per_vector"], 4) if base["bytes_per_vector"] else 0.0
+        r["recall_lost"] = round(base["recall_at_k"] - r["recall_at_k"], 4)
+    result = {
+        "config": {"vectors": int(corpus.shape[0]), "queries": int(queries.shape[0]), "dim": full,
+                   "top_k": top_k, "rescore_factor": rescore_factor, "source": vectors_path or "synthetic"},
+        "modes": rows,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if out_path:
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(out_path).write_text(text + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# benchmarks/retrieval_bench.py
+"""
+Offline retrieval benchmark: embed -> query_index -> get_reranker(...) -> context build.
+
+Runs fully offline: queries are embedded with the deterministic fake embedder and searched
+in the local vector backend, so numbers are reproducible and comparable across CI runs.
+
+Usage:
+  # synthetic corpus + labeled queries (default)
+  python -m benchmarks.retrieval_bench --out bench/retrieval.json
+
+  # your own chunks file and labeled queries ({"question": ..., "relevant_ids": [...]} per line)
+  python -m benchmarks.retrieval_bench --chunks data/<slug>/chunks.jsonl --queries queries.jsonl
+
+  # fail (exit 1) when p95 latency or recall regresses against a previous run
+  python -m benchmarks.retrieval_bench --out new.json --baseline old.json
+
+Reports per-stage p50/p95/p99 latency (ms), queries/sec, peak RSS and recall@k / MRR.
+"""
+import json
+import sys
+import time
+import random
+import platform
+import resource
+from pathlib import Path
+from typing import List, Dict, Any, Tuple, Optional
+
+import click
+import numpy as np
+
+from src.embeddings.fake_embedder import fake_embed_texts
+from src.vectorstore.local_store import LocalIndex
+from src.reranker import get_reranker, reciprocal_rank_fusion
+from src.vectorstore.bm25_index import BM25Index
+from src.vectorstore.chapter_index import ChapterIndex
+from src.pipeline.rag_pipeline import load_id_to_text, make_context_snippets, dense_candidates
+
+STAGES = ("embed", "vector_query", "lexical", "rerank", "context", "total")
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "te", "su", "vo", "ne", "di", "po", "an", "el", "or", "is", "um", "ba", "ge", "fu", "xi", "zo"]
+
+
+# --------------------------------------------------------------------------- corpus
+
+def _word(rng: random.Random, n_syl: int) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(n_syl))
+
+
+def synthetic_corpus(num_chunks: int, num_queries: int, seed: int = 13, num_chapters: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Build chunk docs (chunks.jsonl shape) and labeled queries.
+    Each chunk mixes a handful of chunk-specific "rare" terms with Zipf-distributed common words;
+    each query samples rare terms from one chunk (the label) plus common-word noise.
+    With `num_chapters`, consecutive chunks form chapters that share topic words, and queries
+    carry two of their chapter's topic words (see synthetic_chapters).
+    """
+    rng = random.Random(seed)
+    topic_rng = random.Random(seed + 1)  # separate stream: num_chapters=0 output is unchanged
+    topics = [[_word(topic_rng, 3) for _ in range(12)] for _ in range(num_chapters)]
+    common = list(dict.fromkeys(_word(rng, 2) for _ in range(400)))
+    weights = [1.0 / (r + 1) for r in range(len(common))]
+    docs, rare_by_doc = [], []
+    seen = set(common)
+    for i in range(num_chunks):
+        rare = []
+        while len(rare) < 8:
+            w = _word(rng, 4)
+            if w not in seen:
+                seen.add(w)
+                rare.append(w)
+        words = rare + rare[:4] + rng.choices(common, weights=weights, k=12)
+        if topics:
+            words += topic_rng.sample(topics[i * num_chapters // num_chunks], 4)
+        rng.shuffle(words)
+        page = 1 + i // 3
+        docs.append({
+            "id": f"chunk-{i:06d}",
+            "book_title": "Synthetic Benchmark Book",
+            "book_slug": "synthetic_benchmark_book",
+            "chunk_index": i + 1,
+            "text": " ".join(words),
+            "page_start": page,
+            "page_end": page,
+            "source": f"synthetic.pdf#pages={page}-{page}",
+        })
+        rare_by_doc.append(rare)
+
+    queries = []
+    for q in range(num_queries):
+        target = rng.randrange(num_chunks)
+        words = rng.sample(rare_by_doc[target], 5) + rng.choices(common, weights=weights, k=2)
+        if topics:
+            words += topic_rng.sample(topics[target * num_chapters // num_chunks], 2)
+        rng.shuffle(words)
+        queries.append({"question": " ".join(words), "relevant_ids": [docs[target]["id"]]})
+    return docs, queries
+
+
+def synthetic_chapters(docs: List[Dict], num_chapters: int) -> List[Dict]:
+    """chapters.json entries matching synthetic_corpus(..., num_chapters=...)."""
+    n = len(docs)
+    out = []
+    for c in range(num_chapters):
+        members = [docs[i] for i in range(n) if i * num_chapters // n == c]
+        if members:
+            out.append({"chapter": f"Chapter {c + 1}", "start_page": members[0]["page_start"], "end_page": members[-1]["page_end"]})
+    return out
+
+
+def load_queries(path: Path) -> List[Dict]:
+    out = []
+    with path.open(encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                j = json.loads(line)
+                out.append({"question": j["question"], "relevant_ids": list(j.get("relevant_ids") or [])})
+    return out
+
+
+def build_local_index(docs: List[Dict], namespace: str = "default", batch_size: int = 256) -> LocalIndex:
+    index = LocalIndex()
+    for i in range(0, len(docs), batch_size):
+        batch = docs[i:i + batch_size]
+        embs = fake_embed_texts([d["text"] for d in batch])
+        metas = [{k: d.get(k) for k in ("id", "book_title", "book_slug", "chunk_index", "page_start", "page_end", "source")} for d in batch]
+        index.upsert(vectors=[{"id": m["id"], "values": e, "metadata": m} for e, m in zip(embs, metas)], namespace=namespace)
+    return index
+
+
+# --------------------------------------------------------------------------- metrics
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    arr = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "p99": round(float(p99), 4), "mean": round(float(arr.mean()), 4)}
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 2)
+
+
+def _match_id(m) -> str:
+    return m.id if hasattr(m, "id") else m["id"]
+
+
+def recall_and_rr(ranked_ids: List[str], relevant: set, k: int) -> Tuple[float, float]:
+    if not relevant:
+        return 0.0, 0.0
+    hit = 1.0 if any(i in relevant for i in ranked_ids[:k]) else 0.0
+    rr = 0.0
+    for rank, i in enumerate(ranked_ids, start=1):
+        if i in relevant:
+            rr = 1.0 / rank
+            break
+    return hit, rr
+
+
+# --------------------------------------------------------------------------- run
+
+def run_benchmark(
+    docs: List[Dict],
+    queries: List[Dict],
+    top_k: int = 5,
+    candidate_k: int = 50,
+    reranker_name: str = "dynamic",
+    max_context_chars: int = 4000,
+    warmup: int = 5,
+    repeat: int = 1,
+    hybrid: bool = False,
+    chapters: Optional[List[Dict]] = None,
+    retrieval: str = "flat",
+) -> Dict[str, Any]:
+    id2doc = {d["id"]: d for d in docs}
+
+    t0 = time.perf_counter()
+    index = build_local_index(docs)
+    bm25 = BM25Index.build(docs) if hybrid else None
+    chapter_index = None
+    if chapters and retrieval != "flat":
+        chapter_index = ChapterIndex.build(docs, fake_embed_texts([d["text"] for d in docs]), chapters)
+    build_s = time.perf_counter() - t0
+
+    reranker = get_reranker(reranker_name, max_k=top_k, text_lookup=lambda mid: (id2doc.get(mid) or {}).get("text"))
+
+    def one(question: str):
+        t = {}
+        s = time.perf_counter()
+        q_emb = fake_embed_texts([question], batch_size=1)[0]
+        t["embed"] = time.perf_counter() - s
+
+        s2 = time.perf_counter()
+        candidates = dense_candidates(index, q_emb, candidate_k, "default", None, chapter_index, top_k, retrieval)
+        t["vector_query"] = time.perf_counter() - s2
+
+        s2 = time.perf_counter()
+        if bm25 is not None:
+            hits = bm25.search(question, top_k=candidate_k)
+            candidates = reciprocal_rank_fusion(candidates, hits, id2doc, top_n=candidate_k)
+        t["lexical"] = time.perf_counter() - s2
+
+        s2 = time.perf_counter()
+        matches = reranker.rerank(question, candidates)
+        t["rerank"] = time.perf_counter() - s2
+
+        s2 = time.perf_counter()
+        make_context_snippets(matches, id2doc, max_chars=max_context_chars)
+        t["context"] = time.perf_counter() - s2
+
+        t["total"] = time.perf_counter() - s
+        return candidates, matches, t
+
+    for q in queries[:warmup]:
+        one(q["question"])
+
+    lat: Dict[str, List[float]] = {s: [] for s in STAGES}
+    recall, mrr, cand_recall = [], [], []
+    wall0 = time.perf_counter()
+    for _ in range(max(1, repeat)):
+        for q in queries:
+            candidates, matches, t = one(q["question"])
+            for stage in STAGES:
+                lat[stage].append(t[stage] * 1000.0)
+            relevant = set(q["relevant_ids"])
+            hit, rr = recall_and_rr([_match_id(m) for m in matches], relevant, top_k)
+            recall.append(hit)
+            mrr.append(rr)
+            cand_recall.append(recall_and_rr([_match_id(m) for m in candidates], relevant, candidate_k)[0])
+    wall = time.perf_counter() - wall0
+    n = len(lat["total"])
+
+    return {
+        "config": {
+            "num_chunks": len(docs),
+            "num_queries": len(queries),
+            "repeat": repeat,
+            "top_k": top_k,
+            "candidate_k": candidate_k,
+            "reranker": reranker_name,
+            "hybrid": hybrid,
+            "retrieval": retrieval if chapter_index is not None else "flat",
+            "chapters": len(chapter_index) if chapter_index is not None else 0,
+            "embedder": "fake_hashing",
+            "vector_backend": "local",
+        },
+        "index_build_s": round(build_s, 4),
+        "latency_ms": {stage: percentiles(lat[stage]) for stage in STAGES},
+        "throughput_qps": round(n / wall, 2) if wall > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "quality": {
+            f"recall@{top_k}": round(float(np.mean(recall)) if recall else 0.0, 4),
+            "mrr": round(float(np.mean(mrr)) if mrr else 0.0, 4),
+            f"candidate_recall@{candidate_k}": round(float(np.mean(cand_recall)) if cand_recall else 0.0, 4),
+        },
+        "env": {"python": platform.python_version(), "platform": platform.platform(), "numpy": np.__version__},
+    }
+
+
+def compare(current: Dict, baseline: Dict, max_latency_regression: float, max_quality_drop: float) -> List[str]:
+    """Return a list of human-readable regressions (empty when within tolerance)."""
+    problems = []
+    cur_p95 = current["latency_ms"]["total"]["p95"]
+    base_p95 = baseline.get("latency_ms", {}).get("total", {}).get("p95")
+    if base_p95 and cur_p95 > base_p95 * (1.0 + max_latency_regression):
+        problems.append(f"total p95 {cur_p95:.3f}ms > baseline {base_p95:.3f}ms (+{max_latency_regression:.0%} allowed)")
+    for key, val in current["quality"].items():
+        base = baseline.get("quality", {}).get(key)
+        if base is not None and val < base - max_quality_drop:
+            problems.append(f"{key} {val:.4f} < baseline {base:.4f} (-{max_quality_drop} allowed)")
+    return problems
+
+
+@click.command()
+@click.option("--chunks", "chunks_path", default=None, help="chunks.jsonl to index (default: synthetic corpus)")
+@click.option("--queries", "queries_path", default=None, help="labeled queries JSONL: {question, relevant_ids}")
+@click.option("--num-chunks", default=2000, help="Synthetic corpus size")
+@click.option("--num-queries", default=200, help="Synthetic query count")
+@click.option("--seed", default=13, help="Synthetic corpus seed")
+@click.option("--top-k", default=5)
+@click.option("--candidate-k", default=50)
+@click.option("--reranker", "reranker_name", default="dynamic", help="dynamic | cascade | cross_encoder | none")
+@click.option("--hybrid/--no-hybrid", default=False, help="Fuse BM25 hits with dense results (RRF)")
+@click.option("--chapters", "num_chapters", default=0, help="Synthetic chapters (0 = none); with --chunks, chapters.json next to it is used")
+@click.option("--retrieval", default="flat", help="flat | chapters (two-level: top chapters first, then their chunks)")
+@click.option("--warmup", default=5)
+@click.option("--repeat", default=1, help="Passes over the query set")
+@click.option("--out", "out_path", default=None, help="Write results JSON here")
+@click.option("--baseline", "baseline_path", default=None, help="Previous results JSON to compare against")
+@click.option("--max-latency-regression", default=0.25, help="Allowed relative p95 increase vs baseline")
+@click.option("--max-quality-drop", default=0.01, help="Allowed absolute recall/MRR drop vs baseline")
+def main(chunks_path, queries_path, num_chunks, num_queries, seed, top_k, candidate_k, reranker_name, hybrid,
+         num_chapters, retrieval, warmup, repeat, out_path, baseline_path, max_latency_regression, max_quality_drop):
+    if chunks_path:
+        if not queries_path:
+            raise SystemExit("--queries is required with --chunks")
+        docs = list(load_id_to_text(Path(chunks_path)).values())
+        queries = load_queries(Path(queries_path))
+        chapters_file = Path(chunks_path).with_name("chapters.json")
+        chapters = json.loads(chapters_file.read_text(encoding="utf-8")) if chapters_file.exists() else None
+    else:
+        docs, queries = synthetic_corpus(num_chunks, num_queries, seed=seed, num_chapters=num_chapters)
+        chapters = synthetic_chapters(docs, num_chapters) if num_chapters else None
+
+    result = run_benchmark(docs, queries, top_k=top_k, candidate_k=candidate_k, reranker_name=reranker_name,
+                           warmup=warmup, repeat=repeat, hybrid=hybrid, chapters=chapters, retrieval=retrieval)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if out_path:
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(out_path).write_text(text + "\n", encoding="utf-8")
+
+    if baseline_path:
+        baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+        problems = compare(result, baseline, max_latency_regression, max_quality_drop)
+        for p in problems:
+            print(f"[bench] REGRESSION: {p}", file=sys.stderr)
+        if problems:
+            raise SystemExit(1)
+        print("[bench] no regressions vs baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# benchmarks/stub_server.py
+"""
+Local stand-in for the external APIs used by src/api/app.py, for load testing without
+keys, network or cost:
+
+  POST /v1/embeddings   OpenAI embeddings (deterministic fake vectors)
+  POST /v1/responses    OpenAI Responses API (canned answer; previous_response_id and a
+                        prefix prompt cache are simulated, so usage reports cached_tokens)
+  POST /query           Pinecone index data plane (exact search over a chunks.jsonl;
+                        metadata filters supported, vectors also served from a per-book namespace)
+
+Point the app at it with:
+  OPENAI_BASE_URL=http://127.0.0.1:8765/v1  OPENAI_API_KEY=stub
+  PINECONE_INDEX_HOST=http://127.0.0.1:8765 PINECONE_API_KEY=stub
+
+Each endpoint gets its own latency distribution ("<median_ms>[:<p99_ms>]", log-normal;
+"0" disables) and error rate:
+
+  python -m benchmarks.stub_server --chunks data/<slug>/chunks.jsonl \
+      --embed-latency 40:250 --query-latency 30:120 --llm-latency 1500:6000 --llm-errors 0.02
+"""
+import json
+import math
+import hashlib
+import time
+import uuid
+import random
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import click
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.embeddings.fake_embedder import fake_embed_texts
+from src.vectorstore.local_store import LocalIndex
+
+# z-score of the 99th percentile of a standard normal
+_Z99 = 2.3263
+# prompt caching as the OpenAI docs describe it: prefixes of >= 1024 tokens, in 128-token steps
+# (tokens approximated as 4 characters)
+_CACHE_MIN_CHARS = 4096
+_CACHE_STEP_CHARS = 512
+_CACHE_MAX_ENTRIES = 200_000
+
+
+@dataclass
+class LatencySpec:
+    median_ms: float = 0.0
+    p99_ms: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencySpec":
+        parts = [float(p) for p in str(spec).split(":") if p.strip()]
+        if not parts:
+            return cls()
+        median = parts[0]
+        p99 = parts[1] if len(parts) > 1 else median
+        return cls(median_ms=median, p99_ms=max(p99, median))
+
+    def sample_s(self, rng: random.Random) -> float:
+        if self.median_ms <= 0:
+            return 0.0
+        if self.p99_ms <= self.median_ms:
+            return self.median_ms / 1000.0
+        sigma = math.log(self.p99_ms / self.median_ms) / _Z99
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000.0
+
+
+@dataclass
+class EndpointSpec:
+    latency: LatencySpec = field(default_factory=LatencySpec)
+    error_rate: float = 0.0
+    error_status: int = 500
+
+
+@dataclass
+class StubConfig:
+    embed: EndpointSpec = field(default_factory=EndpointSpec)
+    llm: EndpointSpec = field(default_factory=EndpointSpec)
+    query: EndpointSpec = field(default_factory=EndpointSpec)
+    chunks_path: Optional[str] = None
+    namespace: str = "default"
+    answer_tokens: int = 120
+    seed: int = 7
+    prompt_cache: bool = True
+
+
+def _flatten_input(value: Any) -> str:
+    """Responses API input (string or message list) as the text the model would see."""
+    if isinstance(value, str):
+        return value + "\n"
+    parts = []
+    for item in value or []:
+        if isinstance(item, dict):
+            content = item.get("content")
+            if isinstance(content, list):
+                content = "".join(c.get("text", "") if isinstance(c, dict) else str(c) for c in content)
+            parts.append(f"{item.get('role', 'user')}: {content}\n")
+        else:
+            parts.append(str(item) + "\n")
+    return "".join(parts)
+
+
+class PrefixCache:
+    """Remembers prompt prefixes; cached_chars(text) = longest previously seen cacheable prefix."""
+
+    def __init__(self, max_entries: int = _CACHE_MAX_ENTRIES):
+        self._seen: "OrderedDict[bytes, None]" = OrderedDict()
+        self.max_entries = max_entries
+
+    def lookup_and_add(self, text: str) -> int:
+        data = text.encode("utf-8")
+        h = hashlib.sha1()
+        cached, pos = 0, 0
+        for end in range(_CACHE_STEP_CHARS, len(data) + 1, _CACHE_STEP_CHARS):
+            h.update(data[pos:end])
+            pos = end
+            if end < _CACHE_MIN_CHARS:
+                continue
+            key = h.copy().digest()
+            if key in self._seen:
+                cached = end
+                self._seen.move_to_end(key)
+            else:
+                self._seen[key] = None
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return cached
+
+
+def _error(spec: EndpointSpec, kind: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=spec.error_status,
+        content={"error": {"message": f"stub injected {kind} error", "type": "server_error", "code": spec.error_status}},
+    )
+
+
+def create_app(cfg: StubConfig) -> FastAPI:
+    app = FastAPI(title="RAG upstream stub")
+    rng = random.Random(cfg.seed)
+    stats: Dict[str, int] = {"embeddings": 0, "responses": 0, "query": 0, "errors": 0,
+                             "input_tokens": 0, "cached_tokens": 0}
+    prefix_cache = PrefixCache()
+    conversations: "OrderedDict[str, str]" = OrderedDict()  # response id -> conversation text so far
+
+    index = LocalIndex()
+    if cfg.chunks_path:
+        docs = []
+        with Path(cfg.chunks_path).open(encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    docs.append(json.loads(line))
+        embs = fake_embed_texts([d["text"] for d in docs])
+        keys = ("id", "book_title", "book_slug", "chunk_index", "page_start", "page_end", "source")
+        vectors = [{"id": d["id"], "values": e, "metadata": {k: d.get(k) for k in keys if d.get(k) is not None}} for d, e in zip(docs, embs)]
+        index.upsert(vectors=vectors, namespace=cfg.namespace)
+        # also serve each book from its own namespace (BOOK_SCOPE=namespace)
+        for v in vectors:
+            slug = v["metadata"].get("book_slug")
+            if slug and slug != cfg.namespace:
+                index.upsert(vectors=[v], namespace=slug)
+        print(f"[stub] loaded {len(docs)} chunks into namespace '{cfg.namespace}'")
+
+    async def _delay_or_fail(spec: EndpointSpec, kind: str) -> Optional[JSONResponse]:
+        delay = spec.latency.sample_s(rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if spec.error_rate > 0 and rng.random() < spec.error_rate:
+            stats["errors"] += 1
+            return _error(spec, kind)
+        return None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        stats["embeddings"] += 1
+        err = await _delay_or_fail(cfg.embed, "embeddings")
+        if err is not None:
+            return err
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dim = int(body.get("dimensions") or index.dim)
+        vecs = fake_embed_texts(list(inputs), dim=dim)
+        tokens = sum(len(str(t).split()) for t in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vecs)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        stats["responses"] += 1
+        err = await _delay_or_fail(cfg.llm, "responses")
+        if err is not None:
+            return err
+        history = ""
+        prev = body.get("previous_response_id")
+        if prev:
+            if prev not in conversations:
+                return JSONResponse(status_code=404, content={"error": {
+                    "message": f"Previous response with id '{prev}' not found.", "type": "invalid_request_error",
+                    "param": "previous_response_id", "code": "previous_response_not_found"}})
+            history = conversations[prev]
+        conversation = history + _flatten_input(body.get("input"))
+        prompt = (body.get("instructions") or "") + "\n" + conversation
+        answer = ("Stub answer drawn from the provided context. " * max(1, cfg.answer_tokens // 8)).strip()
+        in_tokens = max(1, len(prompt) // 4)
+        cached_tokens = prefix_cache.lookup_and_add(prompt) // 4 if cfg.prompt_cache else 0
+        out_tokens = cfg.answer_tokens
+        stats["input_tokens"] += in_tokens
+        stats["cached_tokens"] += cached_tokens
+        resp_id = f"resp_{uuid.uuid4().hex}"
+        if body.get("store", True):
+            conversations[resp_id] = conversation + f"assistant: {answer}\n"
+            while len(conversations) > 10_000:
+                conversations.popitem(last=False)
+        return {
+            "id": resp_id,
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "stub"),
+            "status": "completed",
+            "output": [{
+                "type": "message",
+                "id": f"msg_{uuid.uuid4().hex}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": answer, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": in_tokens,
+                "input_tokens_details": {"cached_tokens": cached_tokens},
+                "output_tokens": out_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": in_tokens + out_tokens,
+            },
+        }
+
+    @app.post("/query")
+    async def query(request: Request):
+        body = await request.json()
+        stats["query"] += 1
+        err = await _delay_or_fail(cfg.query, "query")
+        if err is not None:
+            return err
+        res = index.query(
+            vector=body.get("vector") or [],
+            top_k=int(body.get("topK") or body.get("top_k") or 10),
+            namespace=body.get("namespace") or "",
+            include_metadata=bool(body.get("includeMetadata", True)),
+            filter=body.get("filter"),
+        )
+        return {
+            "matches": [{"id": m.id, "score": m.score, "values": [], "metadata": m.metadata} for m in res.matches],
+            "namespace": res.namespace,
+            "usage": {"readUnits": 5},
+        }
+
+    @app.get("/stub/stats")
+    def stub_stats():
+        return stats
+
+    return app
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=8765)
+@click.option("--chunks", "chunks_path", default=None, help="chunks.jsonl served by the fake Pinecone /query")
+@click.option("--namespace", default="default")
+@click.option("--embed-latency", default="0", help="<median_ms>[:<p99_ms>]")
+@click.option("--query-latency", default="0", help="<median_ms>[:<p99_ms>]")
+@click.option("--llm-latency", default="0", help="<median_ms>[:<p99_ms>]")
+@click.option("--embed-errors", default=0.0, help="Error rate 0..1")
+@click.option("--query-errors", default=0.0, help="Error rate 0..1")
+@click.option("--llm-errors", default=0.0, help="Error rate 0..1")
+@click.option("--error-status", default=500, help="HTTP status for injected errors (e.g. 429, 500, 503)")
+@click.option("--answer-tokens", default=120)
+@click.option("--seed", default=7)
+@click.option("--prompt-cache/--no-prompt-cache", default=True, help="Report cached_tokens for repeated prompt prefixes")
+def main(host, port, chunks_path, namespace, embed_latency, query_latency, llm_latency,
+         embed_errors, query_errors, llm_errors, error_status, answer_tokens, seed, prompt_cache):
+    import uvicorn
+
+    cfg = StubConfig(
+        embed=EndpointSpec(LatencySpec.parse(embed_latency), embed_errors, error_status),
+        query=EndpointSpec(LatencySpec.parse(query_latency), query_errors, error_status),
+        llm=EndpointSpec(LatencySpec.parse(llm_latency), llm_errors, error_status),
+        chunks_path=chunks_path,
+        namespace=namespace,
+        answer_tokens=answer_tokens,
+        seed=seed,
+        prompt_cache=prompt_cache,
+    )
+    uvicorn.run(create_app(cfg), host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
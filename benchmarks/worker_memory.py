@@ -0,0 +1,120 @@
+# benchmarks/worker_memory.py
+"""
+Memory cost of adding serving workers: per-process heap copies vs the shared, memory-mapped
+data plane (chunks.store, bm25.idx, LocalIndex files).
+
+Builds a synthetic corpus (chunks.jsonl, BM25 index, chunk store, local vector index) in a work
+directory, starts N worker processes that open it either way and answer a few queries, then
+reads each worker's Rss / Pss / Private from /proc/self/smaps_rollup (Linux only). Pss splits
+shared pages between the processes mapping them, so sum(Pss) is the real total footprint.
+
+Usage:
+  python -m benchmarks.worker_memory --workers 4 --num-chunks 20000
+  python -m benchmarks.worker_memory --workers 4 --start fork   # preload in the parent, like gunicorn --preload
+"""
+import json
+import time
+import multiprocessing as mp
+from pathlib import Path
+from typing import Dict, List
+
+import click
+
+from benchmarks.retrieval_bench import synthetic_corpus, build_local_index
+from src.embeddings.fake_embedder import fake_embed_texts
+from src.vectorstore.local_store import LocalIndex
+from src.vectorstore.bm25_index import BM25Index, build_bm25_for_chunks, bm25_path_for
+from src.vectorstore.chunk_store import build_chunk_store, open_chunk_store
+from src.pipeline.rag_pipeline import load_id_to_text
+
+MODES = ("heap", "mmap")
+
+
+def smaps_rollup() -> Dict[str, float]:
+    """Rss/Pss/Private (MiB) of the calling process."""
+    out: Dict[str, float] = {}
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                out[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    out["Private"] = out.pop("Private_Clean", 0.0) + out.pop("Private_Dirty", 0.0)
+    return {k: round(v, 2) for k, v in out.items()}
+
+
+def build_workdir(workdir: Path, num_chunks: int, num_queries: int) -> List[str]:
+    docs, queries = synthetic_corpus(num_chunks, num_queries)
+    workdir.mkdir(parents=True, exist_ok=True)
+    chunks = workdir / "chunks.jsonl"
+    with chunks.open("w", encoding="utf-8") as fh:
+        for d in docs:
+            fh.write(json.dumps(d, ensure_ascii=False) + "\n")
+    build_bm25_for_chunks(chunks)
+    build_chunk_store(chunks)
+    build_local_index(docs).save(str(workdir / "vector_index"))
+    return [q["question"] for q in queries]
+
+
+def open_data_plane(workdir: Path, mode: str):
+    chunks = workdir / "chunks.jsonl"
+    mmap = mode == "mmap"
+    id2doc = open_chunk_store(chunks) if mmap else load_id_to_text(chunks)
+    bm25 = BM25Index.load(bm25_path_for(chunks), mmap=mmap)
+    index = LocalIndex.load(str(workdir / "vector_index"), mmap=mmap)
+    return id2doc, bm25, index
+
+
+def _serve(workdir: str, mode: str, questions: List[str], preloaded, ready, results):
+    id2doc, bm25, index = preloaded or open_data_plane(Path(workdir), mode)
+    embs = fake_embed_texts(questions)
+    t0 = time.perf_counter()
+    for q, e in zip(questions, embs):
+        hits = bm25.search(q, top_k=50)
+        matches = index.query(vector=e, top_k=50, include_metadata=True).matches
+        _ = [id2doc.get(h[0]) for h in hits] + [id2doc.get(m.id) for m in matches]
+    elapsed = time.perf_counter() - t0
+    ready.wait()  # measure once every worker has loaded, so shared pages are counted as shared
+    results.put({"ms_per_query": round(1000 * elapsed / max(len(questions), 1), 3), **smaps_rollup()})
+
+
+def run_mode(workdir: Path, mode: str, workers: int, start: str, questions: List[str]) -> Dict:
+    ctx = mp.get_context(start)
+    preloaded = open_data_plane(workdir, mode) if start == "fork" else None
+    ready, results = ctx.Barrier(workers + 1), ctx.Queue()
+    procs = [ctx.Process(target=_serve, args=(str(workdir), mode, questions, preloaded, ready, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    per_worker = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    total = {k: round(sum(w[k] for w in per_worker), 2) for k in ("Rss", "Pss", "Private")}
+    return {"mode": mode, "workers": workers, "start": start, "total_mib": total, "per_worker": per_worker}
+
+
+@click.command()
+@click.option("--workers", default=4, help="Worker processes per mode")
+@click.option("--num-chunks", default=20000, help="Synthetic corpus size")
+@click.option("--num-queries", default=50, help="Queries answered by each worker before measuring")
+@click.option("--start", default="spawn", type=click.Choice(["spawn", "fork"]),
+              help="spawn: workers load independently (uvicorn --workers); fork: parent preloads (gunicorn --preload)")
+@click.option("--modes", default=",".join(MODES), help="Comma-separated subset of heap,mmap")
+@click.option("--workdir", default="bench/worker_memory", help="Where the synthetic corpus and indexes are written")
+@click.option("--out", "out_path", default=None, help="Write results JSON here")
+def main(workers, num_chunks, num_queries, start, modes, workdir, out_path):
+    workdir = Path(workdir)
+    questions = build_workdir(workdir, num_chunks, num_queries)
+    results = [run_mode(workdir, m.strip(), workers, start, questions) for m in modes.split(",") if m.strip()]
+    for r in results:
+        t = r["total_mib"]
+        ms = sum(w["ms_per_query"] for w in r["per_worker"]) / len(r["per_worker"])
+        print(f"{r['mode']:>5} x{r['workers']} ({r['start']}): total Pss {t['Pss']:.1f} MiB, "
+              f"Private {t['Private']:.1f} MiB, Rss {t['Rss']:.1f} MiB, {ms:.2f} ms/query")
+    if out_path:
+        Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(out_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
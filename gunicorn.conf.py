@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+"""
+Optional multi-worker serving with a preloaded, shared data plane:
+
+  pip install gunicorn
+  PRELOAD_CHUNKS=data/<slug>/chunks.jsonl WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py src.api.app:app
+
+The master imports the app, opens the read-only data (memory-mapped chunk store, BM25 and local
+vector index, chapter vectors, optional PRELOAD_RERANKER_MODEL weights) and freezes the GC
+before forking, so workers inherit those pages instead of each building a copy. Network
+clients (OpenAI, Pinecone) are created lazily per worker.
+
+Plain `uvicorn --workers N` also shares the memory-mapped files through the page cache; it
+just cannot share the Python heap or model weights.
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    # runs in the master after the app is imported, before the first worker is forked
+    from src.pipeline.rag_pipeline import preload_data_plane
+    preload_data_plane()
+    # move everything allocated so far out of the collector's reach: a GC pass in a worker
+    # would otherwise write to (and so copy) every inherited object's header
+    gc.freeze()
+    server.log.info("data plane preloaded; %d objects frozen", gc.get_freeze_count())
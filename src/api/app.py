@@ -1,4 +1,6 @@
 # src/api/app.py
+import time
+_import_t0 = time.perf_counter()
 from dotenv import load_dotenv
 load_dotenv()
 from fastapi import FastAPI, HTTPException
@@ -6,26 +8,43 @@ from pydantic import BaseModel
 from typing import List, Dict, Any
 from pathlib import Path
 
-from src.reranker import get_reranker
 import os
+import json
+import asyncio
 from src.embeddings.embedder import embed_texts
-from src.vectorstore.pinecone_store import get_pinecone_client, get_or_create_index, query_index
-
-from fastapi.staticfiles import StaticFiles
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-# add this import near the top of src/api/app.py
+from src.vectorstore.backend import get_vector_index
+from src.pipeline.rag_pipeline import (
+    load_id_to_text_cached,
+    make_context_snippets,
+    make_reranker,
+    start_lexical_search,
+    dense_candidates,
+    get_chapter_index,
+    fuse_candidates,
+    candidate_k_for,
+    retrieval_scope,
+    build_prompt,
+    generate_answer_async,
+    respond_async,
+    extract_answer_text,
+    llm_usage,
+    rerank_fits_budget,
+    rag_batch,
+    OPENAI_API_KEY,
+    RAG_DEADLINE_MS,
+)
+from src.pipeline.chat import SessionStore, CHAT_REUSE_SIMILARITY
 from src.llm.prompt import DEFAULT_SYSTEM_PROMPT
+from src.pipeline.deadline import deadline_scope, run_within_deadline, DeadlineExceeded
+from src.telemetry.metrics import span, inc, collect_timings, render_prometheus
+from src.telemetry.startup import record_import
+from src.api.warmup import start_warmup, readiness, health
 
-# OpenAI responses client
-from openai import OpenAI
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5")  # change in .env if you have a different name
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse
 
-if OPENAI_API_KEY:
-    _openai_client = OpenAI(api_key=OPENAI_API_KEY)
-else:
-    _openai_client = None
+RAG_BATCH_MAX_QUESTIONS = int(os.getenv("RAG_BATCH_MAX_QUESTIONS", "1000"))
+SERVE_STATIC = os.getenv("SERVE_STATIC", "1").lower() not in ("0", "false", "no", "off")  # 0 for API-only replicas
 
 app = FastAPI(title="Rebuilding Milo — RAG API")
 app.add_middleware(
@@ -36,12 +55,32 @@ app.add_middleware(
 )
 
 # serve the static UI
-app.mount("/static", StaticFiles(directory="src/api/static"), name="static")
+if SERVE_STATIC:
+    from fastapi.staticfiles import StaticFiles
+    app.mount("/static", StaticFiles(directory="src/api/static", check_dir=False), name="static")
+
+    # root -> index.html
+    @app.get("/", include_in_schema=False)
+    def root_index():
+        return FileResponse("src/api/static/index.html")
+
+# warm-up (src/api/warmup.py) runs at startup; /readyz turns 200 once it is done
+@app.on_event("startup")
+async def warm_up():
+    await start_warmup()
+
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    # liveness: the process is up and serving, warm or not
+    return health()
+
+@app.get("/readyz", include_in_schema=False)
+def readyz():
+    ready, body = readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
 
-# root -> index.html
-@app.get("/", include_in_schema=False)
-def root_index():
-    return FileResponse("src/api/static/index.html")
+# multi-turn chat sessions (process-local)
+_chat_sessions = SessionStore()
 
 # where local chunks live (we use the same file the indexer wrote)
 DEFAULT_CHUNKS_ROOT = Path("data")
@@ -51,171 +90,295 @@ class RagRequest(BaseModel):
     question: str
     top_k: int = 5
     max_context_chars: int = 4000
-    reranker: str = "dynamic"           # "dynamic", "cross_encoder", "none"
+    reranker: str = "dynamic"           # "dynamic", "cascade", "cross_encoder", "none"
     reranker_model: str | None = None   # e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    include_timings: bool = False       # add per-stage wall times (ms) to the response
+    hybrid: bool = True                 # fuse BM25 hits (if bm25.idx exists) with vector results
+    deadline_ms: int | None = None      # end-to-end budget; defaults to RAG_DEADLINE_MS, 0 disables
+    retrieval: str | None = None        # "auto", "chapters", "flat"; defaults to RETRIEVAL_MODE
 
-def load_id_to_text(path: Path) -> Dict[str, Dict[str,Any]]:
-    d = {}
-    with path.open(encoding="utf-8") as fh:
-        for line in fh:
-            if not line.strip():
-                continue
-            j = json.loads(line)
-            d[j["id"]] = j
-    return d
+class ChatRequest(BaseModel):
+    chunks_path: str
+    question: str
+    session_id: str | None = None       # omit to start a new session
+    top_k: int = 5
+    max_context_chars: int = 4000       # per-turn retrieval budget; the session context grows up to CHAT_MAX_CONTEXT_CHARS
+    reranker: str = "dynamic"
+    reranker_model: str | None = None
+    include_timings: bool = False
+    hybrid: bool = True
+    deadline_ms: int | None = None
+    retrieval: str | None = None
+
+class RagBatchRequest(BaseModel):
+    chunks_path: str
+    questions: List[str]
+    top_k: int = 5
+    max_context_chars: int = 4000
+    reranker: str = "dynamic"
+    reranker_model: str | None = None
+    hybrid: bool = True
+    retrieval: str | None = None
+    deadline_ms: int | None = None      # per-question LLM budget; defaults to RAG_DEADLINE_MS, 0 disables
 
-import json
-
-def make_context_snippets(matches, id2doc, max_chars: int):
-    """
-    Build a context by concatenating retrieved chunks until max_chars reached.
-    Returns the context string and a list of source metadata.
-    """
-    parts = []
-    sources = []
-    chars = 0
-    for m in matches:
-        mid = m.id if hasattr(m, "id") else m["id"]
-        meta = m.metadata if hasattr(m, "metadata") else m["metadata"]
-        doc = id2doc.get(mid)
-        snippet = doc["text"] if doc else ""
-        snippet = snippet.replace("\n", " ")
-        # shorten chunk to avoid huge context
-        if len(snippet) > 1200:
-            snippet = snippet[:1200] + " ..."
-
-        if chars + len(snippet) > max_chars and parts:
-            break
-        parts.append(f"Source (page {meta.get('page_start')}-{meta.get('page_end')}, chunk {meta.get('chunk_index')}):\n{snippet}\n")
-        sources.append({"id": mid, "score": m.score if hasattr(m, "score") else m["score"], "meta": meta})
-        chars += len(snippet)
-    return "\n\n".join(parts), sources
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus scrape target: per-stage latency histograms + cache counters
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @app.post("/rag")
 async def rag_endpoint(req: RagRequest):
-    # resolve the chunks file
-    chunks_path = Path(req.chunks_path)
-    if not chunks_path.exists():
-        raise HTTPException(status_code=400, detail=f"chunks.jsonl not found: {chunks_path}")
+    budget_ms = RAG_DEADLINE_MS if req.deadline_ms is None else req.deadline_ms
+    with collect_timings() as timings, deadline_scope(budget_ms / 1000.0):
+        with span("rag.total"):
+            try:
+                result = await _rag(req)
+            except DeadlineExceeded as e:
+                raise HTTPException(status_code=504, detail=str(e))
+    if req.include_timings:
+        result["timings"] = {k: round(v, 3) for k, v in timings.items()}
+    return result
+
+async def _load_chunks(chunks_path: Path):
+    """id -> chunk mapping for `chunks_path`; a file that is not a chunks.jsonl is a 400."""
+    try:
+        with span("rag.load_chunks"):
+            return await asyncio.to_thread(load_id_to_text_cached, chunks_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid chunks file: {e}")
 
-    # load id->doc mapping (local)
-    id2doc = {}
-    with chunks_path.open(encoding="utf-8") as fh:
-        for line in fh:
-            if not line.strip():
-                continue
-            j = json.loads(line)
-            id2doc[j["id"]] = j
-
-    # 1) embed the question
+
+async def _embed_question(question: str) -> List[float]:
     try:
-        q_emb = embed_texts([req.question], batch_size=1)[0]
+        with span("rag.embed"):
+            return (await run_within_deadline(asyncio.to_thread(embed_texts, [question], 1), "embed"))[0]
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"embedding failed: {e}")
 
-    # 2) query pinecone
-    try:
-        pc = get_pinecone_client()
-        index = get_or_create_index(pc)
-        # request a wider candidate set; default to 50 for reranking
-        candidate_k = max(req.top_k, int(os.getenv("RERANK_CANDIDATE_K", "50")))
-        candidates = query_index(index, q_emb, top_k=candidate_k)
-
-        # instantiate reranker from factory
-        try:
-            reranker = get_reranker(req.reranker, max_k=req.top_k, model_name=(req.reranker_model or os.getenv("RERANK_CE_MODEL")))
-        except Exception as e:
-            # fallback to dynamic reranker if factory fails
-            reranker = get_reranker("dynamic", max_k=req.top_k)
 
-        try:
-            matches = reranker.rerank(req.question, candidates)
-        except Exception as e:
-            # if reranker fails, fallback to the raw candidates truncated to top_k
-            matches = candidates[: req.top_k]
+async def _retrieve(req, chunks_path: Path, id2doc, q_emb: List[float], lexical=None) -> List[Any]:
+    """Vector query (+ BM25 fusion) and rerank for `req.question`; returns up to req.top_k matches."""
+    candidate_k = candidate_k_for(req.top_k)
+    if lexical is None and req.hybrid:
+        lexical = start_lexical_search(chunks_path, req.question, candidate_k)
 
+    # query the vector index
+    try:
+        with span("rag.index_handle"):
+            index = await run_within_deadline(asyncio.to_thread(get_vector_index), "index_handle")
+        with span("rag.vector_query"):
+            namespace, scope_filter = retrieval_scope(id2doc)
+            chapters = get_chapter_index(chunks_path)
+            candidates = await run_within_deadline(
+                asyncio.to_thread(dense_candidates, index, q_emb, candidate_k, namespace, scope_filter,
+                                  chapters, req.top_k, req.retrieval),
+                "vector_query",
+            )
+        candidates = await fuse_candidates(candidates, lexical, id2doc, candidate_k)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pinecone query failed: {e}")
 
+    # rerank, unless the remaining budget is needed for the LLM call
+    if not rerank_fits_budget():
+        inc("rag_deadline_total", action="rerank_skipped", stage="rerank")
+        return candidates[: req.top_k]
+    # instantiate reranker from factory (falls back to dynamic)
+    reranker = make_reranker(req.reranker, req.top_k, req.reranker_model, id2doc)
+    try:
+        with span("rag.rerank"):
+            return await run_within_deadline(asyncio.to_thread(reranker.rerank, req.question, candidates), "rerank")
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        # if reranker fails, fallback to the raw candidates truncated to top_k
+        return candidates[: req.top_k]
+
+
+async def _rag(req: RagRequest) -> Dict[str, Any]:
+    # resolve the chunks file
+    chunks_path = Path(req.chunks_path)
+    if not chunks_path.exists():
+        raise HTTPException(status_code=400, detail=f"chunks.jsonl not found: {chunks_path}")
+
+    # load id->doc mapping (local)
+    id2doc = await _load_chunks(chunks_path)
+
+    # lexical lookup runs in the background while we embed + query the vector index
+    lexical = start_lexical_search(chunks_path, req.question, candidate_k_for(req.top_k)) if req.hybrid else None
+
+    # blocking stages run in worker threads, each bounded by the request deadline
+    # 1) embed the question, 2) query the vector index, 3) rerank
+    q_emb = await _embed_question(req.question)
+    matches = await _retrieve(req, chunks_path, id2doc, q_emb, lexical)
+
     if not matches:
         return {"answer": "", "sources": [], "reason": "no matches found"}
 
-    # 3) build context
-    context, sources = make_context_snippets(matches, id2doc, max_chars=req.max_context_chars)
+    # 4) build context
+    with span("rag.context"):
+        context, sources = make_context_snippets(matches, id2doc, max_chars=req.max_context_chars)
 
-    # 4) use the external prompt text and build the prompt around it
-    system_preamble = DEFAULT_SYSTEM_PROMPT.strip()
-    prompt = (
-        f"{system_preamble}\n\n"
-        f"CONTEXT:\n{context}\n\n"
-        f"QUESTION: {req.question}\n\n"
-        f"Provide a concise answer and list which sources you used."
-    )
+        # use the external prompt text and build the prompt around it
+        prompt = build_prompt(context, req.question)
 
     # 5) call the OpenAI responses API
-    if _openai_client is None:
+    if not OPENAI_API_KEY:
         raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
 
     try:
-        resp = _openai_client.responses.create(model=LLM_MODEL, input=prompt)
-
-        # Robust extraction of text from the Responses API output:
-        text_parts = []
-
-        # 1) Preferred: iterate over resp.output (may be list of objects or dicts)
-        for item in getattr(resp, "output", []) or []:
-            # item may be an SDK object or a dict
-            content = None
-            # SDK objects often expose .content
-            if hasattr(item, "content"):
-                content = item.content
-            elif isinstance(item, dict):
-                content = item.get("content")
-
-            # content might be a list of pieces (strings or dicts) or a single string
-            if isinstance(content, list):
-                for c in content:
-                    if isinstance(c, str):
-                        text_parts.append(c)
-                    elif isinstance(c, dict):
-                        # Many content dicts look like {"type":"output_text","text":"..."} or {"text":"..."}
-                        if "text" in c:
-                            text_parts.append(c["text"])
-                        else:
-                            # try common alternatives
-                            txt = c.get("string") or c.get("value")
-                            if txt:
-                                text_parts.append(txt)
-            elif isinstance(content, str):
-                text_parts.append(content)
-
-        # 2) Fallback — some SDK responses expose output_text
-        if not text_parts:
-            txt = getattr(resp, "output_text", None)
-            if isinstance(txt, str) and txt.strip():
-                text_parts.append(txt)
-
-        # 3) Final fallback — resp may be dict-like
-        if not text_parts and isinstance(resp, dict):
-            # try resp.get("output_text") or resp.get("output", [{}])[0].get("content")
-            txt = resp.get("output_text") or None
-            if txt:
-                text_parts.append(txt)
-            else:
-                out = resp.get("output")
-                if out and isinstance(out, list):
-                    first = out[0]
-                    if isinstance(first, dict):
-                        # try common nested shapes
-                        c = first.get("content")
-                        if isinstance(c, list):
-                            # pick text fields from first content item
-                            ci = c[0]
-                            if isinstance(ci, dict) and "text" in ci:
-                                text_parts.append(ci["text"])
-
-        answer_text = "\n\n".join(text_parts).strip() if text_parts else ""
+        with span("rag.llm"):
+            answer_text = await generate_answer_async(prompt)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
 
     return {"answer": answer_text, "sources": sources}
+
+
+@app.post("/chat")
+async def chat_endpoint(req: ChatRequest):
+    """
+    One turn of a multi-turn conversation (see src/pipeline/chat.py). Omit session_id to start a
+    session; pass the returned one for follow-ups. `usage` reports prompt-cache hits per turn.
+    """
+    budget_ms = RAG_DEADLINE_MS if req.deadline_ms is None else req.deadline_ms
+    with collect_timings() as timings, deadline_scope(budget_ms / 1000.0):
+        with span("chat.total"):
+            try:
+                result = await _chat(req)
+            except DeadlineExceeded as e:
+                raise HTTPException(status_code=504, detail=str(e))
+    if req.include_timings:
+        result["timings"] = {k: round(v, 3) for k, v in timings.items()}
+    return result
+
+async def _chat(req: ChatRequest) -> Dict[str, Any]:
+    chunks_path = Path(req.chunks_path)
+    if not chunks_path.exists():
+        raise HTTPException(status_code=400, detail=f"chunks.jsonl not found: {chunks_path}")
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+
+    session = _chat_sessions.get(req.session_id) if req.session_id else None
+    restarted = bool(req.session_id) and session is None  # expired, evicted or served by another worker
+    if session is not None and session.chunks_path != str(chunks_path):
+        raise HTTPException(status_code=400, detail="session belongs to a different chunks_path")
+    if session is None:
+        # always a server-minted id: an unknown client id is never adopted
+        session = _chat_sessions.create(str(chunks_path))
+        if restarted:
+            inc("chat_sessions_total", event="restarted")
+
+    async with session.lock:
+        id2doc = await _load_chunks(chunks_path)
+        q_emb = await _embed_question(req.question)
+
+        # follow-ups close to an earlier question answer from the context already in the prompt
+        turn, sim = session.closest_turn(q_emb)
+        if session.can_reuse() and sim >= CHAT_REUSE_SIMILARITY:
+            matches, sources = None, session.turns[turn]["sources"]
+        else:
+            matches = await _retrieve(req, chunks_path, id2doc, q_emb)
+            if not matches and not session.turns:
+                return {"session_id": session.id, "session_restarted": restarted, "answer": "", "sources": [],
+                        "reason": "no matches found"}
+            _, sources = make_context_snippets(matches, id2doc, max_chars=req.max_context_chars)
+
+        state = session.snapshot()
+        try:
+            with span("chat.context"):
+                match_ids = None if matches is None else [s["id"] for s in sources]
+                context = session.add_question(req.question, q_emb, match_ids, id2doc)
+            with span("rag.llm"):
+                resp = await _chat_respond(session)
+            answer = extract_answer_text(resp)
+            usage = llm_usage(resp)
+            session.add_answer(req.question, answer, sources, getattr(resp, "id", None), usage)
+        except DeadlineExceeded:
+            session.restore(state)
+            raise
+        except Exception as e:
+            session.restore(state)
+            raise HTTPException(status_code=500, detail=f"LLM call failed: {e}")
+
+    return {
+        "session_id": session.id,
+        "session_restarted": restarted,
+        "turn": len(session.turns),
+        "answer": answer,
+        "sources": sources,
+        "context": context,
+        "usage": usage,
+        "session_usage": session.usage_summary(),
+    }
+
+async def _chat_respond(session):
+    items, previous = session.request_input()
+    kwargs = dict(instructions=DEFAULT_SYSTEM_PROMPT.strip(), prompt_cache_key=f"chat-{session.id}", endpoint="chat")
+    if previous is None:
+        return await respond_async(items, **kwargs)
+    try:
+        return await respond_async(items, previous_response_id=previous, **kwargs)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        # previous response not stored (store disabled, expired) -> resend the full conversation
+        if getattr(e, "status_code", None) not in (400, 404):
+            raise
+        inc("chat_context_total", event="server_state_miss")
+        session.last_response_id = None
+        items, _ = session.request_input()
+        return await respond_async(items, **kwargs)
+
+@app.get("/chat/{session_id}")
+def chat_session(session_id: str):
+    session = _chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    return session.describe()
+
+@app.delete("/chat/{session_id}")
+def chat_session_delete(session_id: str):
+    if not _chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="session not found")
+    return {"deleted": session_id}
+
+
+@app.post("/rag/batch")
+async def rag_batch_endpoint(req: RagBatchRequest):
+    """
+    Answer many questions in one call. Streams newline-delimited JSON, one object per question
+    in completion order; use the `index` field to map results back to `questions`.
+    """
+    chunks_path = Path(req.chunks_path)
+    if not chunks_path.exists():
+        raise HTTPException(status_code=400, detail=f"chunks.jsonl not found: {chunks_path}")
+    if len(req.questions) > RAG_BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"too many questions ({len(req.questions)} > {RAG_BATCH_MAX_QUESTIONS})")
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not configured")
+    await _load_chunks(chunks_path)  # reject a bad file before streaming starts; rag_batch hits the cache
+
+    async def _stream():
+        async for item in rag_batch(
+            str(chunks_path),
+            req.questions,
+            top_k=req.top_k,
+            max_context_chars=req.max_context_chars,
+            reranker=req.reranker,
+            reranker_model=req.reranker_model,
+            hybrid=req.hybrid,
+            retrieval=req.retrieval,
+            deadline_ms=req.deadline_ms,
+        ):
+            yield json.dumps(item, default=str) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+record_import("src.api.app", time.perf_counter() - _import_t0)
@@ -0,0 +1,148 @@
+# src/api/warmup.py
+"""
+Warm-up run at API startup, so a new replica takes traffic only once the first request is fast.
+
+  WARMUP=openai,index,chunks,reranker,query   steps, run in this order ("" disables warm-up)
+    openai     import the SDK and create the clients (no request is made)
+    tokenizer  load the tiktoken encoding
+    index      open the vector index handle (Pinecone index lookup, or map the local index)
+    chunks     open chunk stores, BM25 and chapter indexes (PRELOAD_CHUNKS, default data/*/chunks.jsonl)
+    reranker   load and run the cross-encoder once (PRELOAD_RERANKER_MODEL or RERANK_CE_MODEL; skipped if unset)
+    query      embed WARMUP_QUERY and run it through vector + BM25 retrieval (no LLM call)
+  WARMUP_BLOCKING=1   finish warm-up before the server accepts connections (for platforms without a
+                      readiness probe, e.g. a Procfile dyno); by default it runs in the background and
+                      /readyz answers 503 until it is done
+  WARMUP_STRICT=1     a failed step keeps /readyz at 503 (default: reported, replica still ready)
+"""
+import os
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.telemetry.metrics import span, inc
+from src.telemetry.startup import import_timings, STARTED_AT
+
+WARMUP = [s.strip() for s in os.getenv("WARMUP", "openai,index,chunks,reranker,query").split(",") if s.strip()]
+WARMUP_BLOCKING = os.getenv("WARMUP_BLOCKING", "0").lower() not in ("0", "false", "no", "off")
+WARMUP_STRICT = os.getenv("WARMUP_STRICT", "0").lower() not in ("0", "false", "no", "off")
+WARMUP_QUERY = os.getenv("WARMUP_QUERY", "warm-up query")
+
+_state: Dict[str, Any] = {"status": "pending", "steps": {}, "seconds": None, "ready_after_s": None}
+_task: Optional[asyncio.Task] = None
+
+
+def _openai():
+    from src.embeddings.embedder import get_client
+    from src.pipeline.rag_pipeline import get_openai_client
+    if get_client() is None:
+        return "skipped: OPENAI_API_KEY not set"
+    get_openai_client()
+    get_openai_client("async")
+
+
+def _tokenizer():
+    from src.ingestion.tokenizer import Tokenizer
+    Tokenizer().count_tokens(WARMUP_QUERY)
+
+
+def _index():
+    from src.vectorstore.backend import get_vector_index, VECTOR_BACKEND
+    get_vector_index()
+    return VECTOR_BACKEND
+
+
+def _chunks():
+    from src.pipeline.rag_pipeline import preload_chunk_files
+    files = preload_chunk_files()
+    return f"{len(files)} chunk file(s), {sum(f['chunks'] for f in files)} chunks"
+
+
+def _reranker():
+    from src.pipeline.rag_pipeline import PRELOAD_RERANKER_MODEL
+    model_name = PRELOAD_RERANKER_MODEL or os.getenv("RERANK_CE_MODEL")
+    if not model_name:
+        return "skipped: no cross-encoder configured"
+    from src.reranker.cross_encoder import load_model
+    load_model(model_name).predict([(WARMUP_QUERY, WARMUP_QUERY)], show_progress_bar=False)
+    return model_name
+
+
+def _query():
+    from src.embeddings.embedder import embed_texts
+    from src.vectorstore.backend import get_vector_index
+    from src.pipeline.rag_pipeline import (
+        preload_paths, load_id_to_text_cached, retrieval_scope, dense_candidates, get_chapter_index,
+        _lexical_search, candidate_k_for,
+    )
+    paths = [p for p in preload_paths() if p.exists()]
+    if not paths:
+        return "skipped: no chunks file"
+    path, k = paths[0], candidate_k_for(5)
+    id2doc = load_id_to_text_cached(path)
+    q_emb = embed_texts([WARMUP_QUERY], 1)[0]
+    namespace, scope_filter = retrieval_scope(id2doc)
+    dense_candidates(get_vector_index(), q_emb, k, namespace, scope_filter, get_chapter_index(path), 1)
+    _lexical_search(path, WARMUP_QUERY, k)
+
+
+STEPS: Dict[str, Callable[[], Any]] = {
+    "openai": _openai,
+    "tokenizer": _tokenizer,
+    "index": _index,
+    "chunks": _chunks,
+    "reranker": _reranker,
+    "query": _query,
+}
+
+
+async def run_warmup(steps: List[str] = WARMUP):
+    """Run `steps` in order (each in a worker thread), recording duration and outcome per step."""
+    _state["status"] = "running"
+    t0 = time.perf_counter()
+    failed = False
+    for name in steps:
+        fn = STEPS.get(name)
+        if fn is None:
+            _state["steps"][name] = {"ok": False, "seconds": 0.0, "error": "unknown step"}
+            failed = True
+            continue
+        s0 = time.perf_counter()
+        try:
+            with span(f"warmup.{name}"):
+                detail = await asyncio.to_thread(fn)
+            entry = {"ok": True, "seconds": round(time.perf_counter() - s0, 4)}
+            if detail:
+                entry["detail"] = detail
+        except Exception as e:
+            failed = True
+            entry = {"ok": False, "seconds": round(time.perf_counter() - s0, 4), "error": str(e)}
+            inc("warmup_failures_total", step=name)
+            print(f"[warmup] {name} failed: {e}")
+        _state["steps"][name] = entry
+    _state["seconds"] = round(time.perf_counter() - t0, 4)
+    _state["ready_after_s"] = round(time.monotonic() - STARTED_AT, 4)
+    _state["status"] = "failed" if failed else "ready"
+    print(f"[warmup] {_state['status']} after {_state['seconds']}s: "
+          + ", ".join(f"{k}={v.get('seconds')}s" for k, v in _state["steps"].items()))
+
+
+async def start_warmup():
+    """Startup hook: run warm-up now (WARMUP_BLOCKING) or in the background."""
+    global _task
+    if not WARMUP:
+        _state.update(status="ready", seconds=0.0, ready_after_s=round(time.monotonic() - STARTED_AT, 4))
+        return
+    _task = asyncio.create_task(run_warmup())
+    if WARMUP_BLOCKING:
+        await _task
+
+
+def readiness() -> Tuple[bool, Dict[str, Any]]:
+    status = _state["status"]
+    ready = status == "ready" or (status == "failed" and not WARMUP_STRICT)
+    return ready, {"ready": ready, **_state, "imports": import_timings()}
+
+
+def health() -> Dict[str, Any]:
+    return {"status": "ok", "uptime_s": round(time.monotonic() - STARTED_AT, 3), "warmup": _state["status"],
+            "imports": import_timings()}
@@ -4,24 +4,43 @@ OpenAI v2-compatible embeddings wrapper (openai>=1.0.0 / v2.x).
 Uses environment variables:
   - OPENAI_API_KEY
   - EMBED_MODEL (defaults to text-embedding-3-small)
+  - EMBED_DIMENSIONS (optional; text-embedding-3 models can return shortened vectors,
+    e.g. 512 or 256, which cuts vector storage proportionally. Must match the index dimension.)
   - BATCH_SIZE
+  - EMBED_TIMEOUT (seconds per HTTP attempt; further capped by the request deadline, if any)
 """
 from dotenv import load_dotenv
 load_dotenv()
 import os
 import time
+import threading
 from typing import List, Iterable
-from openai import OpenAI
+
+from src.telemetry.metrics import span
+from src.telemetry.startup import lazy_import
+from src.pipeline.deadline import current_deadline, DeadlineExceeded
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+EMBED_DIMENSIONS = int(os.getenv("EMBED_DIMENSIONS", "0")) or None
 DEFAULT_BATCH = int(os.getenv("BATCH_SIZE", "64"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "30"))
 MAX_RETRIES = 3
 RETRY_BACKOFF = 2.0  # seconds, exponential
 
 _client = None
-if OPENAI_API_KEY:
-    _client = OpenAI(api_key=OPENAI_API_KEY)
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The OpenAI client, created (and the SDK imported) on first use; None without a key."""
+    global _client
+    if _client is None and OPENAI_API_KEY:
+        with _client_lock:
+            if _client is None:
+                _client = lazy_import("openai").OpenAI(api_key=OPENAI_API_KEY)
+    return _client
+
 
 def _chunk_iterable(items: Iterable, n: int):
     it = list(items)
@@ -36,15 +55,22 @@ def embed_texts(texts: List[str], batch_size: int = DEFAULT_BATCH) -> List[List[
     if not texts:
         return []
 
-    if _client is None:
+    client = get_client()
+    if client is None:
         raise RuntimeError("OPENAI_API_KEY not set in environment")
 
+    extra = {"dimensions": EMBED_DIMENSIONS} if EMBED_DIMENSIONS else {}
+    deadline = current_deadline()
     outs: List[List[float]] = []
     for batch in _chunk_iterable(texts, batch_size):
         success = False
         for attempt in range(1, MAX_RETRIES + 1):
+            if deadline is not None:
+                deadline.check("embed")
+            timeout = deadline.timeout(EMBED_TIMEOUT) if deadline is not None else EMBED_TIMEOUT
             try:
-                resp = _client.embeddings.create(model=EMBED_MODEL, input=batch)
+                with span("embedder.request"):
+                    resp = client.embeddings.create(model=EMBED_MODEL, input=batch, timeout=timeout, **extra)
                 # resp.data is a list of objects with .embedding (or ['embedding'])
                 batch_embs = [d.embedding if hasattr(d, "embedding") else d["embedding"] for d in resp.data]
                 outs.extend(batch_embs)
@@ -56,6 +82,9 @@ def embed_texts(texts: List[str], batch_size: int = DEFAULT_BATCH) -> List[List[
                     raise RuntimeError(f"[embedder] embedding failed after {MAX_RETRIES} attempts: {e}") from e
                 else:
                     wait = RETRY_BACKOFF ** (attempt - 1)
+                    if deadline is not None and deadline.remaining() <= wait:
+                        # sleeping would use up the request budget; give up now
+                        raise DeadlineExceeded("embed") from e
                     print(f"[embedder] embed attempt {attempt} failed: {e}. retrying in {wait}s")
                     time.sleep(wait)
         if not success:
@@ -0,0 +1,225 @@
+# src/pipeline/chat.py
+"""
+Multi-turn chat sessions over one chunks file, laid out for provider-side prompt caching.
+
+Every request of a session starts with the same bytes as the one before it:
+
+  instructions   DEFAULT_SYSTEM_PROMPT (identical for every session)
+  user           CONTEXT: chunks retrieved for turn 1, sorted by (page_start, chunk_index, id)
+                 QUESTION: ...
+  assistant      answer 1
+  user           ADDITIONAL CONTEXT: chunks first retrieved for turn 2 (same order)
+                 QUESTION: ...
+
+Context is only ever appended, so the provider can serve everything before the new turn from
+its prompt cache. A follow-up close to an earlier question (query-embedding cosine >=
+CHAT_REUSE_SIMILARITY) skips retrieval and reuses the context as is; otherwise only chunks not
+already in the context are added. With CHAT_SERVER_STATE=1 the request carries
+previous_response_id and only the new turn. When the context outgrows CHAT_MAX_CONTEXT_CHARS or
+the session CHAT_MAX_TURNS, it is rebuilt around the current turn's chunks (one cache miss).
+
+Sessions live in process memory (LRU, expired after CHAT_SESSION_TTL_S idle seconds). With
+several workers, route a session to one worker (sticky sessions), otherwise it restarts with
+fresh context on another worker.
+"""
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from src.telemetry.metrics import inc
+
+CHAT_SESSION_TTL_S = int(os.getenv("CHAT_SESSION_TTL_S", "1800"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+CHAT_MAX_TURNS = int(os.getenv("CHAT_MAX_TURNS", "20"))
+CHAT_MAX_CONTEXT_CHARS = int(os.getenv("CHAT_MAX_CONTEXT_CHARS", "24000"))
+CHAT_REUSE_SIMILARITY = float(os.getenv("CHAT_REUSE_SIMILARITY", "0.9"))  # > 1 disables reuse
+# send previous_response_id + the new turn instead of the whole conversation (needs stored responses)
+CHAT_SERVER_STATE = os.getenv("CHAT_SERVER_STATE", "1").lower() not in ("0", "false", "no", "off")
+
+ANSWER_INSTRUCTION = "Provide a concise answer and cite the [S#] sources you used."
+_USAGE_KEYS = ("input_tokens", "cached_tokens", "output_tokens")
+
+
+def _order_key(cid: str, doc: Mapping[str, Any]) -> Tuple[int, int, str]:
+    ps, ci = doc.get("page_start"), doc.get("chunk_index")
+    return (ps if isinstance(ps, int) else 1 << 30, ci if isinstance(ci, int) else 1 << 30, cid)
+
+
+def _format_chunk(n: int, doc: Mapping[str, Any]) -> str:
+    text = (doc.get("text") or "").replace("\n", " ")
+    if len(text) > 1200:
+        text = text[:1200] + " ..."
+    return f"[S{n}] (page {doc.get('page_start')}-{doc.get('page_end')}, chunk {doc.get('chunk_index')}):\n{text}\n"
+
+
+class ChatSession:
+    """Conversation state for one session; the Responses API input is `items`, append-only."""
+
+    def __init__(self, session_id: str, chunks_path: str):
+        self.id = session_id
+        self.chunks_path = chunks_path
+        self.created_at = self.updated_at = time.time()
+        self.lock = asyncio.Lock()  # one turn at a time
+        self.context_ids: List[str] = []  # chunk ids in prompt order; [S#] = position + 1
+        self.context_chars = 0
+        self.items: List[Dict[str, str]] = []
+        self.turns: List[Dict[str, Any]] = []
+        self.query_embs: List[np.ndarray] = []
+        self.last_response_id: Optional[str] = None
+        self.sent_items = 0  # items covered by last_response_id
+        self.rollovers = 0
+        self.usage = {k: 0 for k in _USAGE_KEYS}
+
+    # -- state snapshots, so a failed turn leaves the session as it was
+    def snapshot(self) -> Dict[str, Any]:
+        state = {k: v for k, v in vars(self).items() if k != "lock"}
+        for k in ("context_ids", "items", "turns", "query_embs"):
+            state[k] = list(state[k])
+        state["usage"] = dict(self.usage)
+        return state
+
+    def restore(self, state: Dict[str, Any]):
+        vars(self).update(state)
+
+    def closest_turn(self, q_emb) -> Tuple[int, float]:
+        """
+        (turn index, cosine) of the earlier question closest to `q_emb`, among turns whose sources
+        are all still in the context (a rollover drops older turns' chunks); (-1, 0.0) if none.
+        """
+        have = set(self.context_ids)
+        turns = [i for i, t in enumerate(self.turns[:len(self.query_embs)])
+                 if all(s["id"] in have for s in t["sources"])]
+        if not turns:
+            return -1, 0.0
+        q = np.asarray(q_emb, dtype=np.float32)
+        m = np.stack([self.query_embs[i] for i in turns])
+        sims = (m @ q) / np.maximum(np.linalg.norm(m, axis=1) * np.linalg.norm(q), 1e-12)
+        j = int(np.argmax(sims))
+        return turns[j], float(sims[j])
+
+    def can_reuse(self) -> bool:
+        """False once the next turn forces a rollover, which needs freshly retrieved chunks."""
+        return 0 < len(self.turns) < CHAT_MAX_TURNS
+
+    def _chunks_block(self, ids: List[str], id2doc: Mapping[str, Dict[str, Any]]) -> str:
+        parts = []
+        for cid in ids:
+            self.context_ids.append(cid)
+            block = _format_chunk(len(self.context_ids), id2doc[cid])
+            self.context_chars += len(block)
+            parts.append(block)
+        return "\n".join(parts)
+
+    def _rebuild(self, ids: List[str], id2doc: Mapping[str, Dict[str, Any]], keep_turns: int):
+        """Restart the prompt around `ids`, keeping the last `keep_turns` question/answer pairs."""
+        self.context_ids, self.context_chars, self.items = [], 0, []
+        self.last_response_id, self.sent_items = None, 0
+        self.rollovers += 1
+        inc("chat_context_total", event="rollover")
+        if ids:
+            self.items.append({"role": "user", "content": "CONTEXT:\n" + self._chunks_block(ids, id2doc)})
+        for t in self.turns[len(self.turns) - keep_turns:] if keep_turns else []:
+            self.items.append({"role": "user", "content": f"QUESTION: {t['question']}"})
+            self.items.append({"role": "assistant", "content": t["answer"]})
+
+    def add_question(self, question: str, q_emb, match_ids: Optional[List[str]],
+                     id2doc: Mapping[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Append the user turn. `match_ids` are this turn's retrieved chunks, or None when the
+        context is reused. Returns {reused, added, chunks, rollover} for the response.
+        """
+        reused = match_ids is None
+        ids = [] if reused else [m for m in dict.fromkeys(match_ids) if m in id2doc]
+        have = set(self.context_ids)
+        new = sorted((m for m in ids if m not in have), key=lambda m: _order_key(m, id2doc[m]))
+        added_chars = sum(len(_format_chunk(0, id2doc[m])) for m in new)
+        rollover = bool(self.turns) and (
+            self.context_chars + added_chars > CHAT_MAX_CONTEXT_CHARS or len(self.turns) >= CHAT_MAX_TURNS
+        )
+        if rollover:
+            self._rebuild(sorted(ids, key=lambda m: _order_key(m, id2doc[m])), id2doc, keep_turns=CHAT_MAX_TURNS // 2)
+            added, new = len(ids), []
+        else:
+            added = len(new)
+        header = "CONTEXT" if not self.context_ids else "ADDITIONAL CONTEXT"
+        content = f"{header}:\n{self._chunks_block(new, id2doc)}\n" if new else ""
+        content += f"QUESTION: {question}\n\n{ANSWER_INSTRUCTION}"
+        self.items.append({"role": "user", "content": content})
+        self.query_embs.append(np.asarray(q_emb, dtype=np.float32))
+        inc("chat_context_total", event="reused" if reused else "retrieved")
+        inc("chat_context_chunks_total", added, event="added")
+        return {"reused": reused, "added": added, "chunks": len(self.context_ids), "rollover": rollover}
+
+    def request_input(self) -> Tuple[List[Dict[str, str]], Optional[str]]:
+        """(input items, previous_response_id) for the pending turn."""
+        if CHAT_SERVER_STATE and self.last_response_id and self.sent_items <= len(self.items):
+            return self.items[self.sent_items:], self.last_response_id
+        return list(self.items), None
+
+    def add_answer(self, question: str, answer: str, sources: List[Dict[str, Any]],
+                   response_id: Optional[str], usage: Dict[str, Any]):
+        self.items.append({"role": "assistant", "content": answer})
+        self.last_response_id = response_id
+        self.sent_items = len(self.items)
+        self.turns.append({"question": question, "answer": answer, "sources": sources, "usage": usage})
+        for k in _USAGE_KEYS:
+            self.usage[k] += int(usage.get(k) or 0)
+        self.updated_at = time.time()
+
+    def usage_summary(self) -> Dict[str, Any]:
+        u = dict(self.usage)
+        u["cached_ratio"] = round(u["cached_tokens"] / u["input_tokens"], 4) if u["input_tokens"] else 0.0
+        return u
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "chunks_path": self.chunks_path,
+            "turns": [{"question": t["question"], "answer": t["answer"], "usage": t["usage"]} for t in self.turns],
+            "context_ids": list(self.context_ids),
+            "rollovers": self.rollovers,
+            "usage": self.usage_summary(),
+        }
+
+
+class SessionStore:
+    """In-process LRU of chat sessions with idle expiry."""
+
+    def __init__(self, max_sessions: int = CHAT_MAX_SESSIONS, ttl_s: int = CHAT_SESSION_TTL_S):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            s = self._sessions.get(session_id)
+            if s is None:
+                return None
+            if self.ttl_s > 0 and time.time() - s.updated_at > self.ttl_s:
+                del self._sessions[session_id]
+                inc("chat_sessions_total", event="expired")
+                return None
+            self._sessions.move_to_end(session_id)
+            return s
+
+    def create(self, chunks_path: str) -> ChatSession:
+        """New session under a fresh random id."""
+        s = ChatSession(uuid.uuid4().hex, chunks_path)
+        with self._lock:
+            self._sessions[s.id] = s
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                inc("chat_sessions_total", event="evicted")
+        inc("chat_sessions_total", event="created")
+        return s
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
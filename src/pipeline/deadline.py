@@ -0,0 +1,168 @@
+# src/pipeline/deadline.py
+"""
+Per-request deadlines and hedged calls.
+
+  with deadline_scope(20.0) as dl:          # seconds; visible to every stage via a ContextVar,
+      ...                                   # including code run through asyncio.to_thread
+      emb = await run_within_deadline(asyncio.to_thread(embed_texts, [q]), "embed")
+
+Stages read `current_deadline()` to size their own timeouts (e.g. the embedder caps each HTTP
+attempt and stops retrying when the budget is gone). `hedged()` races a second copy of a slow
+call after a delay and cancels the loser; `LatencyWindow` supplies that delay from recent p95s.
+"""
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from src.telemetry.metrics import inc
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str):
+        if self.expired:
+            inc("rag_deadline_total", action="exceeded", stage=stage)
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Remaining budget, optionally capped (for per-attempt HTTP timeouts)."""
+        r = self.remaining()
+        return min(r, cap) if cap is not None else r
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("rag_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Install a deadline for the enclosed block; seconds <= 0 or None means no deadline."""
+    dl = Deadline(seconds) if seconds and seconds > 0 else None
+    token = _current.set(dl)
+    try:
+        yield dl
+    finally:
+        _current.reset(token)
+
+
+async def run_within_deadline(aw: Awaitable, stage: str) -> Any:
+    """
+    Await `aw`, giving up when the current deadline passes. Work handed to a thread keeps
+    running in the background, but the request (and the event loop) is released.
+    """
+    dl = current_deadline()
+    if dl is None:
+        return await aw
+    dl.check(stage)
+    try:
+        return await asyncio.wait_for(aw, timeout=dl.remaining())
+    except asyncio.TimeoutError:
+        inc("rag_deadline_total", action="exceeded", stage=stage)
+        raise DeadlineExceeded(stage) from None
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies (seconds) for quantile estimates."""
+
+    def __init__(self, size: int = 256):
+        self._values = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._values.append(seconds)
+
+    def quantile(self, q: float, default: float, min_samples: int = 20) -> float:
+        with self._lock:
+            values = sorted(self._values)
+        if len(values) < min_samples:
+            return default
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# transient failures worth a second attempt; matched by class name so no SDK import is needed
+# (openai.APIConnectionError / APITimeoutError, httpx.TransportError and subclasses)
+_TRANSIENT_ERRORS = ("APIConnectionError", "TransportError")
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for timeouts, connection errors and HTTP 408/409/429/5xx; False for 4xx and local errors."""
+    if isinstance(exc, DeadlineExceeded):
+        return False  # no budget left for another attempt
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return any(c.__name__ in _TRANSIENT_ERRORS for c in type(exc).__mro__)
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    delay: float,
+    hedge_call: Optional[Callable[[], Awaitable[Any]]] = None,
+    name: str = "call",
+) -> Tuple[Any, str]:
+    """
+    Run `call()`; if it is still pending after `delay` seconds (or failed before that with a
+    retryable error, see is_retryable), start `hedge_call()` (default: `call` again) and return
+    whichever succeeds first as (result, "primary" | "hedge"). Non-retryable errors (e.g. a 400
+    or 404) are raised at once, from either call. The loser is cancelled, as are both if the
+    caller is. Counts hedge_requests_total{call=name, outcome=not_needed|not_retryable|primary_won|hedge_won}.
+    """
+    tasks = {asyncio.ensure_future(call()): "primary"}
+    try:
+        primary = next(iter(tasks))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            exc = primary.exception()
+            if exc is None:
+                inc("hedge_requests_total", call=name, outcome="not_needed")
+                return primary.result(), "primary"
+            if not is_retryable(exc):
+                inc("hedge_requests_total", call=name, outcome="not_retryable")
+                raise exc
+        tasks[asyncio.ensure_future((hedge_call or call)())] = "hedge"
+
+        last_exc: Optional[BaseException] = primary.exception() if primary.done() else None
+        pending = {t for t in tasks if not t.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    inc("hedge_requests_total", call=name, outcome=f"{tasks[t]}_won")
+                    return t.result(), tasks[t]
+                last_exc = t.exception()
+                if not is_retryable(last_exc):
+                    inc("hedge_requests_total", call=name, outcome="not_retryable")
+                    raise last_exc
+        raise last_exc
+    finally:
+        for t in tasks:
+            if not t.done():
+                t.cancel()
@@ -1,6 +1,6 @@
 # src/pipeline/index_pipeline.py
 """
-Read chunks.jsonl -> embed -> upsert to Pinecone.
+Read chunks.jsonl -> embed -> upsert to the vector index (Pinecone, or local with VECTOR_BACKEND=local).
 Usage:
   poetry run python -m src.pipeline.index_pipeline data/<slug>/chunks.jsonl
 """
@@ -14,7 +14,11 @@ from pathlib import Path
 from typing import List, Dict
 
 from src.embeddings.embedder import embed_texts
-from src.vectorstore.pinecone_store import get_pinecone_client, get_or_create_index, upsert_embeddings
+from src.vectorstore.pinecone_store import upsert_embeddings, book_namespace
+from src.vectorstore.backend import get_vector_index, persist_vector_index, VECTOR_BACKEND
+from src.vectorstore.bm25_index import build_bm25_for_chunks
+from src.vectorstore.chapter_index import build_chapter_index_for_chunks
+from src.vectorstore.chunk_store import build_chunk_store
 
 BATCH_SIZE = int(os.getenv("BATCH_SIZE", "64"))
 NAMESPACE = os.getenv("PINECONE_NAMESPACE", "default")
@@ -48,25 +52,40 @@ def run_index(chunks_jsonl: str, namespace: str = NAMESPACE, batch_size: int = B
         }
         metas.append(meta)
 
+    # lexical side of hybrid retrieval and the shared chunk store the API maps: cheap, local, no API calls
+    build_bm25_for_chunks(p)
+    build_chunk_store(p)
+
     print(f"[indexer] embedding {len(texts)} chunks (batch_size={batch_size})...")
     # produce embeddings in batches
     embeddings = embed_texts(texts, batch_size=batch_size)
     if not embeddings:
         raise SystemExit("[indexer] no embeddings produced; check OPENAI_API_KEY and network")
 
-    # init pinecone and index
-    pc = get_pinecone_client()
-    index = get_or_create_index(pc)
+    # chapter vectors for two-level retrieval (uses chapters.json from ingest, no extra API calls)
+    build_chapter_index_for_chunks(p, docs, embeddings)
+
+    # init the vector index
+    index = get_vector_index()
+
+    # group by target namespace (one per book when BOOK_SCOPE=namespace, else just `namespace`)
+    groups: Dict[str, List[int]] = {}
+    for i, m in enumerate(metas):
+        groups.setdefault(book_namespace(m.get("book_slug"), default=namespace), []).append(i)
 
     # upsert in batches
     total = len(embeddings)
-    for i in range(0, total, batch_size):
-        emb_batch = embeddings[i:i+batch_size]
-        meta_batch = metas[i:i+batch_size]
-        print(f"[indexer] upserting batch {i}-{i+len(emb_batch)-1} ({len(emb_batch)} vectors)...")
-        upsert_embeddings(index, emb_batch, meta_batch, namespace=namespace)
+    for ns, positions in groups.items():
+        for j in range(0, len(positions), batch_size):
+            pos = positions[j:j+batch_size]
+            emb_batch = [embeddings[k] for k in pos]
+            meta_batch = [metas[k] for k in pos]
+            print(f"[indexer] upserting batch {j}-{j+len(emb_batch)-1} ({len(emb_batch)} vectors) to '{ns}'...")
+            upsert_embeddings(index, emb_batch, meta_batch, namespace=ns)
 
-    print(f"[indexer] Done. Upserted {total} vectors into Pinecone index '{os.getenv('PINECONE_INDEX', 'unknown')}' (namespace='{namespace}').")
+    persist_vector_index(index)
+    target = "local index" if VECTOR_BACKEND == "local" else f"Pinecone index '{os.getenv('PINECONE_INDEX', 'unknown')}'"
+    print(f"[indexer] Done. Upserted {total} vectors into {target} (namespaces={sorted(groups)}).")
 
 if __name__ == "__main__":
     import sys
@@ -1,7 +1,7 @@
 # src/pipeline/query_pipeline.py
 """
 Simple retrieval demo:
-  python -m src.pipeline.query_pipeline <chunks.jsonl> "<your question>" [top_k]
+  python -m src.pipeline.query_pipeline <chunks.jsonl> "<your question>" [top_k] [reranker]
 
 Example:
   poetry run python -m src.pipeline.query_pipeline \
@@ -14,8 +14,10 @@ import json
 from pathlib import Path
 
 from src.embeddings.embedder import embed_texts
-from src.vectorstore.pinecone_store import get_pinecone_client, get_or_create_index, query_index
+from src.vectorstore.pinecone_store import query_index
+from src.vectorstore.backend import get_vector_index
 from src.reranker import get_reranker
+from src.pipeline.rag_pipeline import candidate_k_for
 
 def load_id_to_text(path: Path):
     d = {}
@@ -27,7 +29,7 @@ def load_id_to_text(path: Path):
             d[j["id"]] = j
     return d
 
-def run_query(chunks_jsonl: str, question: str, top_k: int = 5):
+def run_query(chunks_jsonl: str, question: str, top_k: int = 5, reranker_name: str = "dynamic"):
     path = Path(chunks_jsonl)
     if not path.exists():
         raise SystemExit(f"Chunks file not found: {path}")
@@ -36,15 +38,19 @@ def run_query(chunks_jsonl: str, question: str, top_k: int = 5):
     # 1) embed the question
     q_emb = embed_texts([question], batch_size=1)[0]
 
-    # 2) init pinecone and get index
-    pc = get_pinecone_client()
-    index = get_or_create_index(pc)
+    # 2) get the vector index (Pinecone or local, see VECTOR_BACKEND)
+    index = get_vector_index()
 
-    # 3) query
-    matches = query_index(index, q_emb, top_k=top_k)
+    # 3) query a widened candidate window (RERANK_CANDIDATE_K), same as /rag
+    candidate_k = candidate_k_for(top_k)
+    candidates = query_index(index, q_emb, top_k=candidate_k)
 
-    # 4) print results with local chunk text
-    print(f"Top {top_k} results for: {question}\n")
+    # 4) rerank
+    reranker = get_reranker(reranker_name, max_k=top_k)
+    matches = reranker.rerank(question, candidates)
+
+    # 5) print results with local chunk text
+    print(f"Top {top_k} results for: {question} (reranker={reranker_name})\n")
     for i, m in enumerate(matches, start=1):
         mid = m.id if hasattr(m, "id") else m["id"]
         score = m.score if hasattr(m, "score") else m["score"]
@@ -66,11 +72,4 @@ if __name__ == "__main__":
     question = sys.argv[2]
     top_k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
     reranker_name = sys.argv[4] if len(sys.argv) > 4 else "dynamic"
-    reranker = get_reranker(reranker_name, max_k=top_k)
-    # adjust candidate window if reranker is cross_encoder
-    candidate_k = 50 if reranker_name.lower().startswith("cross") else top_k
-    # embed & query (reuse existing code flow)...
-    # after obtaining matches from query_index(..., top_k=candidate_k) do:
-    matches = reranker.rerank(question, matches)
-    # then print results from matches as before
-    run_query(chunks, question, top_k=top_k)
+    run_query(chunks, question, top_k=top_k, reranker_name=reranker_name)
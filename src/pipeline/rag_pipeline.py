@@ -0,0 +1,643 @@
+# src/pipeline/rag_pipeline.py
+"""
+Retrieval + generation steps shared by the /rag endpoints.
+
+Python API for bulk question answering:
+
+  import asyncio
+  from src.pipeline.rag_pipeline import rag_batch
+
+  async def main():
+      async for item in rag_batch("data/<slug>/chunks.jsonl", ["q1", "q2"]):
+          print(item["index"], item.get("answer") or item.get("error"))
+
+  asyncio.run(main())
+
+or the blocking wrapper `answer_questions(...)`, which returns results in input order.
+"""
+from dotenv import load_dotenv
+load_dotenv()
+import os
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Any, AsyncIterator, Mapping, Optional, Tuple, Union
+
+from src.embeddings.embedder import embed_texts, DEFAULT_BATCH
+from src.vectorstore.pinecone_store import query_index, book_scope
+from src.vectorstore.backend import get_vector_index, VECTOR_BACKEND
+from src.reranker import get_reranker, reciprocal_rank_fusion
+from src.vectorstore.bm25_index import get_bm25_index
+from src.vectorstore.chapter_index import get_chapter_index, ChapterIndex
+from src.vectorstore.chunk_store import open_chunk_store
+from src.llm.prompt import DEFAULT_SYSTEM_PROMPT
+from src.telemetry.metrics import span, inc
+from src.pipeline.deadline import current_deadline, deadline_scope, run_within_deadline, hedged, LatencyWindow
+from src.telemetry.startup import lazy_import
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5")  # change in .env if you have a different name
+
+# tail-latency controls for /rag (see src/pipeline/deadline.py)
+RAG_DEADLINE_MS = int(os.getenv("RAG_DEADLINE_MS", "20000"))   # end-to-end budget per request; 0 = none
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))            # seconds, cap per LLM HTTP call
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1").lower() not in ("0", "false", "no", "off")
+LLM_HEDGE_MODEL = os.getenv("LLM_HEDGE_MODEL") or LLM_MODEL    # e.g. a faster model for the second request
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_DELAY_MS = int(os.getenv("LLM_HEDGE_DELAY_MS", "8000"))  # used until enough latencies are observed
+# skip reranking when less than this remains after retrieval (0 = rolling LLM p50 + 500 ms)
+RERANK_MIN_REMAINING_MS = int(os.getenv("RERANK_MIN_REMAINING_MS", "0"))
+
+# bulk answering knobs
+BATCH_QUERY_CONCURRENCY = int(os.getenv("BATCH_QUERY_CONCURRENCY", "8"))  # parallel vector queries
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))      # parallel LLM calls
+CHUNKS_CACHE_SIZE = int(os.getenv("CHUNKS_CACHE_SIZE", "4"))              # chunks files kept parsed in memory
+# "mmap": serve chunks from a memory-mapped chunks.store shared by all workers; "dict": parse per process
+CHUNK_STORE = os.getenv("CHUNK_STORE", "mmap").lower()
+
+# hybrid retrieval: BM25 (bm25.idx next to chunks.jsonl) fused with dense results via RRF
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1").lower() not in ("0", "false", "no", "off")
+RRF_K = int(os.getenv("RRF_K", "60"))
+# two-level retrieval: pick the closest chapters (chapter_index.npz next to chunks.jsonl), then
+# search only their chunks. "auto" uses it when a chapter index exists, "flat" never does.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "auto").lower()   # auto | chapters | flat
+CHAPTER_TOP_N = int(os.getenv("CHAPTER_TOP_N", "3"))
+CHAPTER_MIN_COUNT = int(os.getenv("CHAPTER_MIN_COUNT", "4"))    # fewer chapters than this -> flat search
+# read-only data opened by preload_data_plane() before workers fork (gunicorn.conf.py)
+PRELOAD_CHUNKS = [p.strip() for p in os.getenv("PRELOAD_CHUNKS", "").split(",") if p.strip()]  # default: data/*/chunks.jsonl
+PRELOAD_RERANKER_MODEL = os.getenv("PRELOAD_RERANKER_MODEL", "")  # cross-encoder weights to load up front
+_lexical_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LEXICAL_WORKERS", "4")), thread_name_prefix="bm25")
+
+# OpenAI clients are created on first use (the SDK import alone takes most of a cold start)
+_openai_clients: Dict[str, Any] = {}
+_openai_clients_lock = threading.Lock()
+
+
+def get_openai_client(kind: str = "sync"):
+    """Process-wide OpenAI (kind="sync") or AsyncOpenAI (kind="async") client; None without a key."""
+    if not OPENAI_API_KEY:
+        return None
+    client = _openai_clients.get(kind)
+    if client is None:
+        with _openai_clients_lock:
+            client = _openai_clients.get(kind)
+            if client is None:
+                openai = lazy_import("openai")
+                cls = openai.AsyncOpenAI if kind == "async" else openai.OpenAI
+                client = _openai_clients[kind] = cls(api_key=OPENAI_API_KEY)
+    return client
+
+# recent successful LLM call latencies; drive the hedge delay and the rerank budget check
+_llm_latency = LatencyWindow()
+
+
+def load_id_to_text(path: Path) -> Dict[str, Dict[str, Any]]:
+    """id -> chunk dict; raises ValueError if `path` is not a chunks.jsonl."""
+    d = {}
+    with path.open("rb") as fh:
+        for n, line in enumerate(fh, start=1):
+            if not line.strip():
+                continue
+            try:
+                j = json.loads(line)
+                d[j["id"]] = j
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"{path}: line {n} is not a chunk record") from None
+    return d
+
+
+_chunks_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_chunks_cache_lock = threading.Lock()
+
+
+def load_id_to_text_cached(path: Path) -> Mapping[str, Dict[str, Any]]:
+    """
+    Like load_id_to_text, but keeps the last CHUNKS_CACHE_SIZE files open. With CHUNK_STORE=mmap
+    (default) the mapping is a ChunkStore over the shared chunks.store file rather than a dict,
+    when an up-to-date one was built (by the indexer); otherwise chunks.jsonl is parsed.
+    An entry is reused only while the file's mtime and size are unchanged.
+    """
+    key = str(path.resolve())
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _chunks_cache_lock:
+        hit = _chunks_cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _chunks_cache.move_to_end(key)
+            inc("rag_cache_requests_total", cache="chunks", result="hit")
+            return hit[1]
+    inc("rag_cache_requests_total", cache="chunks", result="miss")
+    with span("rag.load_chunks.parse"):
+        id2doc = open_chunk_store(path) if CHUNK_STORE == "mmap" else None
+        if id2doc is None:
+            id2doc = load_id_to_text(path)
+    if CHUNKS_CACHE_SIZE > 0:
+        with _chunks_cache_lock:
+            _chunks_cache[key] = (stamp, id2doc)
+            _chunks_cache.move_to_end(key)
+            while len(_chunks_cache) > CHUNKS_CACHE_SIZE:
+                _chunks_cache.popitem(last=False)
+                inc("rag_cache_evictions_total", cache="chunks")
+    return id2doc
+
+
+def preload_paths(chunks_paths: Optional[List[str]] = None) -> List[Path]:
+    """chunks files to open ahead of traffic: `chunks_paths`, else PRELOAD_CHUNKS, else data/*/chunks.jsonl."""
+    return [Path(p) for p in (chunks_paths or PRELOAD_CHUNKS)] or sorted(Path("data").glob("*/chunks.jsonl"))
+
+
+def preload_chunk_files(chunks_paths: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Open the chunk store, BM25 and chapter index of each preload path; returns what was found."""
+    out = []
+    for p in preload_paths(chunks_paths):
+        if not p.exists():
+            print(f"[rag_pipeline] preload: {p} not found, skipped")
+            continue
+        id2doc = load_id_to_text_cached(p)
+        bm25 = get_bm25_index(p)
+        chapters = get_chapter_index(p)
+        out.append({"path": str(p), "chunks": len(id2doc), "bm25": bm25 is not None,
+                    "chapters": len(chapters) if chapters is not None else 0})
+    return out
+
+
+def preload_data_plane(chunks_paths: Optional[List[str]] = None, reranker_model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Open everything a request reads but never writes: chunk stores, BM25 and chapter indexes,
+    a local vector index, and optionally cross-encoder weights. The large parts are memory-mapped
+    files shared through the page cache; run in a preloading master, the rest is inherited
+    copy-on-write by every worker. Opens no network connections, so it is safe before fork.
+    """
+    loaded: Dict[str, Any] = {"chunks": [], "vector_index": None, "reranker_model": None}
+    with span("rag.preload"):
+        loaded["chunks"] = preload_chunk_files(chunks_paths)
+        if VECTOR_BACKEND == "local":  # Pinecone handles hold sockets; open those per worker
+            index = get_vector_index()
+            loaded["vector_index"] = index.memory_usage()
+        model = reranker_model if reranker_model is not None else PRELOAD_RERANKER_MODEL
+        if model:
+            from src.reranker.cross_encoder import load_model
+            load_model(model)
+            loaded["reranker_model"] = model
+    print(f"[rag_pipeline] preloaded {len(loaded['chunks'])} chunk file(s), vector index: "
+          f"{'local' if loaded['vector_index'] else 'per worker'}, reranker: {loaded['reranker_model'] or 'none'}")
+    return loaded
+
+
+def retrieval_scope(id2doc: Mapping[str, Dict[str, Any]]) -> Tuple[Union[str, List[str]], Optional[Dict[str, Any]]]:
+    """
+    (namespace, metadata filter) restricting vector search to the book(s) in this chunks file,
+    so the candidate window is not spent on vectors we have no local text for.
+    """
+    slugs = getattr(id2doc, "book_slugs", None)  # ChunkStore keeps them in its header
+    if slugs is None:
+        slugs = [d.get("book_slug") for d in id2doc.values()]
+    return book_scope(slugs)
+
+
+def candidate_k_for(top_k: int) -> int:
+    # request a wider candidate set; default to 50 for reranking
+    return max(top_k, int(os.getenv("RERANK_CANDIDATE_K", "50")))
+
+
+def make_reranker(name: str, top_k: int, model_name: Optional[str] = None, id2doc: Optional[Dict[str, Dict[str, Any]]] = None):
+    # cross-encoder based rerankers read passage text from the local chunks (not stored in Pinecone)
+    text_lookup = (lambda mid: (id2doc.get(mid) or {}).get("text")) if id2doc is not None else None
+    try:
+        return get_reranker(name, max_k=top_k, model_name=(model_name or os.getenv("RERANK_CE_MODEL")), text_lookup=text_lookup)
+    except Exception as e:
+        # fallback to dynamic reranker if factory fails
+        return get_reranker("dynamic", max_k=top_k)
+
+
+def _and_filters(*filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    parts = [f for f in filters if f]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else {"$and": parts}
+
+
+def dense_candidates(
+    index,
+    q_emb: List[float],
+    k: int,
+    namespace: Union[str, List[str]],
+    scope_filter: Optional[Dict[str, Any]],
+    chapters: Optional[ChapterIndex] = None,
+    min_matches: int = 1,
+    mode: Optional[str] = None,
+) -> List[Any]:
+    """
+    Vector candidates for one query. With a chapter index (see get_chapter_index) the closest
+    CHAPTER_TOP_N chapters are chosen first and the search is restricted to chunks inside them;
+    if that yields fewer than `min_matches` candidates it falls back to a flat search.
+    """
+    mode = (mode or RETRIEVAL_MODE).lower()
+    if mode != "flat":
+        if chapters is not None and len(chapters) >= (1 if mode == "chapters" else CHAPTER_MIN_COUNT):
+            with span("rag.chapter_select"):
+                chosen = chapters.select(q_emb, CHAPTER_TOP_N)
+            if chosen:
+                flt = _and_filters(scope_filter, chapters.page_filter(chosen))
+                matches = list(query_index(index, q_emb, top_k=k, namespace=namespace, filter=flt))
+                if len(matches) >= min_matches:
+                    inc("rag_retrieval_total", mode="chapters")
+                    return matches
+                inc("rag_retrieval_total", mode="chapters_fallback")
+    inc("rag_retrieval_total", mode="flat")
+    return list(query_index(index, q_emb, top_k=k, namespace=namespace, filter=scope_filter))
+
+
+def _lexical_search(chunks_path: Path, question: str, k: int):
+    idx = get_bm25_index(chunks_path)
+    if idx is None:
+        return []
+    return idx.search(question, top_k=k)
+
+
+def start_lexical_search(chunks_path: Path, question: str, k: int) -> Optional[Future]:
+    """
+    Kick off the BM25 lookup in the background so it overlaps embedding + the vector query.
+    Returns None when hybrid search is disabled.
+    """
+    if not HYBRID_SEARCH:
+        return None
+    ctx = contextvars.copy_context()  # keep per-request timings
+    return _lexical_pool.submit(ctx.run, _lexical_search, chunks_path, question, k)
+
+
+async def fuse_candidates(dense: List[Any], lexical: Optional[Future], id2doc, top_n: int) -> List[Any]:
+    """
+    Fuse dense candidates with the lexical hits (if any) using reciprocal rank fusion. Waits for
+    the lookup without blocking the event loop; past the deadline, dense results are used alone.
+    """
+    if lexical is None:
+        return dense
+    dl = current_deadline()
+    try:
+        hits = await asyncio.wait_for(asyncio.wrap_future(lexical), dl.remaining() if dl is not None else None)
+    except asyncio.TimeoutError:
+        inc("rag_deadline_total", action="lexical_skipped", stage="lexical")
+        print("[rag] lexical search timed out, using dense results only")
+        return dense
+    except Exception as e:
+        print(f"[rag] lexical search failed, using dense results only: {e}")
+        return dense
+    if not hits:
+        return dense
+    with span("rag.fusion"):
+        return reciprocal_rank_fusion(dense, hits, id2doc, k=RRF_K, top_n=top_n)
+
+
+def make_context_snippets(matches, id2doc, max_chars: int):
+    """
+    Build a context by concatenating retrieved chunks until max_chars reached.
+    Returns the context string and a list of source metadata.
+    """
+    parts = []
+    sources = []
+    chars = 0
+    for m in matches:
+        mid = m.id if hasattr(m, "id") else m["id"]
+        meta = m.metadata if hasattr(m, "metadata") else m["metadata"]
+        doc = id2doc.get(mid)
+        if not doc:
+            # vector from a chunk we have no local text for (e.g. another book); nothing to cite
+            continue
+        snippet = doc["text"]
+        snippet = snippet.replace("\n", " ")
+        # shorten chunk to avoid huge context
+        if len(snippet) > 1200:
+            snippet = snippet[:1200] + " ..."
+
+        if chars + len(snippet) > max_chars and parts:
+            break
+        parts.append(f"Source (page {meta.get('page_start')}-{meta.get('page_end')}, chunk {meta.get('chunk_index')}):\n{snippet}\n")
+        sources.append({"id": mid, "score": m.score if hasattr(m, "score") else m["score"], "meta": meta})
+        chars += len(snippet)
+    return "\n\n".join(parts), sources
+
+
+def build_prompt(context: str, question: str) -> str:
+    # use the external prompt text and build the prompt around it
+    system_preamble = DEFAULT_SYSTEM_PROMPT.strip()
+    return (
+        f"{system_preamble}\n\n"
+        f"CONTEXT:\n{context}\n\n"
+        f"QUESTION: {question}\n\n"
+        f"Provide a concise answer and list which sources you used."
+    )
+
+
+def extract_answer_text(resp) -> str:
+    """Robust extraction of text from the Responses API output."""
+    text_parts = []
+
+    # 1) Preferred: iterate over resp.output (may be list of objects or dicts)
+    for item in getattr(resp, "output", []) or []:
+        # item may be an SDK object or a dict
+        content = None
+        # SDK objects often expose .content
+        if hasattr(item, "content"):
+            content = item.content
+        elif isinstance(item, dict):
+            content = item.get("content")
+
+        # content might be a list of pieces (strings or dicts) or a single string
+        if isinstance(content, list):
+            for c in content:
+                if isinstance(c, str):
+                    text_parts.append(c)
+                elif isinstance(c, dict):
+                    # Many content dicts look like {"type":"output_text","text":"..."} or {"text":"..."}
+                    if "text" in c:
+                        text_parts.append(c["text"])
+                    else:
+                        # try common alternatives
+                        txt = c.get("string") or c.get("value")
+                        if txt:
+                            text_parts.append(txt)
+        elif isinstance(content, str):
+            text_parts.append(content)
+
+    # 2) Fallback — some SDK responses expose output_text
+    if not text_parts:
+        txt = getattr(resp, "output_text", None)
+        if isinstance(txt, str) and txt.strip():
+            text_parts.append(txt)
+
+    # 3) Final fallback — resp may be dict-like
+    if not text_parts and isinstance(resp, dict):
+        # try resp.get("output_text") or resp.get("output", [{}])[0].get("content")
+        txt = resp.get("output_text") or None
+        if txt:
+            text_parts.append(txt)
+        else:
+            out = resp.get("output")
+            if out and isinstance(out, list):
+                first = out[0]
+                if isinstance(first, dict):
+                    # try common nested shapes
+                    c = first.get("content")
+                    if isinstance(c, list):
+                        # pick text fields from first content item
+                        ci = c[0]
+                        if isinstance(ci, dict) and "text" in ci:
+                            text_parts.append(ci["text"])
+
+    return "\n\n".join(text_parts).strip() if text_parts else ""
+
+
+def generate_answer(prompt: str) -> str:
+    """Call the OpenAI responses API and return the answer text."""
+    client = get_openai_client()
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY not configured")
+    with span("llm.request"):
+        resp = client.responses.create(model=LLM_MODEL, input=prompt)
+    return extract_answer_text(resp)
+
+
+def llm_hedge_delay() -> float:
+    """Seconds to wait before hedging an LLM call: the rolling p95 (LLM_HEDGE_QUANTILE) latency."""
+    return _llm_latency.quantile(LLM_HEDGE_QUANTILE, default=LLM_HEDGE_DELAY_MS / 1000.0)
+
+
+def rerank_fits_budget() -> bool:
+    """False when the current deadline leaves too little room to rerank and still call the LLM."""
+    dl = current_deadline()
+    if dl is None:
+        return True
+    if RERANK_MIN_REMAINING_MS:
+        need = RERANK_MIN_REMAINING_MS / 1000.0
+    else:
+        need = _llm_latency.quantile(0.5, default=LLM_HEDGE_DELAY_MS / 2000.0) + 0.5
+    return dl.remaining() >= need
+
+
+def llm_usage(resp) -> Dict[str, Any]:
+    """
+    Token usage of a Responses API result, including how much of the input was served from the
+    provider's prompt cache: {input_tokens, cached_tokens, output_tokens, cached_ratio}.
+    """
+    usage = getattr(resp, "usage", None)
+    if usage is None and isinstance(resp, dict):
+        usage = resp.get("usage")
+
+    def _get(obj, name):
+        return (obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)) if obj is not None else None
+
+    input_tokens = int(_get(usage, "input_tokens") or 0)
+    cached = int(_get(_get(usage, "input_tokens_details"), "cached_tokens") or 0)
+    return {
+        "input_tokens": input_tokens,
+        "cached_tokens": cached,
+        "output_tokens": int(_get(usage, "output_tokens") or 0),
+        "cached_ratio": round(cached / input_tokens, 4) if input_tokens else 0.0,
+    }
+
+
+async def respond_async(input: Any, instructions: Optional[str] = None, previous_response_id: Optional[str] = None,
+                        prompt_cache_key: Optional[str] = None, endpoint: str = "rag"):
+    """
+    Call the Responses API bounded by the current deadline and return the raw response. With
+    LLM_HEDGE on, a second request (to LLM_HEDGE_MODEL) starts once the first has run longer
+    than the recent p95, and whichever answers first wins; the other HTTP request is cancelled.
+    Input/cached token counts go to llm_input_tokens_total{endpoint, cache=hit|miss}.
+    """
+    client = get_openai_client("async")
+    if client is None:
+        raise RuntimeError("OPENAI_API_KEY not configured")
+    dl = current_deadline()
+    extra: Dict[str, Any] = {}
+    if instructions is not None:
+        extra["instructions"] = instructions
+    if previous_response_id:
+        extra["previous_response_id"] = previous_response_id
+    if prompt_cache_key:
+        extra["prompt_cache_key"] = prompt_cache_key
+
+    def _call(model: str, record: bool):
+        # only primary calls feed the hedge delay; one cancelled by a winning hedge (or the
+        # deadline) is recorded at its elapsed time, a lower bound on its real latency, so the
+        # window does not fill with fast survivors and drag the p95 down
+        async def run():
+            t0 = time.perf_counter()
+            try:
+                with span("llm.request"):
+                    resp = await client.responses.create(
+                        model=model, input=input, timeout=dl.timeout(LLM_TIMEOUT) if dl else LLM_TIMEOUT, **extra
+                    )
+            except asyncio.CancelledError:
+                if record:
+                    _llm_latency.add(time.perf_counter() - t0)
+                raise
+            if record:
+                _llm_latency.add(time.perf_counter() - t0)
+            return resp
+        return run
+
+    if not LLM_HEDGE:
+        resp = await run_within_deadline(_call(LLM_MODEL, True)(), "llm")
+    else:
+        resp, _ = await run_within_deadline(
+            hedged(_call(LLM_MODEL, True), llm_hedge_delay(), _call(LLM_HEDGE_MODEL, False), name="llm"), "llm"
+        )
+    usage = llm_usage(resp)
+    inc("llm_input_tokens_total", usage["cached_tokens"], endpoint=endpoint, cache="hit")
+    inc("llm_input_tokens_total", usage["input_tokens"] - usage["cached_tokens"], endpoint=endpoint, cache="miss")
+    return resp
+
+
+async def generate_answer_async(prompt: str) -> str:
+    """Async generate_answer bounded by the current deadline and hedged (see respond_async)."""
+    return extract_answer_text(await respond_async(prompt))
+
+
+def rerank_many(reranker, questions: List[str], candidates_list: List[List[Any]]) -> List[List[Any]]:
+    """Rerank several candidate lists, sharing model batches when the reranker supports it."""
+    try:
+        if hasattr(reranker, "rerank_batch"):
+            return reranker.rerank_batch(questions, candidates_list)
+        return [reranker.rerank(q, c) for q, c in zip(questions, candidates_list)]
+    except Exception as e:
+        # if reranker fails, fallback to the raw candidates truncated to max_k
+        max_k = getattr(reranker, "max_k", 8)
+        return [list(c[:max_k]) for c in candidates_list]
+
+
+async def rag_batch(
+    chunks_path: str,
+    questions: List[str],
+    top_k: int = 5,
+    max_context_chars: int = 4000,
+    reranker: str = "dynamic",
+    reranker_model: Optional[str] = None,
+    hybrid: bool = True,
+    retrieval: Optional[str] = None,
+    query_concurrency: int = BATCH_QUERY_CONCURRENCY,
+    llm_concurrency: int = BATCH_LLM_CONCURRENCY,
+    deadline_ms: Optional[int] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Answer many questions against one chunks file. Yields one dict per question as soon as its
+    answer is ready (completion order, not input order); each item carries its input `index`.
+
+    Questions go through retrieval in waves of BATCH_SIZE, and a wave's LLM calls start as soon
+    as it is reranked, so answers stream while later waves are still being retrieved:
+      - one embeddings request per wave; a failed request only fails that wave's questions
+      - vector queries (chapter-first unless `retrieval="flat"`) fan out with at most
+        `query_concurrency` in flight, with BM25 lookups
+        (when `hybrid` and a bm25.idx exists) running alongside and fused via RRF
+      - reranking runs once per wave (shared cross-encoder batches)
+      - LLM calls go through respond_async with at most `llm_concurrency` in flight, each under
+        its own `deadline_ms` budget (default RAG_DEADLINE_MS), counted once its slot frees up
+    """
+    path = Path(chunks_path)
+    if not path.exists():
+        raise FileNotFoundError(f"chunks.jsonl not found: {path}")
+    if not questions:
+        return
+
+    id2doc = await asyncio.to_thread(load_id_to_text_cached, path)
+    candidate_k = candidate_k_for(top_k)
+    namespace, scope_filter = retrieval_scope(id2doc)
+    chapters = get_chapter_index(path)
+    rr = make_reranker(reranker, top_k, reranker_model, id2doc)
+    query_sem = asyncio.Semaphore(max(1, query_concurrency))
+    llm_sem = asyncio.Semaphore(max(1, llm_concurrency))
+    budget_ms = RAG_DEADLINE_MS if deadline_ms is None else deadline_ms
+
+    results: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+    handled = set()  # indices with a result queued or an answer task running
+    tasks: List[asyncio.Task] = []
+
+    def _fail(i: int, error: str):
+        handled.add(i)
+        results.put_nowait({"index": i, "question": questions[i], "error": error})
+
+    async def _answer(i: int, matches: List[Any]) -> Dict[str, Any]:
+        q = questions[i]
+        if not matches:
+            return {"index": i, "question": q, "answer": "", "sources": [], "reason": "no matches found"}
+        context, sources = make_context_snippets(matches, id2doc, max_chars=max_context_chars)
+        prompt = build_prompt(context, q)
+        async with llm_sem:
+            try:
+                with deadline_scope(budget_ms / 1000.0):
+                    answer = extract_answer_text(await respond_async(prompt, endpoint="rag_batch"))
+            except Exception as e:
+                return {"index": i, "question": q, "error": f"LLM call failed: {e}", "sources": sources}
+        return {"index": i, "question": q, "answer": answer, "sources": sources}
+
+    async def _emit(i: int, matches: List[Any]):
+        try:
+            item = await _answer(i, matches)
+        except Exception as e:
+            item = {"index": i, "question": questions[i], "error": f"answer failed: {e}"}
+        await results.put(item)
+
+    async def _wave(start: int, index):
+        wave = list(range(start, min(start + DEFAULT_BATCH, len(questions))))
+        lexical = {i: start_lexical_search(path, questions[i], candidate_k) if hybrid else None for i in wave}
+        try:
+            embs = await asyncio.to_thread(embed_texts, [questions[i] for i in wave], DEFAULT_BATCH)
+        except Exception as e:
+            for i in wave:
+                _fail(i, f"embedding failed: {e}")
+            return
+
+        async def _query(emb):
+            async with query_sem:
+                return await asyncio.to_thread(dense_candidates, index, emb, candidate_k, namespace, scope_filter, chapters, top_k, retrieval)
+
+        live, candidates_list = [], []
+        for i, res in zip(wave, await asyncio.gather(*(_query(e) for e in embs), return_exceptions=True)):
+            if isinstance(res, Exception):
+                _fail(i, f"Pinecone query failed: {res}")
+            else:
+                live.append(i)
+                candidates_list.append(await fuse_candidates(list(res), lexical[i], id2doc, candidate_k))
+        matches_list = await asyncio.to_thread(rerank_many, rr, [questions[i] for i in live], candidates_list)
+        for i, matches in zip(live, matches_list):
+            handled.add(i)
+            tasks.append(asyncio.create_task(_emit(i, matches)))
+
+    async def _produce():
+        try:
+            index = await asyncio.to_thread(get_vector_index)
+        except Exception as e:
+            for i in range(len(questions)):
+                _fail(i, f"Pinecone query failed: {e}")
+            return
+        for start in range(0, len(questions), DEFAULT_BATCH):
+            try:
+                await _wave(start, index)
+            except Exception as e:
+                # anything unexpected fails only the questions of this wave still without a result
+                for i in range(start, min(start + DEFAULT_BATCH, len(questions))):
+                    if i not in handled:
+                        _fail(i, f"retrieval failed: {e}")
+
+    producer = asyncio.create_task(_produce())
+    try:
+        for _ in range(len(questions)):
+            yield await results.get()
+    finally:
+        # consumer went away (e.g. client disconnected) -> stop pending work
+        producer.cancel()
+        for t in tasks:
+            t.cancel()
+
+
+def answer_questions(chunks_path: str, questions: List[str], **kwargs) -> List[Dict[str, Any]]:
+    """Blocking wrapper around `rag_batch`; returns results ordered like `questions`."""
+    async def _collect():
+        return [item async for item in rag_batch(chunks_path, questions, **kwargs)]
+    results = asyncio.run(_collect())
+    return sorted(results, key=lambda r: r["index"])
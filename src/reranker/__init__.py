@@ -2,15 +2,28 @@
 from typing import Any, List
 
 from .dynamic import DynamicReranker, select_best_matches
-from .cross_encoder import CrossEncoderReranker
+from .fusion import reciprocal_rank_fusion
 
-__all__ = ["DynamicReranker", "CrossEncoderReranker", "select_best_matches"]
+__all__ = ["DynamicReranker", "CrossEncoderReranker", "CascadeReranker", "select_best_matches", "reciprocal_rank_fusion"]
+
+
+def __getattr__(name: str):
+    # model-backed rerankers are imported when first asked for, not at app start
+    if name == "CrossEncoderReranker":
+        from .cross_encoder import CrossEncoderReranker
+        return CrossEncoderReranker
+    if name == "CascadeReranker":
+        from .cascade import CascadeReranker
+        return CascadeReranker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+DEFAULT_CE_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 
 def get_reranker(name: str, **kwargs):
     """
     Factory to return a reranker instance by name.
-    name: "dynamic", "cross_encoder", or "none"
-    kwargs are passed to the reranker constructor (e.g., model_name for cross-encoder).
+    name: "dynamic", "cross_encoder", "cascade", or "none"
+    kwargs are passed to the reranker constructor (e.g., model_name / text_lookup for cross-encoder and cascade).
     """
     n = (name or "dynamic").lower()
     if n in ("none", "off", "identity"):
@@ -23,6 +36,17 @@ def get_reranker(name: str, **kwargs):
             max_k=int(kwargs.get("max_k", 8)),
         )
     if n in ("cross", "cross-encoder", "cross_encoder", "crossencoder"):
-        model_name = kwargs.get("model_name", "cross-encoder/ms-marco-MiniLM-L-6-v2")
-        return CrossEncoderReranker(model_name=model_name, max_k=int(kwargs.get("max_k", 8)))
+        from .cross_encoder import CrossEncoderReranker
+        model_name = kwargs.get("model_name") or DEFAULT_CE_MODEL
+        return CrossEncoderReranker(model_name=model_name, max_k=int(kwargs.get("max_k", 8)), text_lookup=kwargs.get("text_lookup"))
+    if n in ("cascade", "cascade_cross_encoder"):
+        from .cascade import CascadeReranker
+        return CascadeReranker(
+            model_name=kwargs.get("model_name") or DEFAULT_CE_MODEL,
+            max_k=int(kwargs.get("max_k", 8)),
+            band=float(kwargs.get("band", 0.12)),
+            max_window=int(kwargs.get("max_window", 24)),
+            decisive_margin=float(kwargs.get("decisive_margin", 0.08)),
+            text_lookup=kwargs.get("text_lookup"),
+        )
     raise ValueError(f"Unknown reranker name: {name}")
@@ -0,0 +1,97 @@
+# src/reranker/cascade.py
+from typing import List, Any, Optional, Callable, Tuple
+
+from src.telemetry.metrics import span, inc
+from .dynamic import select_best_matches, _score_of
+from .cross_encoder import CrossEncoderReranker
+
+
+class CascadeReranker:
+    """
+    Cheap-to-expensive reranking: dense-score pruning first, cross-encoder only where it can change the answer.
+
+      1) adaptive window: keep candidates scoring within `band` of the top hit (clamped to
+         [max_k, max_window]); a peaked score distribution yields a small window, a flat one a larger one
+      2) prune the window with select_best_matches (looser thresholds than DynamicReranker)
+      3) early exit: if the top hit beats the runner-up by >= `decisive_margin`, return the pruned list
+      4) otherwise cross-encode the survivors only and keep the best max_k
+    """
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        max_k: int = 8,
+        band: float = 0.12,
+        max_window: int = 24,
+        decisive_margin: float = 0.08,
+        min_score: float = 0.25,
+        rel_threshold: float = 0.6,
+        gap_threshold: float = 0.15,
+        text_lookup: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.max_k = max_k
+        self.band = band
+        self.max_window = max(max_window, max_k)
+        self.decisive_margin = decisive_margin
+        self.min_score = min_score
+        self.rel_threshold = rel_threshold
+        self.gap_threshold = gap_threshold
+        self.cross_encoder = CrossEncoderReranker(model_name=model_name, max_k=max_k, text_lookup=text_lookup)
+
+    def _window(self, matches: List[Any]) -> List[Any]:
+        top = _score_of(matches[0])
+        n = 0
+        for m in matches[: self.max_window]:
+            if _score_of(m) < top - self.band:
+                break
+            n += 1
+        return matches[: max(n, min(self.max_k, len(matches)))]
+
+    def _prune(self, matches: List[Any]) -> Tuple[List[Any], bool]:
+        """Steps 1-3. Returns (survivors, needs_cross_encoder)."""
+        window = self._window(matches)
+        survivors = select_best_matches(
+            window,
+            min_score=self.min_score,
+            rel_threshold=self.rel_threshold,
+            gap_threshold=self.gap_threshold,
+            max_k=len(window),
+        )
+        if len(survivors) <= 1:
+            inc("rerank_cascade_total", outcome="pruned")
+            return survivors, False
+        if _score_of(survivors[0]) - _score_of(survivors[1]) >= self.decisive_margin:
+            inc("rerank_cascade_total", outcome="decisive")
+            return survivors, False
+        inc("rerank_cascade_total", outcome="cross_encoder")
+        return survivors, True
+
+    def rerank(self, query: str, matches: List[Any]) -> List[Any]:
+        # matches are expected sorted best->worst already
+        if not matches:
+            return []
+        with span("reranker.cascade"):
+            survivors, needs_ce = self._prune(matches)
+            if not needs_ce:
+                return survivors[: self.max_k]
+            return self.cross_encoder.rerank(query, survivors)
+
+    def rerank_batch(self, queries: List[str], matches_list: List[List[Any]]) -> List[List[Any]]:
+        out: List[Optional[List[Any]]] = []
+        ce_queries, ce_lists, ce_slots = [], [], []
+        with span("reranker.cascade"):
+            for q, matches in zip(queries, matches_list):
+                if not matches:
+                    out.append([])
+                    continue
+                survivors, needs_ce = self._prune(matches)
+                if needs_ce:
+                    ce_slots.append(len(out))
+                    ce_queries.append(q)
+                    ce_lists.append(survivors)
+                    out.append(None)
+                else:
+                    out.append(survivors[: self.max_k])
+            if ce_lists:
+                for slot, reranked in zip(ce_slots, self.cross_encoder.rerank_batch(ce_queries, ce_lists)):
+                    out[slot] = reranked
+        return out
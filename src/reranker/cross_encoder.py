@@ -1,50 +1,71 @@
 # src/reranker/cross_encoder.py
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Optional
 import math
+import threading
+
+from src.telemetry.metrics import span, inc
+from src.telemetry.startup import lazy_import
+
+# loaded models, shared by every reranker instance in the process (get_reranker runs per request)
+_MODELS: Dict[str, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+def load_model(model_name: str):
+    """
+    Load (once per process) and return the CrossEncoder for `model_name`. Called before workers
+    fork (see gunicorn.conf.py) so they share the weights' pages instead of each loading a copy.
+    """
+    with _MODELS_LOCK:
+        model = _MODELS.get(model_name)
+        if model is None:
+            try:
+                CrossEncoder = lazy_import("sentence_transformers").CrossEncoder
+            except Exception as e:
+                raise RuntimeError("CrossEncoder not available. Install sentence-transformers and torch (e.g. `poetry add sentence-transformers torch`).") from e
+            with span("reranker.cross_encoder.load"):
+                model = _MODELS[model_name] = CrossEncoder(model_name)
+    return model
 
 class CrossEncoderReranker:
     """
     Cross-encoder reranker wrapper using sentence-transformers' CrossEncoder.
     This class defers importing heavy deps until used.
+
+    `text_lookup(id) -> str` supplies passage text for matches whose metadata has none
+    (our Pinecone metadata does not store chunk text).
     """
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", max_k: int = 8, batch_size: int = 32):
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", max_k: int = 8, batch_size: int = 32,
+                 text_lookup: Optional[Callable[[str], Optional[str]]] = None):
         self.model_name = model_name
         self.max_k = max_k
         self.batch_size = batch_size
+        self.text_lookup = text_lookup
         self._model = None
 
     def _ensure_model(self):
         if self._model is not None:
             return
-        try:
-            from sentence_transformers import CrossEncoder
-        except Exception as e:
-            raise RuntimeError("CrossEncoder not available. Install sentence-transformers and torch (e.g. `poetry add sentence-transformers torch`).") from e
-        self._model = CrossEncoder(self.model_name)
+        self._model = load_model(self.model_name)
 
-    def _score_pairs(self, query: str, texts: List[str]) -> List[float]:
+    def _predict(self, pairs: List[tuple]) -> List[float]:
         self._ensure_model()
-        # CrossEncoder accepts list of (query, passage) pairs
-        pairs = [(query, t) for t in texts]
         # batch inference
         scores = []
-        for i in range(0, len(pairs), self.batch_size):
-            batch = pairs[i:i+self.batch_size]
-            batch_scores = self._model.predict(batch, show_progress_bar=False)
-            # ensure list of floats
-            batch_scores = [float(s) for s in batch_scores]
-            scores.extend(batch_scores)
+        with span("reranker.cross_encoder"):
+            for i in range(0, len(pairs), self.batch_size):
+                batch = pairs[i:i+self.batch_size]
+                batch_scores = self._model.predict(batch, show_progress_bar=False)
+                # ensure list of floats
+                batch_scores = [float(s) for s in batch_scores]
+                scores.extend(batch_scores)
+        inc("rerank_cross_encoder_pairs_total", len(pairs))
         return scores
 
-    def rerank(self, query: str, matches: List[Any]) -> List[Any]:
-        """
-        Accepts Pinecone matches (list of SDK objects or dicts). Returns matches re-ordered by cross-encoder score (descending),
-        and truncates to self.max_k.
-        """
-        if not matches:
-            return []
+    def _score_pairs(self, query: str, texts: List[str]) -> List[float]:
+        # CrossEncoder accepts list of (query, passage) pairs
+        return self._predict([(query, t) for t in texts])
 
-        # extract texts and keep mapping to original match
+    def _texts_of(self, matches: List[Any]) -> List[str]:
         texts = []
         for m in matches:
             # metadata or local doc text might be available; first try metadata->we expect 'metadata' to exist
@@ -56,10 +77,31 @@ class CrossEncoderReranker:
             if text is None:
                 # try to use a short passage if available in match (some pinecone clients include snippet)
                 text = getattr(m, "metadata", None) and getattr(m.metadata, "snippet", None) or None
+            if text is None and self.text_lookup is not None:
+                mid = m.id if hasattr(m, "id") else (m.get("id") if isinstance(m, dict) else None)
+                text = self.text_lookup(mid) if mid else None
             if text is None:
                 # as last resort, store an empty placeholder (cross-encoder will give low scores)
                 text = ""
             texts.append(text)
+        return texts
+
+    def _sort_by_scores(self, matches: List[Any], scores: List[float]) -> List[Any]:
+        # attach scores and sort
+        scored = list(zip(matches, scores))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return [m for m, s in scored][:self.max_k]
+
+    def rerank(self, query: str, matches: List[Any]) -> List[Any]:
+        """
+        Accepts Pinecone matches (list of SDK objects or dicts). Returns matches re-ordered by cross-encoder score (descending),
+        and truncates to self.max_k.
+        """
+        if not matches:
+            return []
+
+        # extract texts and keep mapping to original match
+        texts = self._texts_of(matches)
 
         # compute cross-encoder scores; if all texts empty, return top-k of original
         if all(not t for t in texts):
@@ -71,8 +113,36 @@ class CrossEncoderReranker:
             # if model fails, fallback to returning original topk
             return matches[:self.max_k]
 
-        # attach scores and sort
-        scored = list(zip(matches, scores))
-        scored.sort(key=lambda x: x[1], reverse=True)
-        reranked = [m for m, s in scored][:self.max_k]
-        return reranked
+        return self._sort_by_scores(matches, scores)
+
+    def rerank_batch(self, queries: List[str], matches_list: List[List[Any]]) -> List[List[Any]]:
+        """
+        Rerank several queries at once. (query, passage) pairs from every query are flattened
+        and scored in shared model batches, then split back per query.
+        """
+        pairs = []
+        spans = []  # (start, end) into pairs for each query, None when nothing to score
+        for query, matches in zip(queries, matches_list):
+            texts = self._texts_of(matches) if matches else []
+            if not texts or all(not t for t in texts):
+                spans.append(None)
+                continue
+            start = len(pairs)
+            pairs.extend((query, t) for t in texts)
+            spans.append((start, len(pairs)))
+
+        scores = []
+        if pairs:
+            try:
+                scores = self._predict(pairs)
+            except Exception as e:
+                # same fallback as rerank(): keep original order
+                spans = [None] * len(spans)
+
+        out = []
+        for matches, rng in zip(matches_list, spans):
+            if rng is None:
+                out.append(list(matches[:self.max_k]))
+            else:
+                out.append(self._sort_by_scores(matches, scores[rng[0]:rng[1]]))
+        return out
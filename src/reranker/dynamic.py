@@ -1,6 +1,8 @@
 # src/reranker/dynamic.py
 from typing import List, Any, Callable
 
+from src.telemetry.metrics import span
+
 def _score_of(m: Any) -> float:
     if hasattr(m, "score"):
         return float(m.score or 0.0)
@@ -42,4 +44,9 @@ class DynamicReranker:
 
     def rerank(self, query: str, matches: List[Any]) -> List[Any]:
         # matches are expected sorted best->worst already
-        return select_best_matches(matches, min_score=self.min_score, rel_threshold=self.rel_threshold, gap_threshold=self.gap_threshold, max_k=self.max_k)
+        with span("reranker.dynamic"):
+            return select_best_matches(matches, min_score=self.min_score, rel_threshold=self.rel_threshold, gap_threshold=self.gap_threshold, max_k=self.max_k)
+
+    def rerank_batch(self, queries: List[str], matches_list: List[List[Any]]) -> List[List[Any]]:
+        # score-threshold selection is per query; no shared work to batch
+        return [self.rerank(q, ms) for q, ms in zip(queries, matches_list)]
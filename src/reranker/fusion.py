@@ -0,0 +1,69 @@
+# src/reranker/fusion.py
+from typing import List, Any, Dict, Tuple, Optional
+
+from .dynamic import _score_of
+
+# metadata fields copied from a chunks.jsonl doc for hits that only the lexical side found
+_META_KEYS = ("id", "book_title", "book_slug", "chunk_index", "page_start", "page_end", "source")
+
+
+def _id_of(m: Any) -> str:
+    return m.id if hasattr(m, "id") else m["id"]
+
+
+def _meta_of(m: Any) -> Dict[str, Any]:
+    meta = m.metadata if hasattr(m, "metadata") else m.get("metadata")
+    return meta or {}
+
+
+def reciprocal_rank_fusion(
+    dense: List[Any],
+    lexical: List[Tuple[str, float]],
+    id2doc: Optional[Dict[str, Dict[str, Any]]] = None,
+    k: int = 60,
+    top_n: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fuse dense matches (Pinecone-style, best first) with lexical (chunk_id, score) hits
+    using reciprocal rank fusion: rrf(d) = sum over lists of 1 / (k + rank).
+
+    Returns dict matches {"id", "score", "metadata", "rrf_score", "dense_score", "lexical_score"}
+    ordered by rrf_score. RRF only decides the order: the i-th fused hit gets the i-th dense
+    cosine as `score`, so the score profile (and with it the thresholds of DynamicReranker and
+    the cascade's decisive margin) is the same as for dense-only retrieval. Rescaling RRF itself
+    would put every hit found by only one retriever at ~half the score of a hit found by both.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for rank, m in enumerate(dense, start=1):
+        mid = _id_of(m)
+        fused[mid] = {
+            "id": mid,
+            "metadata": _meta_of(m),
+            "rrf_score": 1.0 / (k + rank),
+            "dense_score": _score_of(m),
+            "lexical_score": None,
+        }
+    for rank, (mid, s) in enumerate(lexical, start=1):
+        entry = fused.get(mid)
+        if entry is None:
+            doc = (id2doc or {}).get(mid) or {}
+            entry = fused[mid] = {
+                "id": mid,
+                "metadata": {key: doc.get(key) for key in _META_KEYS if doc.get(key) is not None},
+                "rrf_score": 0.0,
+                "dense_score": None,
+                "lexical_score": None,
+            }
+        entry["rrf_score"] += 1.0 / (k + rank)
+        entry["lexical_score"] = float(s)
+
+    out = sorted(fused.values(), key=lambda e: e["rrf_score"], reverse=True)
+    if top_n is not None:
+        out = out[:top_n]
+    profile = [_score_of(m) for m in dense]
+    for i, e in enumerate(out):
+        if profile:
+            e["score"] = profile[min(i, len(profile) - 1)]
+        else:  # lexical hits only: RRF relative to the top hit
+            e["score"] = e["rrf_score"] / out[0]["rrf_score"]
+    return out
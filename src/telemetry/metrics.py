@@ -0,0 +1,153 @@
+# src/telemetry/metrics.py
+"""
+Minimal in-process latency tracing and Prometheus exposition.
+
+  from src.telemetry.metrics import span, inc
+
+  with span("rag.embed"):
+      ...
+  inc("rag_cache_requests_total", cache="chunks", result="hit")
+
+Spans feed a `rag_stage_duration_seconds{stage=...}` histogram. Inside a
+`collect_timings()` block they are also summed per stage (milliseconds) so a
+request can return its own breakdown.
+
+Set METRICS_ENABLED=0 to turn recording off; span() then costs one flag check
+and one context-var lookup.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+
+# seconds; covers sub-ms lexical lookups up to slow LLM calls
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HISTOGRAM = "rag_stage_duration_seconds"
+
+_lock = threading.Lock()
+_histograms: Dict[str, "_Histogram"] = {}
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.n += 1
+
+
+def observe(stage: str, seconds: float):
+    """Record a duration for `stage` (histogram + current request timings)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds * 1000.0
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        h = _histograms.get(stage)
+        if h is None:
+            h = _histograms[stage] = _Histogram()
+        h.observe(seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as `stage`."""
+    if not METRICS_ENABLED and _timings.get() is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - t0)
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    """Increment a counter, e.g. inc("rag_cache_requests_total", cache="chunks", result="hit")."""
+    if not METRICS_ENABLED:
+        return
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collect per-stage wall time (ms) for spans run inside the block, including
+    spans in threads started via asyncio.to_thread (they inherit the context).
+    """
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}"
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_float(v: float) -> str:
+    return repr(float(v))
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format (v0.0.4)."""
+    with _lock:
+        hists = {k: (list(h.counts), h.total, h.n) for k, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    if hists:
+        lines.append(f"# HELP {STAGE_HISTOGRAM} Wall time spent per RAG stage.")
+        lines.append(f"# TYPE {STAGE_HISTOGRAM} histogram")
+        for stage in sorted(hists):
+            counts, total, n = hists[stage]
+            cumulative = 0
+            for bound, c in zip(BUCKETS, counts):
+                cumulative += c
+                lines.append(f'{STAGE_HISTOGRAM}_bucket{{stage="{_escape(stage)}",le="{bound}"}} {cumulative}')
+            lines.append(f'{STAGE_HISTOGRAM}_bucket{{stage="{_escape(stage)}",le="+Inf"}} {n}')
+            lines.append(f'{STAGE_HISTOGRAM}_sum{{stage="{_escape(stage)}"}} {_fmt_float(total)}')
+            lines.append(f'{STAGE_HISTOGRAM}_count{{stage="{_escape(stage)}"}} {n}')
+
+    by_name: Dict[str, list] = {}
+    for (name, labels), v in counters.items():
+        by_name.setdefault(name, []).append((labels, v))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {name} counter")
+        for labels, v in sorted(by_name[name]):
+            lines.append(f"{name}{_fmt_labels(labels)} {_fmt_float(v)}")
+
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def reset():
+    """Drop all recorded metrics (used by benchmarks between runs)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
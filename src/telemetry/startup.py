@@ -0,0 +1,40 @@
+# src/telemetry/startup.py
+"""
+Import timings for cold-start diagnostics.
+
+Heavy SDKs (openai, pinecone, sentence_transformers) are imported on first use through
+`lazy_import`, which records how long the import took; /healthz and /readyz report them.
+
+  openai = lazy_import("openai")
+"""
+import sys
+import time
+import importlib
+import threading
+from typing import Dict
+
+STARTED_AT = time.monotonic()  # first src.* import, i.e. roughly process start
+_lock = threading.Lock()
+_imports: Dict[str, float] = {}  # module -> seconds, first import only
+
+
+def record_import(name: str, seconds: float):
+    with _lock:
+        _imports.setdefault(name, seconds)
+
+
+def lazy_import(name: str):
+    """import_module(name), timing the first import in this process."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    t0 = time.perf_counter()
+    mod = importlib.import_module(name)
+    record_import(name, time.perf_counter() - t0)
+    return mod
+
+
+def import_timings() -> Dict[str, float]:
+    """Seconds spent importing each lazily imported module (and the app itself)."""
+    with _lock:
+        return {k: round(v, 4) for k, v in _imports.items()}
@@ -0,0 +1,70 @@
+# src/vectorstore/backend.py
+"""
+Selects the vector index used by indexing and serving.
+
+  VECTOR_BACKEND=pinecone   Pinecone serverless index (default)
+  VECTOR_BACKEND=local      LocalIndex persisted under LOCAL_INDEX_DIR, with optional
+                            VECTOR_QUANTIZATION (none | float16 | int8 | binary)
+
+Both return an object with Pinecone's upsert/query surface, so upsert_embeddings and
+query_index work unchanged. The handle is cached per process; a local index is reloaded
+when its manifest changes on disk (e.g. after re-running the indexer).
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .local_store import LocalIndex, EMBED_DIM
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "data/vector_index")
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+# candidates rescored at full precision = top_k * factor (0 = per-quantization default)
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "0")) or None
+
+_handle: Optional[Tuple[Any, Any]] = None  # (stamp, index)
+_lock = threading.Lock()
+
+
+def _local_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        st = (Path(LOCAL_INDEX_DIR) / "manifest.json").stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_vector_index() -> Any:
+    """Return the process-wide index handle for VECTOR_BACKEND."""
+    global _handle
+    with _lock:
+        if VECTOR_BACKEND == "local":
+            stamp = _local_stamp()
+            if _handle is None or _handle[0] != stamp:
+                if stamp is None:
+                    index = LocalIndex(dim=EMBED_DIM, quantization=VECTOR_QUANTIZATION,
+                                       rescore_factor=VECTOR_RESCORE_FACTOR, truncate=True)
+                else:
+                    index = LocalIndex.load(LOCAL_INDEX_DIR, quantization=VECTOR_QUANTIZATION,
+                                            rescore_factor=VECTOR_RESCORE_FACTOR)
+                _handle = (stamp, index)
+            return _handle[1]
+
+        if _handle is None:
+            from .pinecone_store import get_pinecone_client, get_or_create_index
+            _handle = (None, get_or_create_index(get_pinecone_client()))
+        return _handle[1]
+
+
+def persist_vector_index(index: Any):
+    """Write a local index to LOCAL_INDEX_DIR (Pinecone persists server-side; no-op there)."""
+    global _handle
+    if not isinstance(index, LocalIndex):
+        return
+    index.save(LOCAL_INDEX_DIR)
+    mem = index.memory_usage()
+    print(f"[vectorstore] saved {mem['vectors']} vectors to {LOCAL_INDEX_DIR} "
+          f"(quantization={index.quantization}, {mem['bytes_per_vector']} B/vector resident)")
+    with _lock:
+        _handle = None
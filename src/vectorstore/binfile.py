@@ -0,0 +1,62 @@
+# src/vectorstore/binfile.py
+"""
+Single-file container for the read-only indexes served from disk (BM25, chunk store).
+
+Layout (little-endian):
+  MAGIC (8 bytes) | uint32 header_len | header JSON (padded to 8) | sections...
+Section offsets/lengths live in header["sections"] relative to the end of the header, 8-byte
+aligned so numpy views over them need no copies. Files are written to a temp name and renamed,
+so a process that has the previous version memory-mapped keeps a valid mapping.
+"""
+import os
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, List, Tuple, Any
+
+
+def write_sections(path, magic: bytes, header: Dict[str, Any], sections: List[Tuple[str, bytes]]) -> int:
+    """Write `sections` after `header` (a "sections" entry is added); returns the file size."""
+    header = dict(header, sections={})
+    pos = 0
+    for name, data in sections:
+        pos = (pos + 7) & ~7
+        header["sections"][name] = [pos, len(data)]
+        pos += len(data)
+    hjson = json.dumps(header).encode("utf-8")
+    hjson += b" " * ((-(len(magic) + 4 + len(hjson))) % 8)
+
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("wb") as fh:
+        fh.write(magic)
+        fh.write(struct.pack("<I", len(hjson)))
+        fh.write(hjson)
+        written = 0
+        for name, data in sections:
+            start = header["sections"][name][0]
+            fh.write(b"\0" * (start - written))
+            fh.write(data)
+            written = start + len(data)
+    tmp.replace(path)
+    return path.stat().st_size
+
+
+def read_sections(buf, magic: bytes) -> Tuple[Dict[str, Any], Dict[str, memoryview]]:
+    """Parse a buffer written by write_sections; returns (header, {name: memoryview})."""
+    buf = memoryview(buf)
+    if bytes(buf[:len(magic)]) != magic:
+        raise ValueError(f"bad magic: expected {magic!r}")
+    (hlen,) = struct.unpack("<I", bytes(buf[len(magic):len(magic) + 4]))
+    base = len(magic) + 4
+    header = json.loads(bytes(buf[base:base + hlen]).decode("utf-8"))
+    base += hlen
+    views = {name: buf[base + off: base + off + ln] for name, (off, ln) in header["sections"].items()}
+    return header, views
+
+
+def map_file(path) -> mmap.mmap:
+    """Read-only shared mapping of `path`: pages live in the OS page cache, shared by every process."""
+    with open(path, "rb") as fh:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
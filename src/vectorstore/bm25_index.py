@@ -0,0 +1,310 @@
+# src/vectorstore/bm25_index.py
+"""
+Compact BM25 inverted index over chunks.jsonl, used for the lexical half of hybrid retrieval.
+
+Built at index time next to the chunks file (data/<slug>/bm25.idx):
+  poetry run python -m src.vectorstore.bm25_index data/<slug>/chunks.jsonl
+
+On-disk layout (single file, little-endian):
+  b"BM25IDX1" | uint32 header_len | header JSON | sections...
+sections (offsets in the header):
+  doc_ids       utf-8, "\\n"-joined chunk ids
+  doc_len       uint32[n_docs]         token count per chunk
+  terms         utf-8, "\\n"-joined vocabulary (sorted)
+  df            uint32[n_terms]        document frequency per term
+  post_offsets  uint64[n_terms + 1]    byte offsets into postings
+  postings      per term: varint pairs (doc-id delta, term frequency)
+
+Postings are delta + varint (LEB128) encoded, typically 2-3 bytes per posting, and are
+decoded with numpy only for the query terms, so lookups stay in the low milliseconds.
+
+The served index is memory-mapped (BM25_MMAP=1, default): the vocabulary is binary-searched
+and doc ids sliced straight out of the mapping, so worker processes share one copy of the
+file in the page cache instead of each building its own dicts.
+"""
+import os
+import re
+import json
+import math
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Dict, Tuple, Iterable, Optional
+
+import numpy as np
+
+from src.telemetry.metrics import span
+from .binfile import write_sections, read_sections, map_file
+
+MAGIC = b"BM25IDX1"
+INDEX_FILENAME = "bm25.idx"
+BM25_MMAP = os.getenv("BM25_MMAP", "1").lower() not in ("0", "false", "no", "off")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# small English stoplist; drops the terms whose postings would be longest and least useful
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my no not of on or our
+she so that the their them then there these they this to was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def bm25_path_for(chunks_path) -> Path:
+    return Path(chunks_path).with_name(INDEX_FILENAME)
+
+
+# --------------------------------------------------------------------------- varint codec
+
+def _encode_varints(values: Iterable[int]) -> bytes:
+    out = bytearray()
+    for v in values:
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+    return bytes(out)
+
+
+def _decode_varints(buf) -> np.ndarray:
+    """Vectorised LEB128 decode of a whole postings list (values < 2**35)."""
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    if arr.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.flatnonzero(arr < 0x80)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    vals = np.zeros(ends.shape[0], dtype=np.int64)
+    for i in range(5):
+        idx = starts + i
+        valid = idx <= ends
+        if not valid.any():
+            break
+        vals[valid] |= (arr[idx[valid]].astype(np.int64) & 0x7F) << (7 * i)
+    return vals
+
+
+class _Strings:
+    """Read-only sequence over a "\\n"-joined utf-8 blob; items are decoded on access."""
+
+    def __init__(self, blob, count: int):
+        self._blob = blob
+        arr = np.frombuffer(blob, dtype=np.uint8)
+        ends = np.flatnonzero(arr == 0x0A)
+        self._starts = np.concatenate(([0], ends + 1)).astype(np.int64)[:count]
+        self._ends = np.concatenate((ends, [arr.shape[0]])).astype(np.int64)[:count]
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._blob[int(self._starts[i]):int(self._ends[i])])
+
+    def __getitem__(self, i: int) -> str:
+        if not -self._count <= i < self._count:
+            raise IndexError(i)
+        return self.raw(i % self._count).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(self._count))
+
+
+class _SortedTermLookup:
+    """dict-like term -> position over a sorted _Strings vocabulary (binary search, no per-process dict)."""
+
+    class _Keys:
+        def __init__(self, strings: _Strings):
+            self.strings = strings
+
+        def __len__(self):
+            return len(self.strings)
+
+        def __getitem__(self, i):
+            return self.strings.raw(i)
+
+    def __init__(self, terms: _Strings):
+        self._keys = self._Keys(terms)
+
+    def get(self, term: str, default=None):
+        key = term.encode("utf-8")
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return default
+
+
+# --------------------------------------------------------------------------- index
+
+class BM25Index:
+    def __init__(self, doc_ids, doc_len: np.ndarray, terms, df: np.ndarray,
+                 post_offsets: np.ndarray, postings, k1: float = 1.2, b: float = 0.75):
+        self.doc_ids = doc_ids
+        self.doc_len = doc_len
+        self.terms = terms
+        self.term_pos = _SortedTermLookup(terms) if isinstance(terms, _Strings) else {t: i for i, t in enumerate(terms)}
+        self.df = df
+        self.post_offsets = post_offsets
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(doc_ids)
+        self.avgdl = float(doc_len.mean()) if self.n_docs else 0.0
+        # BM25 length normaliser per doc, precomputed once
+        self._norm = (k1 * (1.0 - b + b * doc_len / self.avgdl)).astype(np.float32) if self.n_docs else np.zeros(0, np.float32)
+
+    @classmethod
+    def build(cls, docs: Iterable[Dict], k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        doc_ids: List[str] = []
+        lens: List[int] = []
+        inverted: Dict[str, List[Tuple[int, int]]] = {}
+        for d in docs:
+            doc_no = len(doc_ids)
+            doc_ids.append(d["id"])
+            toks = tokenize(d.get("text") or "")
+            lens.append(len(toks))
+            tf: Dict[str, int] = {}
+            for t in toks:
+                tf[t] = tf.get(t, 0) + 1
+            for t, c in tf.items():
+                inverted.setdefault(t, []).append((doc_no, c))
+
+        terms = sorted(inverted)
+        df = np.zeros(len(terms), dtype=np.uint32)
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint64)
+        blob = bytearray()
+        for i, t in enumerate(terms):
+            plist = inverted[t]
+            df[i] = len(plist)
+            flat = []
+            prev = 0
+            for doc_no, c in plist:  # doc_no ascending by construction
+                flat.append(doc_no - prev)
+                flat.append(c)
+                prev = doc_no
+            blob += _encode_varints(flat)
+            offsets[i + 1] = len(blob)
+        return cls(doc_ids, np.asarray(lens, dtype=np.uint32), terms, df, offsets, bytes(blob), k1=k1, b=b)
+
+    # ---- persistence
+
+    def save(self, path) -> int:
+        sections = [
+            ("doc_ids", "\n".join(self.doc_ids).encode("utf-8")),
+            ("doc_len", np.ascontiguousarray(self.doc_len, dtype="<u4").tobytes()),
+            ("terms", "\n".join(self.terms).encode("utf-8")),
+            ("df", np.ascontiguousarray(self.df, dtype="<u4").tobytes()),
+            ("post_offsets", np.ascontiguousarray(self.post_offsets, dtype="<u8").tobytes()),
+            ("postings", bytes(self.postings)),
+        ]
+        header = {"version": 1, "n_docs": self.n_docs, "n_terms": len(self.terms), "k1": self.k1, "b": self.b}
+        return write_sections(path, MAGIC, header, sections)
+
+    @classmethod
+    def from_buffer(cls, buf, lazy: bool = False) -> "BM25Index":
+        """
+        Build over `buf` without copying the numeric sections. With `lazy`, ids and terms stay
+        in the buffer too (pass an mmap to share one copy between processes).
+        """
+        header, sec = read_sections(buf, MAGIC)
+        n_docs, n_terms = header["n_docs"], header["n_terms"]
+        if lazy:
+            doc_ids, terms = _Strings(sec["doc_ids"], n_docs), _Strings(sec["terms"], n_terms)
+        else:
+            doc_ids = bytes(sec["doc_ids"]).decode("utf-8").split("\n") if n_docs else []
+            terms = bytes(sec["terms"]).decode("utf-8").split("\n") if n_terms else []
+        return cls(
+            doc_ids,
+            np.frombuffer(sec["doc_len"], dtype="<u4"),
+            terms,
+            np.frombuffer(sec["df"], dtype="<u4"),
+            np.frombuffer(sec["post_offsets"], dtype="<u8"),
+            sec["postings"],
+            k1=float(header["k1"]),
+            b=float(header["b"]),
+        )
+
+    @classmethod
+    def load(cls, path, mmap: bool = BM25_MMAP) -> "BM25Index":
+        if mmap:
+            return cls.from_buffer(map_file(path), lazy=True)
+        return cls.from_buffer(Path(path).read_bytes())
+
+    # ---- query
+
+    def _postings(self, term_no: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = int(self.post_offsets[term_no]), int(self.post_offsets[term_no + 1])
+        vals = _decode_varints(self.postings[start:end])
+        return np.cumsum(vals[0::2]), vals[1::2]
+
+    def search(self, query: str, top_k: int = 50) -> List[Tuple[str, float]]:
+        """Return up to top_k (chunk_id, bm25_score) pairs, best first."""
+        if not self.n_docs:
+            return []
+        with span("bm25.search"):
+            scores = np.zeros(self.n_docs, dtype=np.float32)
+            for t in set(tokenize(query)):
+                i = self.term_pos.get(t)
+                if i is None:
+                    continue
+                df = float(self.df[i])
+                idf = math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+                docs, tf = self._postings(i)
+                tf = tf.astype(np.float32)
+                scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + self._norm[docs])
+            hits = np.flatnonzero(scores > 0)
+            if hits.size == 0:
+                return []
+            if hits.size > top_k:
+                hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            return [(self.doc_ids[i], float(scores[i])) for i in hits]
+
+
+def build_bm25_for_chunks(chunks_jsonl, out_path: Optional[Path] = None) -> Path:
+    """Build and save the BM25 index for a chunks.jsonl; returns the index path."""
+    chunks_jsonl = Path(chunks_jsonl)
+    docs = []
+    with chunks_jsonl.open(encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                j = json.loads(line)
+                docs.append({"id": j["id"], "text": j.get("text", "")})
+    idx = BM25Index.build(docs)
+    out = Path(out_path) if out_path else bm25_path_for(chunks_jsonl)
+    size = idx.save(out)
+    print(f"[bm25] indexed {idx.n_docs} chunks, {len(idx.terms)} terms -> {out} ({size / 1024:.1f} KiB)")
+    return out
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], BM25Index]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_bm25_index(chunks_path) -> Optional[BM25Index]:
+    """Load (and cache) the BM25 index that sits next to `chunks_path`; None if it was never built."""
+    p = bm25_path_for(chunks_path)
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    key, stamp = str(p.resolve()), (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+    idx = BM25Index.load(p)
+    with _cache_lock:
+        _cache[key] = (stamp, idx)
+    return idx
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.vectorstore.bm25_index <chunks.jsonl>")
+        raise SystemExit(1)
+    build_bm25_for_chunks(sys.argv[1])
@@ -0,0 +1,192 @@
+# src/vectorstore/chapter_index.py
+"""
+Chapter-level vectors for two-level (chapter -> chunk) retrieval.
+
+Built by the indexer next to the chunks file (data/<slug>/chapter_index.npz) from the chapters.json
+written at ingest and the chunk embeddings it already has: each chapter vector is the normalised
+mean of its chunks' embeddings. At query time the top chapters are picked locally (a few dozen
+dot products) and the vector search is restricted to chunks whose pages overlap them, via a
+page_start/page_end metadata filter that Pinecone and LocalIndex both evaluate.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+INDEX_FILENAME = "chapter_index.npz"
+CHAPTERS_FILENAME = "chapters.json"
+
+
+def chapter_index_path_for(chunks_path) -> Path:
+    return Path(chunks_path).with_name(INDEX_FILENAME)
+
+
+def _overlaps(doc: Dict[str, Any], start: int, end: int) -> bool:
+    ps, pe = doc.get("page_start"), doc.get("page_end")
+    if ps is None:
+        return False
+    return ps <= end and (pe if pe is not None else ps) >= start
+
+
+class ChapterIndex:
+    def __init__(self, titles: List[str], start_page: np.ndarray, end_page: np.ndarray,
+                 book_slug: List[str], vectors: np.ndarray, chunk_count: np.ndarray):
+        self.titles = titles
+        self.start_page = start_page
+        self.end_page = end_page
+        self.book_slug = book_slug
+        self.vectors = vectors
+        self.chunk_count = chunk_count
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @classmethod
+    def build(cls, docs: Sequence[Dict[str, Any]], embeddings, chapters: List[Dict[str, Any]]) -> "ChapterIndex":
+        """
+        docs: chunks.jsonl records (page_start/page_end/book_slug), aligned with `embeddings`.
+        chapters: chapters.json entries {"chapter", "start_page", "end_page"}.
+        Pages before the first chapter become a "(front matter)" chapter so no chunk is unreachable;
+        a missing end_page extends to the page before the next chapter (last chunk page for the last one).
+        """
+        emb = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(emb, axis=1, keepdims=True)
+        emb = emb / np.where(norms > 0, norms, 1.0)
+
+        open_spans = [(c.get("chapter") or f"chapter {i + 1}", int(c["start_page"]), c.get("end_page"))
+                      for i, c in enumerate(chapters) if c.get("start_page") is not None]
+        open_spans.sort(key=lambda s: s[1])
+        # a chapter without end_page runs up to the next chapter, or to the last chunk page for the final one
+        last_page = max((d.get("page_end") or d["page_start"] for d in docs if d.get("page_start") is not None), default=0)
+        spans = []
+        for j, (title, start, end) in enumerate(open_spans):
+            if end is None:
+                end = open_spans[j + 1][1] - 1 if j + 1 < len(open_spans) else last_page
+            spans.append((title, start, max(int(end), start)))
+        if spans:
+            first = spans[0][1]
+            early = [d["page_start"] for d in docs if d.get("page_start") is not None and d["page_start"] < first]
+            if early:
+                spans.insert(0, ("(front matter)", min(early), first - 1))
+
+        titles, starts, ends, slugs, vecs, counts = [], [], [], [], [], []
+        for title, start, end in spans:
+            rows = [i for i, d in enumerate(docs) if _overlaps(d, start, end)]
+            if not rows:
+                continue
+            centroid = emb[rows].mean(axis=0)
+            n = float(np.linalg.norm(centroid))
+            slug_counts: Dict[str, int] = {}
+            for i in rows:
+                s = docs[i].get("book_slug") or ""
+                slug_counts[s] = slug_counts.get(s, 0) + 1
+            titles.append(title)
+            starts.append(start)
+            ends.append(end)
+            slugs.append(max(slug_counts, key=slug_counts.get))
+            vecs.append(centroid / n if n > 0 else centroid)
+            counts.append(len(rows))
+        dim = emb.shape[1] if emb.ndim == 2 else 0
+        return cls(
+            titles,
+            np.asarray(starts, dtype=np.int64),
+            np.asarray(ends, dtype=np.int64),
+            slugs,
+            np.asarray(vecs, dtype=np.float32).reshape(len(vecs), dim),
+            np.asarray(counts, dtype=np.int64),
+        )
+
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as fh:
+            np.savez(
+                fh,
+                titles=np.asarray(self.titles, dtype=str),
+                start_page=self.start_page,
+                end_page=self.end_page,
+                book_slug=np.asarray(self.book_slug, dtype=str),
+                vectors=self.vectors,
+                chunk_count=self.chunk_count,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path) -> "ChapterIndex":
+        with np.load(path, allow_pickle=False) as z:
+            return cls(
+                [str(t) for t in z["titles"]],
+                z["start_page"],
+                z["end_page"],
+                [str(s) for s in z["book_slug"]],
+                z["vectors"],
+                z["chunk_count"],
+            )
+
+    def select(self, query_vec, top_n: int = 3) -> List[int]:
+        """Positions of the `top_n` chapters closest to the query, best first."""
+        if not len(self):
+            return []
+        q = np.asarray(query_vec, dtype=np.float32).reshape(-1)
+        if q.shape[0] != self.vectors.shape[1]:
+            return []
+        scores = self.vectors @ q
+        top_n = min(top_n, len(self))
+        top = np.argpartition(-scores, top_n - 1)[:top_n]
+        return [int(i) for i in top[np.argsort(-scores[top], kind="stable")]]
+
+    def page_filter(self, chapters: List[int]) -> Optional[Dict[str, Any]]:
+        """Pinecone metadata filter matching chunks whose page range overlaps any of `chapters`."""
+        clauses = []
+        for i in chapters:
+            clause = {"page_start": {"$lte": int(self.end_page[i])}, "page_end": {"$gte": int(self.start_page[i])}}
+            if self.book_slug[i]:
+                clause["book_slug"] = {"$eq": self.book_slug[i]}
+            clauses.append(clause)
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    def describe(self, chapters: List[int]) -> List[Dict[str, Any]]:
+        return [{"chapter": self.titles[i], "start_page": int(self.start_page[i]), "end_page": int(self.end_page[i])}
+                for i in chapters]
+
+
+def build_chapter_index_for_chunks(chunks_jsonl, docs: Sequence[Dict[str, Any]], embeddings,
+                                   chapters_path: Optional[Path] = None) -> Optional[Path]:
+    """Build and save the chapter index if a chapters.json sits next to the chunks; returns its path."""
+    chunks_jsonl = Path(chunks_jsonl)
+    chapters_path = Path(chapters_path) if chapters_path else chunks_jsonl.with_name(CHAPTERS_FILENAME)
+    if not chapters_path.exists():
+        print(f"[chapters] no {chapters_path.name} next to {chunks_jsonl}; hierarchical retrieval disabled for this book")
+        return None
+    chapters = json.loads(chapters_path.read_text(encoding="utf-8"))
+    idx = ChapterIndex.build(docs, embeddings, chapters)
+    out = chapter_index_path_for(chunks_jsonl)
+    idx.save(out)
+    print(f"[chapters] {len(idx)} chapter vectors -> {out}")
+    return out
+
+
+_cache: Dict[str, Tuple[Tuple[int, int], ChapterIndex]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_chapter_index(chunks_path) -> Optional[ChapterIndex]:
+    """Load (and cache) the chapter index next to `chunks_path`; None if it was never built."""
+    p = chapter_index_path_for(chunks_path)
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return None
+    key, stamp = str(p.resolve()), (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+    idx = ChapterIndex.load(p)
+    with _cache_lock:
+        _cache[key] = (stamp, idx)
+    return idx
@@ -0,0 +1,175 @@
+# src/vectorstore/chunk_store.py
+"""
+Memory-mapped, read-only view of chunks.jsonl for serving.
+
+The records are copied once into a sidecar file (data/<slug>/chunks.store) sorted by id, with
+offset tables for binary search. Every worker maps the same file, so chunk text lives once in
+the OS page cache instead of once per process as parsed dicts. Lookups decode a single JSON
+record (~10 µs).
+
+Built by the indexer, or by hand:
+  poetry run python -m src.vectorstore.chunk_store data/<slug>/chunks.jsonl
+
+Serving only ever opens a prebuilt store. The header records the size and a content hash of
+the chunks.jsonl it was built from, so a copied or checked-out file (new mtime, same bytes)
+still matches; a missing or stale store makes open_chunk_store return None and the caller
+falls back to parsing chunks.jsonl.
+"""
+import json
+import hashlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .binfile import write_sections, read_sections, map_file
+
+MAGIC = b"CHUNKST1"
+STORE_FILENAME = "chunks.store"
+
+
+def chunk_store_path_for(chunks_path) -> Path:
+    return Path(chunks_path).with_name(STORE_FILENAME)
+
+
+def source_stamp(path: Path) -> Dict[str, Any]:
+    """Size and blake2b digest of the file's bytes (independent of mtime)."""
+    h = hashlib.blake2b(digest_size=16)
+    size = 0
+    with Path(path).open("rb") as fh:
+        while True:
+            block = fh.read(1 << 20)
+            if not block:
+                break
+            h.update(block)
+            size += len(block)
+    return {"size": size, "blake2b": h.hexdigest()}
+
+
+def build_chunk_store(chunks_jsonl, out_path: Optional[Path] = None) -> Path:
+    """Write the sidecar store for `chunks_jsonl`; returns its path."""
+    chunks_jsonl = Path(chunks_jsonl)
+    stamp = source_stamp(chunks_jsonl)
+    recs: List[Tuple[bytes, bytes]] = []
+    slugs = set()
+    with chunks_jsonl.open("rb") as fh:
+        for n, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                j = json.loads(line)
+                recs.append((j["id"].encode("utf-8"), line))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise ValueError(f"{chunks_jsonl}: line {n} is not a chunk record") from None
+            if j.get("book_slug"):
+                slugs.add(j["book_slug"])
+    # file order, for iteration; rows are sorted by id bytes for binary search
+    order = sorted(range(len(recs)), key=lambda i: recs[i][0])
+    rank = np.empty(len(recs), dtype="<u4")
+    rank[np.asarray(order, dtype=np.int64)] = np.arange(len(recs), dtype="<u4")
+    ids = [recs[i][0] for i in order]
+    bodies = [recs[i][1] for i in order]
+    id_off = np.zeros(len(ids) + 1, dtype="<u8")
+    id_off[1:] = np.cumsum([len(x) for x in ids])
+    rec_off = np.zeros(len(bodies) + 1, dtype="<u8")
+    rec_off[1:] = np.cumsum([len(x) for x in bodies])
+
+    header = {"version": 2, "n": len(recs), "source": stamp, "book_slugs": sorted(slugs)}
+    out = Path(out_path) if out_path else chunk_store_path_for(chunks_jsonl)
+    size = write_sections(out, MAGIC, header, [
+        ("ids", b"".join(ids)),
+        ("id_offsets", id_off.tobytes()),
+        ("records", b"".join(bodies)),
+        ("record_offsets", rec_off.tobytes()),
+        ("file_order", rank.tobytes()),  # row of the i-th record in file order
+    ])
+    print(f"[chunk_store] {len(recs)} chunks -> {out} ({size / 1024:.1f} KiB)")
+    return out
+
+
+class ChunkStore(Mapping):
+    """Read-only id -> chunk dict mapping over a memory-mapped chunks.store."""
+
+    def __init__(self, buf):
+        header, sec = read_sections(buf, MAGIC)
+        self._buf = buf
+        self.header = header
+        self.book_slugs: List[str] = header.get("book_slugs") or []
+        self._n = int(header["n"])
+        self._ids = sec["ids"]
+        self._id_off = np.frombuffer(sec["id_offsets"], dtype="<u8")
+        self._recs = sec["records"]
+        self._rec_off = np.frombuffer(sec["record_offsets"], dtype="<u8")
+        self._file_order = np.frombuffer(sec["file_order"], dtype="<u4")
+
+    @classmethod
+    def open(cls, path) -> "ChunkStore":
+        return cls(map_file(path))
+
+    def _id_at(self, row: int) -> bytes:
+        return bytes(self._ids[int(self._id_off[row]):int(self._id_off[row + 1])])
+
+    def _find(self, key: str) -> int:
+        k = key.encode("utf-8")
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_at(mid) < k:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._n and self._id_at(lo) == k else -1
+
+    def _record(self, row: int) -> Dict[str, Any]:
+        return json.loads(bytes(self._recs[int(self._rec_off[row]):int(self._rec_off[row + 1])]))
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        row = self._find(key) if isinstance(key, str) else -1
+        if row < 0:
+            raise KeyError(key)
+        return self._record(row)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> Iterator[str]:
+        for row in self._file_order:
+            yield self._id_at(int(row)).decode("utf-8")
+
+    def values(self):
+        # one pass over the records in file order (ItemsView would search for every key)
+        return (self._record(int(row)) for row in self._file_order)
+
+
+def open_chunk_store(chunks_jsonl) -> Optional[ChunkStore]:
+    """
+    Map the prebuilt store for `chunks_jsonl`. Returns None (and never writes) when it is
+    missing, unreadable or was built from different contents.
+    """
+    chunks_jsonl = Path(chunks_jsonl)
+    p = chunk_store_path_for(chunks_jsonl)
+    if not p.exists():
+        return None
+    try:
+        store = ChunkStore.open(p)
+    except Exception as e:
+        print(f"[chunk_store] {p} unreadable, ignored: {e}")
+        return None
+    source = store.header.get("source") or {}
+    if source.get("size") != chunks_jsonl.stat().st_size or source != source_stamp(chunks_jsonl):
+        print(f"[chunk_store] {p} is stale for {chunks_jsonl}; rebuild with python -m src.vectorstore.chunk_store")
+        return None
+    return store
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.vectorstore.chunk_store <chunks.jsonl>")
+        raise SystemExit(1)
+    build_chunk_store(sys.argv[1])
@@ -0,0 +1,454 @@
+# src/vectorstore/local_store.py
+"""
+Local, in-process vector index with the same query/upsert surface as a Pinecone Index,
+so `upsert_embeddings` / `query_index` work unchanged against it.
+
+Cosine search over a float32 numpy matrix. Meant for benchmarks, tests and small-to-large
+self-hosted deployments; save()/load() persist an index to a directory.
+Metadata filters use Pinecone's syntax ($eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $and, $or).
+
+Memory per vector can be cut with `quantization` ("float16", "int8", "binary"; see
+quantization.py): candidates are generated from the compressed codes and the best
+`top_k * rescore_factor` are rescored at full precision. A loaded index memory-maps the
+matrices, codes, ids, metadata records and filter columns, so worker processes serving the
+same directory share one copy through the page cache. `truncate=True` accepts
+longer vectors and keeps their first `dim` components (text-embedding-3 vectors stay
+meaningful when shortened).
+"""
+import os
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from .quantization import QuantizedCodes, QUANTIZATIONS, DEFAULT_RESCORE_FACTOR
+from .binfile import write_sections, read_sections, map_file
+
+_META_MAGIC = b"LIXMETA1"
+
+EMBED_DIM = int(os.getenv("EMBED_DIM") or os.getenv("EMBED_DIMENSIONS") or "1536")
+
+
+class LocalMatch:
+    """Mimics a Pinecone ScoredVector (attribute access: .id, .score, .metadata)."""
+    __slots__ = ("id", "score", "metadata")
+
+    def __init__(self, id: str, score: float, metadata: Optional[Dict[str, Any]] = None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"LocalMatch(id={self.id!r}, score={self.score:.4f})"
+
+
+class LocalQueryResult:
+    def __init__(self, matches: List[LocalMatch], namespace: str):
+        self.matches = matches
+        self.namespace = namespace
+
+
+class _Records:
+    """Read-only sequence of metadata dicts, decoded on access from a records file."""
+
+    def __init__(self, buf):
+        header, sec = read_sections(buf, _META_MAGIC)
+        self._buf = buf
+        self._n = int(header["n"])
+        self._recs = sec["records"]
+        self._off = np.frombuffer(sec["offsets"], dtype="<u8")
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> Dict[str, Any]:
+        return json.loads(bytes(self._recs[int(self._off[i]):int(self._off[i + 1])]))
+
+    def __iter__(self):
+        return (self[i] for i in range(self._n))
+
+
+class _Namespace:
+    def __init__(self, dim: int, quantization: str = "none"):
+        self.dim = dim
+        self.quantization = quantization
+        self.ids: List[str] = []
+        self.metas: List[Dict[str, Any]] = []
+        self.pos: Dict[str, int] = {}
+        self._rows: List[np.ndarray] = []      # pending rows, stacked lazily
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._codes: Optional[QuantizedCodes] = None
+        self._columns: Dict[Tuple[str, bool], np.ndarray] = {}  # metadata columns for filters
+        self._persisted: Dict[str, Tuple[str, np.ndarray, Optional[List[str]]]] = {}  # key -> (kind, data, vocab)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._rows:
+            self._matrix = np.vstack([self._matrix] + self._rows)
+            self._rows = []
+            self._codes = None
+        return self._matrix
+
+    @property
+    def codes(self) -> QuantizedCodes:
+        m = self.matrix
+        if self._codes is None or len(self._codes) != m.shape[0]:
+            self._codes = QuantizedCodes.encode(self.quantization, m)
+        return self._codes
+
+    def column(self, key: str, numeric: bool = False) -> np.ndarray:
+        """Metadata field `key` across all rows (float64 with NaN for non-numbers when `numeric`)."""
+        col = self._columns.get((key, numeric))
+        if col is None and key in self._persisted:
+            col = self._persisted_column(key, numeric)
+            self._columns[(key, numeric)] = col
+        if col is None:
+            vals = [m.get(key) for m in self.metas]
+            if numeric:
+                col = np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in vals],
+                               dtype=np.float64)
+            else:
+                col = np.empty(len(vals), dtype=object)
+                col[:] = vals
+            self._columns[(key, numeric)] = col
+        return col
+
+    def _persisted_column(self, key: str, numeric: bool) -> np.ndarray:
+        kind, data, vocab = self._persisted[key]
+        if kind == "f8":
+            if numeric:
+                return data
+            return np.where(np.isnan(data), None, data.astype(object))
+        if numeric:
+            return np.full(data.shape[0], np.nan)
+        return np.asarray(list(vocab) + [None], dtype=object)[data]  # code -1 -> None
+
+    def _thaw(self):
+        """Switch a loaded (read-only, mapped) namespace to in-memory lists before writing."""
+        if isinstance(self.ids, list):
+            return
+        self.ids = [str(x) for x in self.ids]
+        self.metas = list(self.metas)
+        self.pos = {vid: j for j, vid in enumerate(self.ids)}
+        self._persisted = {}
+
+    def upsert(self, vec_id: str, v: np.ndarray, metadata: Dict[str, Any]):
+        self._thaw()
+        self._columns.clear()
+        i = self.pos.get(vec_id)
+        if i is None:
+            self.pos[vec_id] = len(self.ids)
+            self.ids.append(vec_id)
+            self.metas.append(metadata)
+            self._rows.append(v[None, :])
+        else:
+            if not self.matrix.flags.writeable:  # memory-mapped from disk
+                self._matrix = np.array(self._matrix)
+            self.matrix[i] = v
+            self.metas[i] = metadata
+            self._codes = None
+
+
+_CMP = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+
+def matches_filter(meta: Dict[str, Any], flt: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Pinecone-style metadata filter against one metadata dict."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches_filter(meta, f) for f in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(meta, f) for f in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, arg in cond.items():
+                fn = _CMP.get(op)
+                if fn is None:
+                    raise ValueError(f"unsupported filter operator: {op}")
+                if not fn(value, arg):
+                    return False
+        elif meta.get(key) != cond:  # shorthand {"field": value}
+            return False
+    return True
+
+
+_RANGE = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+_SCALARS = (str, int, float, bool)
+
+
+def _cond_mask(ns: _Namespace, key: str, op: str, arg: Any) -> np.ndarray:
+    if op in _RANGE and isinstance(arg, (int, float)) and not isinstance(arg, bool):
+        with np.errstate(invalid="ignore"):
+            return _RANGE[op](ns.column(key, numeric=True), arg)  # NaN (missing) compares False
+    fn = _CMP.get(op)
+    if fn is None:
+        raise ValueError(f"unsupported filter operator: {op}")
+    col = ns.column(key)
+    if op in ("$eq", "$ne") and isinstance(arg, (int, float)) and not isinstance(arg, bool):
+        eq = ns.column(key, numeric=True) == arg
+        return eq if op == "$eq" else ~eq
+    if op in ("$eq", "$ne") and isinstance(arg, _SCALARS):
+        eq = np.asarray(col == arg, dtype=bool)
+        return eq if op == "$eq" else ~eq
+    return np.fromiter((fn(v, arg) for v in col), dtype=bool, count=col.shape[0])
+
+
+def filter_mask(ns: _Namespace, flt: Dict[str, Any]) -> np.ndarray:
+    """Vectorised matches_filter over every row of a namespace (same semantics)."""
+    mask = np.ones(len(ns.ids), dtype=bool)
+    for key, cond in flt.items():
+        if key == "$and":
+            for f in cond:
+                mask &= filter_mask(ns, f)
+        elif key == "$or":
+            any_mask = np.zeros(len(ns.ids), dtype=bool)
+            for f in cond:
+                any_mask |= filter_mask(ns, f)
+            mask &= any_mask
+        elif isinstance(cond, dict):
+            for op, arg in cond.items():
+                mask &= _cond_mask(ns, key, op, arg)
+        else:  # shorthand {"field": value}
+            mask &= _cond_mask(ns, key, "$eq", cond)
+    return mask
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(scores.shape[0])
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+def _save_npy(path: Path, arr: np.ndarray):
+    # write-then-rename: readers (and this process) may hold the old file memory-mapped
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as fh:
+        np.save(fh, arr)
+    os.replace(tmp, path)
+
+
+class LocalIndex:
+    """In-memory stand-in for a Pinecone Index (cosine metric)."""
+
+    def __init__(self, dim: int = EMBED_DIM, quantization: str = "none", rescore_factor: Optional[int] = None, truncate: bool = False):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization '{quantization}' (expected one of {QUANTIZATIONS})")
+        self.dim = dim
+        self.quantization = quantization
+        self.rescore_factor = max(1, int(rescore_factor or DEFAULT_RESCORE_FACTOR[quantization]))
+        self.truncate = truncate
+        self._namespaces: Dict[str, _Namespace] = {}
+
+    def _ns(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = self._namespaces[namespace] = _Namespace(self.dim, self.quantization)
+        return ns
+
+    def _prepare(self, values) -> np.ndarray:
+        v = np.asarray(values, dtype=np.float32).reshape(-1)
+        if v.shape[0] > self.dim and self.truncate:
+            v = v[: self.dim]
+        if v.shape[0] != self.dim:
+            raise ValueError(f"vector dimension {v.shape[0]} does not match index dimension {self.dim}")
+        return _normalize(v)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "default"):
+        ns = self._ns(namespace)
+        for v in vectors:
+            ns.upsert(v["id"], self._prepare(v["values"]), v.get("metadata") or {})
+        return {"upserted_count": len(vectors)}
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        namespace: str = "default",
+        include_metadata: bool = True,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> LocalQueryResult:
+        ns = self._namespaces.get(namespace)
+        if ns is None or len(ns.ids) == 0:
+            return LocalQueryResult([], namespace)
+        q = self._prepare(vector)
+
+        # with a filter only the matching rows are scored (e.g. one book, or a few chapters)
+        rows = None
+        if filter:
+            rows = np.flatnonzero(filter_mask(ns, filter))
+            if rows.shape[0] == 0:
+                return LocalQueryResult([], namespace)
+            if rows.shape[0] == len(ns.ids):
+                rows = None
+        n = len(ns.ids) if rows is None else rows.shape[0]
+        top_k = min(top_k, n)
+
+        if self.quantization == "none":
+            scores = (ns.matrix if rows is None else ns.matrix[rows]) @ q
+            sel = _top_indices(scores, top_k)
+            top, exact = (sel if rows is None else rows[sel]), scores[sel]
+        else:
+            # candidate generation on compressed codes, then full-precision rescoring
+            approx = ns.codes.scores(q, rows)
+            sel = _top_indices(approx, min(n, top_k * self.rescore_factor))
+            cand = np.sort(sel if rows is None else rows[sel])  # sequential reads from a memory-mapped matrix
+            cand_scores = ns.matrix[cand] @ q
+            order = _top_indices(cand_scores, min(top_k, cand.shape[0]))
+            top, exact = cand[order], cand_scores[order]
+
+        matches = [
+            LocalMatch(str(ns.ids[i]), float(s), ns.metas[i] if include_metadata else None)
+            for i, s in zip(top, exact)
+        ]
+        return LocalQueryResult(matches, namespace)
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dim,
+            "namespaces": {name: {"vector_count": len(ns.ids)} for name, ns in self._namespaces.items()},
+            "total_vector_count": sum(len(ns.ids) for ns in self._namespaces.values()),
+        }
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Bytes held by search codes vs the full-precision matrices (which may be memory-mapped)."""
+        codes = full = 0
+        mapped = True
+        for ns in self._namespaces.values():
+            m = ns.matrix
+            full += int(m.nbytes)
+            mapped = mapped and isinstance(m, np.memmap)
+            if self.quantization != "none":
+                codes += ns.codes.nbytes
+        n = sum(len(ns.ids) for ns in self._namespaces.values())
+        resident = codes + (0 if (mapped and self.quantization != "none") else full)
+        return {
+            "vectors": n,
+            "quantization": self.quantization,
+            "codes_bytes": codes,
+            "full_precision_bytes": full,
+            "full_precision_mmapped": bool(mapped and n > 0),
+            "resident_bytes": resident,
+            "bytes_per_vector": round(resident / n, 2) if n else 0.0,
+        }
+
+    def save(self, path: str):
+        """
+        Persist every namespace to directory `path` as memory-mappable files: manifest.json, plus
+        per namespace the float32 matrix, ids, metadata records, filter columns and, when
+        quantized, the codes.
+        """
+        out = Path(path)
+        out.mkdir(parents=True, exist_ok=True)
+        manifest = {"version": 2, "dim": self.dim, "quantization": self.quantization, "truncate": self.truncate,
+                    "namespaces": []}
+        for i, (name, ns) in enumerate(self._namespaces.items()):
+            _save_npy(out / f"ns{i}.f32.npy", np.ascontiguousarray(ns.matrix, dtype=np.float32))
+            _save_npy(out / f"ns{i}.ids.npy", np.asarray([str(x) for x in ns.ids], dtype=str))
+            recs = [json.dumps(m, ensure_ascii=False).encode("utf-8") for m in ns.metas]
+            offsets = np.zeros(len(recs) + 1, dtype="<u8")
+            offsets[1:] = np.cumsum([len(r) for r in recs])
+            write_sections(out / f"ns{i}.meta", _META_MAGIC, {"n": len(recs)},
+                           [("records", b"".join(recs)), ("offsets", offsets.tobytes())])
+            entry = {"name": name, "count": len(ns.ids), "columns": self._save_columns(out, i, ns)}
+            if self.quantization != "none":
+                codes = ns.codes
+                _save_npy(out / f"ns{i}.{codes.kind}.npy", codes.codes)
+                if codes.scale is not None:
+                    _save_npy(out / f"ns{i}.scale.npy", codes.scale)
+            manifest["namespaces"].append(entry)
+        tmp = out / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, out / "manifest.json")
+
+    @staticmethod
+    def _save_columns(out: Path, i: int, ns: _Namespace) -> Dict[str, Any]:
+        """Numeric fields as float64 (NaN = missing), string fields dictionary-encoded as int32."""
+        cols: Dict[str, Any] = {}
+        keys = sorted({k for m in ns.metas for k in m})
+        for j, key in enumerate(keys):
+            vals = [m.get(key) for m in ns.metas]
+            fname = f"ns{i}.col{j}.npy"
+            if all(v is None or (isinstance(v, (int, float)) and not isinstance(v, bool)) for v in vals):
+                _save_npy(out / fname, np.array([np.nan if v is None else v for v in vals], dtype=np.float64))
+                cols[key] = {"kind": "f8", "file": fname}
+            elif all(v is None or isinstance(v, str) for v in vals):
+                vocab = sorted({v for v in vals if v is not None})
+                code = {v: c for c, v in enumerate(vocab)}
+                _save_npy(out / fname, np.array([code.get(v, -1) for v in vals], dtype=np.int32))
+                cols[key] = {"kind": "str", "file": fname, "vocab": vocab}
+        return cols
+
+    @classmethod
+    def load(cls, path: str, quantization: Optional[str] = None, mmap: bool = True, **kwargs) -> "LocalIndex":
+        """
+        Load a saved index. With mmap=True the full-precision matrices stay on disk and pages
+        are read on demand (rescoring touches only candidate rows). Passing a different
+        `quantization` than the one saved re-encodes the codes at load time. A single .npz
+        file (the layout written before save() switched to a directory) is read into memory.
+        """
+        src = Path(path)
+        if not src.is_dir():
+            return cls._load_npz(src if src.exists() else src.with_name(src.name + ".npz"), quantization, **kwargs)
+        manifest = json.loads((src / "manifest.json").read_text(encoding="utf-8"))
+        kind = quantization or manifest.get("quantization", "none")
+        idx = cls(
+            dim=int(manifest["dim"]),
+            quantization=kind,
+            rescore_factor=kwargs.get("rescore_factor"),
+            truncate=bool(kwargs.get("truncate", manifest.get("truncate", False))),
+        )
+        mode = "r" if mmap else None
+        for i, entry in enumerate(manifest["namespaces"]):
+            ns = idx._ns(entry["name"])
+            ns.ids = np.load(src / f"ns{i}.ids.npy", mmap_mode=mode)
+            meta_file = src / f"ns{i}.meta"
+            ns.metas = _Records(map_file(meta_file) if mmap else meta_file.read_bytes())
+            for key, col in (entry.get("columns") or {}).items():
+                ns._persisted[key] = (col["kind"], np.load(src / col["file"], mmap_mode=mode), col.get("vocab"))
+            ns._matrix = np.load(src / f"ns{i}.f32.npy", mmap_mode=mode)
+            codes_file = src / f"ns{i}.{kind}.npy"
+            if kind != "none" and codes_file.exists():
+                scale_file = src / f"ns{i}.scale.npy"
+                ns._codes = QuantizedCodes(kind, np.load(codes_file, mmap_mode=mode),
+                                           np.load(scale_file) if kind == "int8" else None)
+        return idx
+
+    @classmethod
+    def _load_npz(cls, path: Path, quantization: Optional[str] = None, **kwargs) -> "LocalIndex":
+        """Old single-file layout: arrays m{i} plus a JSON manifest with ids/metas inline."""
+        with np.load(path) as data:
+            manifest = json.loads(data["manifest"].tobytes().decode("utf-8"))
+            idx = cls(dim=int(manifest["dim"]), quantization=quantization or "none",
+                      rescore_factor=kwargs.get("rescore_factor"), truncate=bool(kwargs.get("truncate", False)))
+            for i, entry in enumerate(manifest["namespaces"]):
+                ns = idx._ns(entry["name"])
+                ns.ids = list(entry["ids"])
+                ns.metas = list(entry["metas"])
+                ns.pos = {vid: j for j, vid in enumerate(ns.ids)}
+                ns._matrix = np.ascontiguousarray(data[f"m{i}"], dtype=np.float32)
+        return idx
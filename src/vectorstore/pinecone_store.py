@@ -5,27 +5,41 @@ Handles creation, upsert, and querying.
 """
 
 import os
-from typing import List, Dict, Any
-from pinecone import Pinecone, ServerlessSpec
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Union
+
+from src.telemetry.metrics import span
+from src.telemetry.startup import lazy_import
 
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = os.getenv("PINECONE_ENV", "gcp-starter")  # default Pinecone serverless env
 PINECONE_INDEX = os.getenv("PINECONE_INDEX", "rebuilding-milo-index")
-EMBED_DIM = int(os.getenv("EMBED_DIM", "1536"))  # OpenAI text-embedding-3-small uses 1536 dims
+EMBED_DIM = int(os.getenv("EMBED_DIM") or os.getenv("EMBED_DIMENSIONS") or "1536")  # OpenAI text-embedding-3-small uses 1536 dims
+# optional: target the index data plane directly (skips list/create calls to the control plane)
+PINECONE_INDEX_HOST = os.getenv("PINECONE_INDEX_HOST")
+PINECONE_NAMESPACE = os.getenv("PINECONE_NAMESPACE", "default")
+# how retrieval is restricted to the book being asked about:
+#   "filter"    shared namespace + metadata filter on book_slug (default; works with existing indexes)
+#   "namespace" one namespace per book_slug (set before indexing; run_index writes per-book namespaces)
+#   "off"       no scoping
+BOOK_SCOPE = os.getenv("BOOK_SCOPE", "filter").lower()
 
 
-def get_pinecone_client() -> Pinecone:
+def get_pinecone_client() -> Any:
     if not PINECONE_API_KEY:
         raise RuntimeError("PINECONE_API_KEY not found in environment / .env")
-    return Pinecone(api_key=PINECONE_API_KEY)
+    # the SDK is imported on first use: it is the slowest import after openai
+    return lazy_import("pinecone").Pinecone(api_key=PINECONE_API_KEY)
 
 
-def get_or_create_index(pc: Pinecone) -> Any:
+def get_or_create_index(pc: Any) -> Any:
     """
     Creates index if it doesn't exist, or returns existing.
     Uses ServerlessSpec which works without choosing regions manually.
+    When PINECONE_INDEX_HOST is set the index is targeted by host and never created.
     """
+    if PINECONE_INDEX_HOST:
+        return pc.Index(host=PINECONE_INDEX_HOST)
     indexes = pc.list_indexes().names()
     if PINECONE_INDEX not in indexes:
         print(f"[pinecone] creating index '{PINECONE_INDEX}'...")
@@ -33,7 +47,7 @@ def get_or_create_index(pc: Pinecone) -> Any:
             name=PINECONE_INDEX,
             dimension=EMBED_DIM,
             metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            spec=lazy_import("pinecone").ServerlessSpec(cloud="aws", region="us-east-1")
         )
     return pc.Index(PINECONE_INDEX)
 
@@ -60,17 +74,51 @@ def upsert_embeddings(
     print(f"[pinecone] upserted {len(vectors)} vectors to namespace '{namespace}'")
 
 
+def book_namespace(book_slug: Optional[str], default: str = PINECONE_NAMESPACE) -> str:
+    """Namespace a book's vectors are written to / read from under BOOK_SCOPE."""
+    if BOOK_SCOPE == "namespace" and book_slug:
+        return book_slug
+    return default
+
+
+def book_scope(book_slugs: Iterable[str], default_namespace: str = PINECONE_NAMESPACE) -> Tuple[Union[str, List[str]], Optional[Dict[str, Any]]]:
+    """
+    Return (namespace, metadata_filter) that restricts a query to `book_slugs`.
+    In "namespace" mode no filter is needed: one book is its own namespace, several books give
+    a list of namespaces (query_index searches each and merges). Otherwise filter on book_slug.
+    """
+    slugs = sorted({s for s in book_slugs if s})
+    if not slugs or BOOK_SCOPE in ("off", "none"):
+        return default_namespace, None
+    if BOOK_SCOPE == "namespace":
+        return (slugs[0] if len(slugs) == 1 else slugs), None
+    if len(slugs) == 1:
+        return default_namespace, {"book_slug": {"$eq": slugs[0]}}
+    return default_namespace, {"book_slug": {"$in": slugs}}
+
+
 def query_index(
     index,
     embedding: List[float],
     top_k: int = 5,
-    namespace: str = "default",
+    namespace: Union[str, List[str]] = "default",
+    filter: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
-    """Query the Pinecone index."""
-    res = index.query(
-        namespace=namespace,
-        vector=embedding,
-        top_k=top_k,
-        include_metadata=True
-    )
+    """
+    Query the Pinecone index. `filter` is a Pinecone metadata filter, applied server-side.
+    A list of namespaces is queried one by one and the matches merged by score (top_k overall).
+    """
+    if not isinstance(namespace, str):
+        matches = [m for ns in namespace for m in query_index(index, embedding, top_k, ns, filter)]
+        matches.sort(key=lambda m: m.score if hasattr(m, "score") else m["score"], reverse=True)
+        return matches[:top_k]
+    kwargs = {"filter": filter} if filter else {}
+    with span("vectorstore.query"):
+        res = index.query(
+            namespace=namespace,
+            vector=embedding,
+            top_k=top_k,
+            include_metadata=True,
+            **kwargs
+        )
     return res.matches
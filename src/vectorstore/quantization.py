@@ -0,0 +1,82 @@
+# src/vectorstore/quantization.py
+"""
+Compressed codes for stored vectors, used by LocalIndex for candidate generation.
+
+  kind      bytes/dim   scoring
+  none      4           exact float32 dot product
+  float16   2           float16 codes upcast blockwise (CPU-bound in numpy; prefer int8)
+  int8      1           int8 codes with a per-dimension scale (folded into the query)
+  binary    1/8         sign bits, Hamming distance (pre-filter only; always rescored)
+
+Approximate scores pick `top_k * rescore_factor` candidates which LocalIndex then rescores
+against the full-precision matrix (kept on disk / memory-mapped when loaded from a saved index).
+"""
+from typing import Optional
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "float16", "int8", "binary")
+
+# default candidates rescored at full precision = top_k * factor; sign bits rank coarsely,
+# so binary needs a much deeper candidate list than the scalar codes
+DEFAULT_RESCORE_FACTOR = {"none": 1, "float16": 2, "int8": 4, "binary": 32}
+
+# rows upcast per block when scoring float16/int8 codes; small blocks keep the float32
+# scratch buffer in cache, which matters more than BLAS call overhead here
+_BLOCK_ROWS = 512
+
+
+class QuantizedCodes:
+    def __init__(self, kind: str, codes: np.ndarray, scale: Optional[np.ndarray] = None):
+        if kind not in QUANTIZATIONS:
+            raise ValueError(f"unknown quantization '{kind}' (expected one of {QUANTIZATIONS})")
+        self.kind = kind
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def encode(cls, kind: str, matrix: np.ndarray) -> "QuantizedCodes":
+        """Encode an (n, dim) float32 matrix of unit vectors."""
+        if kind == "none":
+            return cls(kind, np.asarray(matrix, dtype=np.float32))
+        if kind == "float16":
+            return cls(kind, np.asarray(matrix, dtype=np.float16))
+        if kind == "int8":
+            # symmetric per-dimension scale: the largest |x| in each column maps to 127
+            absmax = np.abs(matrix).max(axis=0) if matrix.shape[0] else np.ones(matrix.shape[1], np.float32)
+            scale = np.where(absmax > 0, absmax / 127.0, 1.0).astype(np.float32)
+            codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+            return cls(kind, codes, scale)
+        if kind == "binary":
+            return cls(kind, np.packbits(np.asarray(matrix) > 0, axis=1))
+        raise ValueError(f"unknown quantization '{kind}'")
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + (self.scale.nbytes if self.scale is not None else 0))
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    def scores(self, q: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate similarity to unit query `q` (higher is better) of every stored row,
+        or only of `rows` (positions, ascending) when given.
+        """
+        codes = self.codes if rows is None else self.codes[rows]
+        if self.kind == "none":
+            return codes @ q
+        if self.kind == "binary":
+            qbits = np.packbits(q > 0)
+            ham = np.bitwise_count(np.bitwise_xor(codes, qbits)).sum(axis=1, dtype=np.int32)
+            return -ham.astype(np.float32)
+        qq = (q * self.scale).astype(np.float32) if self.kind == "int8" else q.astype(np.float32)
+        n = codes.shape[0]
+        out = np.empty(n, dtype=np.float32)
+        buf = np.empty((min(n, _BLOCK_ROWS), codes.shape[1]), dtype=np.float32)
+        for i in range(0, n, _BLOCK_ROWS):
+            block = codes[i:i + _BLOCK_ROWS]
+            scratch = buf[: block.shape[0]]
+            np.copyto(scratch, block, casting="unsafe")
+            np.matmul(scratch, qq, out=out[i:i + block.shape[0]])
+        return out
@@ -0,0 +1,68 @@
+# tests/test_bm25_index.py
+import numpy as np
+import pytest
+
+from src.vectorstore.bm25_index import BM25Index, _encode_varints, _decode_varints, tokenize
+
+DOCS = [
+    {"id": "c0", "text": "Squats build strength in the legs and hips."},
+    {"id": "c1", "text": "Knee pain after squats often comes from poor form."},
+    {"id": "c2", "text": "Sleep and protein help recovery after training."},
+    {"id": "c3", "text": "Deadlifts and squats train the posterior chain."},
+]
+
+
+@pytest.mark.parametrize("values", [
+    [],
+    [0],
+    [1, 127, 128, 129],
+    [300, 16383, 16384, 2 ** 21 - 1, 2 ** 21, 2 ** 28, 2 ** 35 - 1],
+])
+def test_varint_round_trip(values):
+    buf = _encode_varints(values)
+    assert _decode_varints(buf).tolist() == values
+
+
+def test_varint_sizes():
+    assert len(_encode_varints([127])) == 1
+    assert len(_encode_varints([128])) == 2
+    assert len(_encode_varints([2 ** 21])) == 4
+
+
+def test_varint_random_round_trip():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2 ** 35, size=2000).tolist()
+    assert _decode_varints(_encode_varints(values)).tolist() == values
+
+
+def test_postings_decode_to_doc_numbers_and_tf():
+    idx = BM25Index.build(DOCS)
+    docs, tf = idx._postings(idx.term_pos.get("squats"))
+    assert docs.tolist() == [0, 1, 3]
+    assert tf.tolist() == [1, 1, 1]
+
+
+def test_search_ranks_matching_docs():
+    idx = BM25Index.build(DOCS)
+    hits = idx.search("knee pain squats", top_k=10)
+    assert hits[0][0] == "c1"
+    assert {h[0] for h in hits} == {"c0", "c1", "c3"}
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+    assert idx.search("unrelated words", top_k=10) == []
+    assert len(idx.search("squats", top_k=2)) == 2
+
+
+def test_save_load_round_trip(tmp_path):
+    idx = BM25Index.build(DOCS)
+    path = tmp_path / "bm25.idx"
+    idx.save(path)
+    for mmap in (False, True):
+        loaded = BM25Index.load(path, mmap=mmap)
+        assert loaded.n_docs == idx.n_docs
+        assert list(loaded.terms) == list(idx.terms)
+        for q in ("squats", "recovery protein", "posterior chain deadlifts"):
+            assert loaded.search(q) == pytest.approx(idx.search(q))
+
+
+def test_tokenize_drops_stopwords_and_single_chars():
+    assert tokenize("The knee, a joint: I x-ray it") == ["knee", "joint", "ray"]
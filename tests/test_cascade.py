@@ -0,0 +1,83 @@
+# tests/test_cascade.py
+from src.reranker.cascade import CascadeReranker
+
+
+def _matches(*scores):
+    return [{"id": f"m{i}", "score": s} for i, s in enumerate(scores)]
+
+
+def _ids(matches):
+    return [m["id"] for m in matches]
+
+
+class _FakeCrossEncoder:
+    """Stands in for CrossEncoderReranker: records calls and returns each list reversed."""
+
+    def __init__(self):
+        self.calls = []
+
+    def rerank(self, query, matches):
+        self.calls.append(("rerank", [query], [_ids(matches)]))
+        return list(reversed(matches))
+
+    def rerank_batch(self, queries, matches_list):
+        self.calls.append(("rerank_batch", list(queries), [_ids(m) for m in matches_list]))
+        return [list(reversed(m)) for m in matches_list]
+
+
+def _cascade(**kw):
+    rr = CascadeReranker(**kw)
+    rr.cross_encoder = _FakeCrossEncoder()
+    return rr
+
+
+def test_window_keeps_the_band_around_the_top_hit():
+    rr = _cascade(max_k=2, band=0.12)
+    assert _ids(rr._window(_matches(0.9, 0.85, 0.8, 0.7, 0.5))) == ["m0", "m1", "m2"]
+
+
+def test_window_never_shrinks_below_max_k_or_grows_past_max_window():
+    rr = _cascade(max_k=2, band=0.12, max_window=4)
+    assert _ids(rr._window(_matches(0.9, 0.5, 0.4))) == ["m0", "m1"]
+    assert _ids(rr._window(_matches(0.9))) == ["m0"]
+    assert len(rr._window(_matches(*[0.8] * 10))) == 4
+
+
+def test_prune_single_survivor_skips_the_cross_encoder():
+    rr = _cascade()
+    survivors, needs_ce = rr._prune(_matches(0.9, 0.5))  # 0.5 < 0.9 * rel_threshold
+    assert _ids(survivors) == ["m0"] and needs_ce is False
+
+
+def test_prune_flags_close_calls_for_the_cross_encoder():
+    rr = _cascade()
+    survivors, needs_ce = rr._prune(_matches(0.8, 0.78, 0.77, 0.3))
+    assert _ids(survivors) == ["m0", "m1", "m2"] and needs_ce is True
+
+
+def test_decisive_margin_returns_without_cross_encoding():
+    rr = _cascade(decisive_margin=0.08)
+    out = rr.rerank("q", _matches(0.9, 0.8, 0.79))
+    assert _ids(out) == ["m0", "m1", "m2"]
+    assert rr.cross_encoder.calls == []
+
+
+def test_close_call_is_cross_encoded():
+    rr = _cascade()
+    out = rr.rerank("q", _matches(0.8, 0.78, 0.77))
+    assert _ids(out) == ["m2", "m1", "m0"]
+    assert rr.cross_encoder.calls == [("rerank", ["q"], [["m0", "m1", "m2"]])]
+
+
+def test_rerank_batch_maps_cross_encoder_results_back_to_their_slots():
+    rr = _cascade(max_k=2)
+    queries = ["close-a", "empty", "decisive", "close-b"]
+    lists = [
+        _matches(0.8, 0.78),
+        [],
+        _matches(0.9, 0.81, 0.8),
+        [{"id": "b0", "score": 0.6}, {"id": "b1", "score": 0.59}],
+    ]
+    out = rr.rerank_batch(queries, lists)
+    assert rr.cross_encoder.calls == [("rerank_batch", ["close-a", "close-b"], [["m0", "m1"], ["b0", "b1"]])]
+    assert [_ids(o) for o in out] == [["m1", "m0"], [], ["m0", "m1"], ["b1", "b0"]]
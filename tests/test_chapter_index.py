@@ -0,0 +1,68 @@
+# tests/test_chapter_index.py
+import numpy as np
+
+from src.pipeline import rag_pipeline
+from src.vectorstore.chapter_index import ChapterIndex
+
+
+def _doc(page, slug="b"):
+    return {"page_start": page, "page_end": page, "book_slug": slug}
+
+
+def _book():
+    # pages 1-2 front matter, chapter A 3-5, chapter B from 6 with no end_page; chunks run to page 12
+    docs = [_doc(p) for p in (1, 2, 3, 4, 6, 9, 12)]
+    emb = [[1, 0, 0]] * 2 + [[0, 1, 0]] * 2 + [[0, 0, 1]] * 3
+    chapters = [{"chapter": "B", "start_page": 6, "end_page": None}, {"chapter": "A", "start_page": 3, "end_page": 5}]
+    return docs, emb, chapters
+
+
+def test_build_adds_front_matter_and_extends_the_open_last_chapter():
+    idx = ChapterIndex.build(*_book())
+    assert idx.titles == ["(front matter)", "A", "B"]
+    assert idx.start_page.tolist() == [1, 3, 6]
+    assert idx.end_page.tolist() == [2, 5, 12]
+    assert idx.chunk_count.tolist() == [2, 2, 3]
+
+
+def test_open_middle_chapter_ends_before_the_next_one():
+    docs, emb, _ = _book()
+    chapters = [{"chapter": "A", "start_page": 3, "end_page": None}, {"chapter": "B", "start_page": 6, "end_page": 12}]
+    idx = ChapterIndex.build(docs, emb, chapters)
+    assert idx.end_page.tolist() == [2, 5, 12]
+
+
+def test_select_orders_chapters_by_similarity():
+    idx = ChapterIndex.build(*_book())
+    assert idx.select([0.1, 0.2, 0.9], top_n=2) == [2, 1]
+    assert idx.select([1.0, 0.0, 0.0], top_n=1) == [0]
+    assert idx.select([1.0, 0.0]) == []  # wrong dimension
+
+
+def test_page_filter_covers_every_page_of_the_open_chapter():
+    idx = ChapterIndex.build(*_book())
+    flt = idx.page_filter([2])
+    assert flt == {"page_start": {"$lte": 12}, "page_end": {"$gte": 6}, "book_slug": {"$eq": "b"}}
+    assert set(idx.page_filter([0, 1])) == {"$or"} and len(idx.page_filter([0, 1])["$or"]) == 2
+    assert idx.page_filter([]) is None
+
+
+def test_dense_candidates_falls_back_to_flat_search(monkeypatch):
+    idx = ChapterIndex.build(*_book())
+    queries = []
+
+    def query_index(index, q_emb, top_k, namespace, filter):
+        queries.append(filter)
+        n = 1 if "$and" in filter else 5
+        return [{"id": f"m{i}", "score": 0.5} for i in range(n)]
+
+    monkeypatch.setattr(rag_pipeline, "query_index", query_index)
+    scope = {"book_slug": {"$eq": "b"}}
+
+    out = rag_pipeline.dense_candidates(None, [0, 0, 1], 10, "ns", scope, idx, min_matches=1, mode="chapters")
+    chosen = idx.select([0, 0, 1], rag_pipeline.CHAPTER_TOP_N)
+    assert chosen[0] == 2
+    assert len(out) == 1 and queries[-1] == {"$and": [scope, idx.page_filter(chosen)]}
+
+    out = rag_pipeline.dense_candidates(None, [0, 0, 1], 10, "ns", scope, idx, min_matches=3, mode="chapters")
+    assert len(out) == 5 and queries[-1] == scope
@@ -0,0 +1,178 @@
+# tests/test_chat.py
+import json
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.pipeline import chat
+from src.pipeline.chat import ChatSession, SessionStore
+
+ID2DOC = {
+    f"c{i}": {"id": f"c{i}", "page_start": 10 - i, "page_end": 10 - i, "chunk_index": i, "text": f"chunk {i} " * 20}
+    for i in range(8)
+}
+
+
+def _answer(session, question, text="answer", response_id="resp", cached=0, sources=()):
+    session.add_answer(question, text, [{"id": i} for i in sources], response_id,
+                       {"input_tokens": 100, "cached_tokens": cached, "output_tokens": 5})
+
+
+def test_context_is_append_only_and_ordered():
+    s = ChatSession("s", "chunks.jsonl")
+    ctx = s.add_question("q1", [1.0, 0.0], ["c1", "c0", "c2"], ID2DOC)
+    assert ctx == {"reused": False, "added": 3, "chunks": 3, "rollover": False}
+    assert s.context_ids == ["c2", "c1", "c0"]  # page order, not retrieval order
+    assert s.items[0]["content"].startswith("CONTEXT:\n[S1] (page 8-8")
+    _answer(s, "q1")
+    prefix = [dict(i) for i in s.items]
+
+    ctx = s.add_question("q2", [0.0, 1.0], ["c0", "c3"], ID2DOC)
+    assert ctx["added"] == 1 and s.context_ids == ["c2", "c1", "c0", "c3"]
+    assert s.items[: len(prefix)] == prefix  # earlier turns unchanged: cacheable prefix
+    assert s.items[-1]["content"].startswith("ADDITIONAL CONTEXT:\n[S4]")
+
+
+def test_request_input_sends_only_new_items_with_server_state(monkeypatch):
+    monkeypatch.setattr(chat, "CHAT_SERVER_STATE", True)
+    s = ChatSession("s", "chunks.jsonl")
+    s.add_question("q1", [1.0, 0.0], ["c0"], ID2DOC)
+    assert s.request_input() == (s.items, None)
+    _answer(s, "q1", response_id="resp_1")
+    s.add_question("q2", [1.0, 0.0], None, ID2DOC)
+    items, prev = s.request_input()
+    assert prev == "resp_1" and items == s.items[-1:]
+
+    monkeypatch.setattr(chat, "CHAT_SERVER_STATE", False)
+    assert s.request_input() == (s.items, None)
+
+
+def test_snapshot_restore_undoes_a_failed_turn():
+    s = ChatSession("s", "chunks.jsonl")
+    s.add_question("q1", [1.0, 0.0], ["c0", "c1"], ID2DOC)
+    _answer(s, "q1", cached=40)
+    state = s.snapshot()
+    before = (list(s.context_ids), list(s.items), s.context_chars, dict(s.usage), len(s.query_embs))
+
+    s.add_question("q2", [0.0, 1.0], ["c5", "c6"], ID2DOC)
+    s.usage["input_tokens"] += 999
+    s.restore(state)
+    assert (s.context_ids, s.items, s.context_chars, s.usage, len(s.query_embs)) == before
+    assert isinstance(s.lock, asyncio.Lock)
+
+
+def test_closest_turn_and_reuse():
+    s = ChatSession("s", "chunks.jsonl")
+    assert s.closest_turn([1.0, 0.0]) == (-1, 0.0)
+    assert not s.can_reuse()
+    s.add_question("q1", [1.0, 0.0], ["c0"], ID2DOC)
+    _answer(s, "q1")
+    s.add_question("q2", [0.0, 1.0], ["c1"], ID2DOC)
+    _answer(s, "q2")
+    turn, sim = s.closest_turn([0.1, 1.0])
+    assert turn == 1 and sim == pytest.approx(1.0 / np.sqrt(1.01))
+    assert s.can_reuse()
+    ctx = s.add_question("q3", [0.1, 1.0], None, ID2DOC)
+    assert ctx == {"reused": True, "added": 0, "chunks": 2, "rollover": False}
+
+
+def test_rollover_on_context_size(monkeypatch):
+    monkeypatch.setattr(chat, "CHAT_MAX_CONTEXT_CHARS", 600)
+    s = ChatSession("s", "chunks.jsonl")
+    s.add_question("q1", [1.0, 0.0], ["c0", "c1"], ID2DOC)
+    _answer(s, "q1", text="a1", response_id="resp_1")
+    ctx = s.add_question("q2", [0.0, 1.0], ["c4", "c5"], ID2DOC)
+    assert ctx == {"reused": False, "added": 2, "chunks": 2, "rollover": True}
+    assert s.context_ids == ["c5", "c4"] and s.rollovers == 1
+    assert s.last_response_id is None and s.request_input()[1] is None
+    contents = [i["content"] for i in s.items]
+    assert contents[0].startswith("CONTEXT:\n[S1]")
+    assert [i["role"] for i in s.items] == ["user", "user", "assistant", "user"]  # kept turn q1/a1
+    assert contents[1] == "QUESTION: q1" and contents[2] == "a1"
+
+
+def test_repeated_question_after_rollover_is_not_reused(monkeypatch):
+    monkeypatch.setattr(chat, "CHAT_MAX_CONTEXT_CHARS", 600)
+    s = ChatSession("s", "chunks.jsonl")
+    s.add_question("q1", [1.0, 0.0], ["c0", "c1"], ID2DOC)
+    _answer(s, "q1", sources=["c0", "c1"])
+    assert s.closest_turn([1.0, 0.0]) == (0, pytest.approx(1.0))
+    assert s.add_question("q2", [0.0, 1.0], ["c4", "c5"], ID2DOC)["rollover"] is True
+    _answer(s, "q2", sources=["c4", "c5"])
+    # q1's chunks left the prompt with the rollover, so asking it again must retrieve
+    turn, sim = s.closest_turn([1.0, 0.0])
+    assert turn == 1 and sim == pytest.approx(0.0)
+
+
+def test_rollover_on_turn_count(monkeypatch):
+    monkeypatch.setattr(chat, "CHAT_MAX_TURNS", 2)
+    s = ChatSession("s", "chunks.jsonl")
+    for n in range(2):
+        s.add_question(f"q{n}", [1.0, 0.0], [f"c{n}"], ID2DOC)
+        _answer(s, f"q{n}")
+    assert not s.can_reuse()
+    assert s.add_question("q2", [1.0, 0.0], ["c2"], ID2DOC)["rollover"] is True
+    assert len([i for i in s.items if i["role"] == "assistant"]) == 1  # CHAT_MAX_TURNS // 2
+
+
+def test_usage_summary():
+    s = ChatSession("s", "chunks.jsonl")
+    assert s.usage_summary()["cached_ratio"] == 0.0
+    _answer(s, "q1", cached=0)
+    _answer(s, "q2", cached=100)
+    assert s.usage_summary() == {"input_tokens": 200, "cached_tokens": 100, "output_tokens": 10, "cached_ratio": 0.5}
+
+
+def test_session_store_lru_and_ttl(monkeypatch):
+    store = SessionStore(max_sessions=2, ttl_s=60)
+    a, b = store.create("x"), store.create("x")
+    assert a.id != b.id and len(a.id) == 32
+    store.get(a.id)  # a is now most recent
+    c = store.create("x")
+    assert store.get(b.id) is None and store.get(a.id) is a and store.get(c.id) is c
+    a.updated_at -= 120
+    assert store.get(a.id) is None
+    assert store.delete(c.id) and not store.delete(c.id)
+
+
+def test_unknown_session_id_is_not_adopted(tmp_path, monkeypatch):
+    from src.api import app as app_module
+
+    chunks = tmp_path / "chunks.jsonl"
+    chunks.write_text("".join(json.dumps(d) + "\n" for d in ID2DOC.values()))
+
+    async def embed(question):
+        return [1.0, 0.0]
+
+    async def retrieve(req, chunks_path, id2doc, q_emb, lexical=None):
+        return [{"id": "c0", "score": 0.9, "metadata": {}}]
+
+    async def respond(session):
+        return SimpleNamespace(id="resp_1", output=[{"content": [{"text": "ok"}]}],
+                               usage={"input_tokens": 10, "output_tokens": 2})
+
+    monkeypatch.setattr(app_module, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(app_module, "_embed_question", embed)
+    monkeypatch.setattr(app_module, "_retrieve", retrieve)
+    monkeypatch.setattr(app_module, "_chat_respond", respond)
+    monkeypatch.setattr(app_module, "_chat_sessions", SessionStore())
+
+    req = app_module.ChatRequest(chunks_path=str(chunks), question="q", session_id="attacker-chosen")
+    out = asyncio.run(app_module._chat(req))
+    assert out["session_restarted"] is True
+    assert out["session_id"] != "attacker-chosen"
+    assert app_module._chat_sessions.get("attacker-chosen") is None
+
+    async def no_matches(req, chunks_path, id2doc, q_emb, lexical=None):
+        return []
+
+    monkeypatch.setattr(app_module, "_retrieve", no_matches)
+    empty = asyncio.run(app_module._chat(app_module.ChatRequest(chunks_path=str(chunks), question="q", session_id="gone")))
+    assert empty["reason"] == "no matches found" and empty["session_restarted"] is True
+    monkeypatch.setattr(app_module, "_retrieve", retrieve)
+
+    follow_up = app_module.ChatRequest(chunks_path=str(chunks), question="q2", session_id=out["session_id"])
+    out2 = asyncio.run(app_module._chat(follow_up))
+    assert out2["session_id"] == out["session_id"] and out2["session_restarted"] is False
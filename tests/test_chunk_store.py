@@ -0,0 +1,126 @@
+# tests/test_chunk_store.py
+import os
+import json
+
+import numpy as np
+import pytest
+
+from src.vectorstore.binfile import write_sections, read_sections, map_file
+from src.vectorstore.chunk_store import (
+    ChunkStore, build_chunk_store, open_chunk_store, chunk_store_path_for,
+)
+from src.pipeline import rag_pipeline
+
+DOCS = [
+    {"id": "b-002", "book_slug": "b", "page_start": 2, "text": "second"},
+    {"id": "a-001", "book_slug": "a", "page_start": 1, "text": "first, with ünïcode"},
+    {"id": "b-010", "book_slug": "b", "page_start": 10, "text": "third"},
+]
+
+
+def _write_chunks(path, docs=DOCS):
+    path.write_text("".join(json.dumps(d, ensure_ascii=False) + "\n" for d in docs) + "\n", encoding="utf-8")
+    return path
+
+
+def test_binfile_round_trip_and_alignment(tmp_path):
+    p = tmp_path / "x.bin"
+    arr = np.arange(5, dtype="<u8")
+    write_sections(p, b"TESTMAG1", {"n": 5}, [("odd", b"abc"), ("arr", arr.tobytes()), ("empty", b"")])
+    header, sec = read_sections(map_file(p), b"TESTMAG1")
+    assert header["n"] == 5
+    assert bytes(sec["odd"]) == b"abc"
+    assert np.frombuffer(sec["arr"], dtype="<u8").tolist() == arr.tolist()
+    assert bytes(sec["empty"]) == b""
+    assert all(off % 8 == 0 for off, _ in header["sections"].values())
+    with pytest.raises(ValueError):
+        read_sections(p.read_bytes(), b"OTHERMAG")
+
+
+def test_binfile_rewrite_keeps_existing_mapping_valid(tmp_path):
+    p = tmp_path / "x.bin"
+    write_sections(p, b"TESTMAG1", {"v": 1}, [("data", b"old")])
+    mapped = map_file(p)
+    write_sections(p, b"TESTMAG1", {"v": 2}, [("data", b"new!")])
+    assert bytes(read_sections(mapped, b"TESTMAG1")[1]["data"]) == b"old"
+    assert bytes(read_sections(map_file(p), b"TESTMAG1")[1]["data"]) == b"new!"
+    assert [f.name for f in tmp_path.iterdir()] == ["x.bin"]  # no temp files left behind
+
+
+def test_chunk_store_mapping(tmp_path):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    store = ChunkStore.open(build_chunk_store(chunks))
+    assert len(store) == 3
+    assert list(store) == ["b-002", "a-001", "b-010"]  # file order
+    assert store["a-001"] == DOCS[1]
+    assert "b-010" in store and "zzz" not in store and 3 not in store
+    assert store.get("missing") is None
+    assert list(store.values()) == DOCS
+    assert store.book_slugs == ["a", "b"]
+    with pytest.raises(KeyError):
+        store["missing"]
+
+
+def test_open_chunk_store_never_builds(tmp_path):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    assert open_chunk_store(chunks) is None
+    assert not chunk_store_path_for(chunks).exists()
+
+
+def test_stamp_ignores_mtime_but_not_contents(tmp_path):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    build_chunk_store(chunks)
+    os.utime(chunks, ns=(1, 1))  # e.g. a copy or checkout: new mtime, same bytes
+    assert open_chunk_store(chunks) is not None
+    # same size, different bytes
+    chunks.write_text(chunks.read_text(encoding="utf-8").replace("second", "SECOND"), encoding="utf-8")
+    assert open_chunk_store(chunks) is None
+
+
+def test_corrupt_store_is_ignored(tmp_path):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    chunk_store_path_for(chunks).write_bytes(b"not a store")
+    assert open_chunk_store(chunks) is None
+
+
+def test_build_rejects_non_jsonl(tmp_path):
+    bad = tmp_path / "chunks.jsonl"
+    bad.write_text("root:x:0:0:root:/root:/bin/bash\n")
+    with pytest.raises(ValueError, match="line 1"):
+        build_chunk_store(bad)
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(rag_pipeline, "_chunks_cache", type(rag_pipeline._chunks_cache)())
+    monkeypatch.setattr(rag_pipeline, "CHUNK_STORE", "mmap")
+
+
+def test_load_cached_falls_back_to_jsonl(tmp_path, fresh_cache):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    id2doc = rag_pipeline.load_id_to_text_cached(chunks)
+    assert isinstance(id2doc, dict) and id2doc["b-010"] == DOCS[2]
+    assert not chunk_store_path_for(chunks).exists()
+
+
+def test_load_cached_uses_prebuilt_store(tmp_path, fresh_cache):
+    chunks = _write_chunks(tmp_path / "chunks.jsonl")
+    build_chunk_store(chunks)
+    id2doc = rag_pipeline.load_id_to_text_cached(chunks)
+    assert isinstance(id2doc, ChunkStore) and id2doc["b-010"] == DOCS[2]
+
+
+@pytest.mark.parametrize("content", [
+    "root:x:0:0:root:/root:/bin/bash\n",
+    '{"text": "no id"}\n',
+    "[1, 2]\n",
+    b"\xff\xfe\x00garbage\n",
+])
+def test_load_rejects_non_chunk_files(tmp_path, fresh_cache, content):
+    bad = tmp_path / "chunks.jsonl"
+    if isinstance(content, bytes):
+        bad.write_bytes(content)
+    else:
+        bad.write_text(content)
+    with pytest.raises(ValueError, match="not a chunk record"):
+        rag_pipeline.load_id_to_text_cached(bad)
@@ -0,0 +1,192 @@
+# tests/test_deadline.py
+import time
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from src.pipeline.deadline import (
+    DeadlineExceeded, current_deadline, deadline_scope, run_within_deadline, hedged, is_retryable,
+)
+from src.pipeline.rag_pipeline import fuse_candidates
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):  # same name as the openai SDK class
+    pass
+
+
+def test_deadline_scope_is_visible_in_threads_and_reset():
+    async def main():
+        with deadline_scope(5.0) as dl:
+            assert current_deadline() is dl
+            seen = await asyncio.to_thread(current_deadline)
+            assert seen is dl
+            with deadline_scope(0):
+                assert current_deadline() is None
+            assert current_deadline() is dl
+        assert current_deadline() is None
+    asyncio.run(main())
+
+
+def test_run_within_deadline_raises_with_stage():
+    async def main():
+        with deadline_scope(0.05):
+            with pytest.raises(DeadlineExceeded) as ei:
+                await run_within_deadline(asyncio.sleep(1), "llm")
+        assert ei.value.stage == "llm"
+        assert await run_within_deadline(asyncio.sleep(0, result=7), "noop") == 7  # no deadline
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("exc, retryable", [
+    (asyncio.TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (APIConnectionError(), True),
+    (_StatusError(429), True),
+    (_StatusError(503), True),
+    (_StatusError(400), False),
+    (_StatusError(404), False),
+    (ValueError("bad input"), False),
+    (DeadlineExceeded("llm"), False),
+])
+def test_is_retryable(exc, retryable):
+    assert is_retryable(exc) is retryable
+
+
+class _Calls:
+    """Records starts/cancellations of fake calls."""
+
+    def __init__(self):
+        self.started, self.cancelled = [], []
+
+    def make(self, name, delay, result=None, exc=None):
+        async def call():
+            self.started.append(name)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(name)
+                raise
+            if exc is not None:
+                raise exc
+            return result
+        return call
+
+
+def test_hedge_not_started_when_primary_is_fast():
+    calls = _Calls()
+    res = asyncio.run(hedged(calls.make("p", 0.0, "P"), 0.2, calls.make("h", 0.0, "H")))
+    assert res == ("P", "primary")
+    assert calls.started == ["p"]
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    calls = _Calls()
+    res = asyncio.run(hedged(calls.make("p", 1.0, "P"), 0.02, calls.make("h", 0.0, "H")))
+    assert res == ("H", "hedge")
+    assert calls.started == ["p", "h"]
+    assert calls.cancelled == ["p"]
+
+
+def test_non_retryable_failure_is_not_hedged():
+    calls = _Calls()
+    with pytest.raises(_StatusError):
+        asyncio.run(hedged(calls.make("p", 0.0, exc=_StatusError(404)), 0.2, calls.make("h", 0.0, "H")))
+    assert calls.started == ["p"]
+
+
+def test_non_retryable_failure_during_race_cancels_the_other_call():
+    calls = _Calls()
+    with pytest.raises(_StatusError):
+        asyncio.run(hedged(calls.make("p", 1.0, "P"), 0.02, calls.make("h", 0.0, exc=_StatusError(400))))
+    assert calls.cancelled == ["p"]
+
+
+def test_retryable_failure_is_hedged():
+    calls = _Calls()
+    res = asyncio.run(hedged(calls.make("p", 0.0, exc=_StatusError(503)), 0.2, calls.make("h", 0.0, "H")))
+    assert res == ("H", "hedge")
+
+
+def test_caller_cancellation_cancels_both_calls():
+    calls = _Calls()
+
+    async def main():
+        task = asyncio.ensure_future(hedged(calls.make("p", 1.0), 0.01, calls.make("h", 1.0)))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())
+    assert sorted(calls.cancelled) == ["h", "p"]
+
+
+def test_slow_lexical_lookup_does_not_block_the_loop():
+    dense = [{"id": "a", "score": 0.9, "metadata": {}}]
+    pool = ThreadPoolExecutor(1)
+
+    async def main():
+        lexical = pool.submit(time.sleep, 0.5)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.ensure_future(ticker())
+        t0 = time.monotonic()
+        with deadline_scope(0.1):
+            out = await fuse_candidates(dense, lexical, {}, 10)
+        elapsed = time.monotonic() - t0
+        t.cancel()
+        return out, elapsed, ticks
+
+    out, elapsed, ticks = asyncio.run(main())
+    pool.shutdown(wait=True)
+    assert out == dense
+    assert elapsed < 0.4
+    assert ticks >= 3  # the loop kept running while the lookup was pending
+
+
+def test_lexical_hits_are_fused():
+    dense = [{"id": "a", "score": 0.9, "metadata": {}}]
+    lexical = Future()
+    lexical.set_result([("b", 3.0), ("a", 2.0)])
+    out = asyncio.run(fuse_candidates(dense, lexical, {"b": {"id": "b"}}, 10))
+    assert [m["id"] for m in out] == ["a", "b"]
+
+
+def test_hedge_won_calls_do_not_lower_the_hedge_delay(monkeypatch):
+    from src.pipeline import rag_pipeline
+    from src.pipeline.deadline import LatencyWindow
+
+    class _Responses:
+        async def create(self, model, input, timeout, **extra):
+            await asyncio.sleep(1.0 if model == "slow" else 0.005)
+            return SimpleNamespace(id=model, output=[], usage={"input_tokens": 1, "output_tokens": 1})
+
+    window = LatencyWindow(size=20)
+    for _ in range(20):
+        window.add(0.05)
+    monkeypatch.setattr(rag_pipeline, "_llm_latency", window)
+    monkeypatch.setattr(rag_pipeline, "get_openai_client", lambda kind="sync": SimpleNamespace(responses=_Responses()))
+    monkeypatch.setattr(rag_pipeline, "LLM_HEDGE", True)
+    monkeypatch.setattr(rag_pipeline, "LLM_MODEL", "slow")
+    monkeypatch.setattr(rag_pipeline, "LLM_HEDGE_MODEL", "fast")
+    before = rag_pipeline.llm_hedge_delay()
+
+    async def main():
+        for _ in range(20):
+            resp = await rag_pipeline.respond_async("prompt")
+            assert resp.id == "fast"
+    asyncio.run(main())
+    assert rag_pipeline.llm_hedge_delay() >= before
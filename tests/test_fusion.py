@@ -0,0 +1,59 @@
+# tests/test_fusion.py
+import pytest
+
+from src.reranker import get_reranker
+from src.reranker.fusion import reciprocal_rank_fusion
+
+
+def _dense(*pairs):
+    return [{"id": i, "score": s, "metadata": {"book_slug": "b"}} for i, s in pairs]
+
+
+def test_rrf_sums_reciprocal_ranks():
+    dense = _dense(("a", 0.9), ("b", 0.8), ("c", 0.7))
+    lexical = [("c", 12.0), ("d", 9.0)]
+    out = reciprocal_rank_fusion(dense, lexical, k=60)
+    by_id = {e["id"]: e for e in out}
+    assert by_id["a"]["rrf_score"] == pytest.approx(1 / 61)
+    assert by_id["c"]["rrf_score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert by_id["d"]["rrf_score"] == pytest.approx(1 / 62)
+    assert [e["id"] for e in out] == ["c", "a", "b", "d"]
+    assert by_id["c"]["dense_score"] == 0.7 and by_id["c"]["lexical_score"] == 12.0
+    assert by_id["d"]["dense_score"] is None
+
+
+def test_score_follows_the_dense_profile_by_rank():
+    dense = _dense(("a", 0.9), ("b", 0.8))
+    out = reciprocal_rank_fusion(dense, [("b", 3.0), ("x", 2.0)], k=60)
+    assert [e["id"] for e in out] == ["b", "a", "x"]
+    assert [e["score"] for e in out] == [0.9, 0.8, 0.8]
+    assert out[0]["dense_score"] == 0.8
+
+
+def test_hybrid_does_not_shrink_dynamic_reranker_output():
+    # a peaked dense profile plus lexical hits that only partly overlap it
+    dense = _dense(("a", 0.82), ("b", 0.80), ("c", 0.78), ("d", 0.76), ("e", 0.74), ("f", 0.40))
+    lexical = [("c", 9.0), ("x", 8.0), ("y", 7.0), ("a", 6.0)]
+    reranker = get_reranker("dynamic", max_k=8)
+    dense_only = reranker.rerank("q", dense)
+    fused = reranker.rerank("q", reciprocal_rank_fusion(dense, lexical, top_n=10))
+    assert len(dense_only) == 5
+    assert len(fused) == len(dense_only)
+    assert {e["id"] for e in fused} >= {"a", "c", "x"}  # single-retriever hits survive
+
+
+def test_lexical_only_hits_take_metadata_from_chunks():
+    id2doc = {"d": {"id": "d", "book_slug": "b", "page_start": 4, "text": "not copied"}}
+    out = reciprocal_rank_fusion([], [("d", 2.0)], id2doc=id2doc)
+    assert out[0]["metadata"] == {"id": "d", "book_slug": "b", "page_start": 4}
+    assert out[0]["score"] == pytest.approx(1.0)  # no dense hits: top score is 1.0
+
+
+def test_top_n_truncates_after_fusion():
+    dense = _dense(("a", 0.9), ("b", 0.8), ("c", 0.7))
+    out = reciprocal_rank_fusion(dense, [("c", 1.0)], top_n=2)
+    assert [e["id"] for e in out] == ["c", "a"]
+
+
+def test_empty_inputs():
+    assert reciprocal_rank_fusion([], []) == []
@@ -0,0 +1,37 @@
+# tests/test_pinecone_store.py
+import numpy as np
+
+from src.vectorstore import pinecone_store
+from src.vectorstore.pinecone_store import book_scope, query_index
+from src.vectorstore.local_store import LocalIndex
+
+
+def _vec(*xs):
+    v = np.zeros(4, dtype=np.float32)
+    v[: len(xs)] = xs
+    return v.tolist()
+
+
+def test_book_scope_filter_mode(monkeypatch):
+    monkeypatch.setattr(pinecone_store, "BOOK_SCOPE", "filter")
+    assert book_scope(["a"], "ns") == ("ns", {"book_slug": {"$eq": "a"}})
+    assert book_scope(["b", "a", "a", None], "ns") == ("ns", {"book_slug": {"$in": ["a", "b"]}})
+    assert book_scope([], "ns") == ("ns", None)
+
+
+def test_book_scope_namespace_mode(monkeypatch):
+    monkeypatch.setattr(pinecone_store, "BOOK_SCOPE", "namespace")
+    assert book_scope(["a"], "ns") == ("a", None)
+    assert book_scope(["b", "a"], "ns") == (["a", "b"], None)
+
+
+def test_query_index_merges_namespaces_by_score():
+    index = LocalIndex(dim=4)
+    index.upsert([{"id": "a1", "values": _vec(1, 0.1)}, {"id": "a2", "values": _vec(0.2, 1)}], namespace="a")
+    index.upsert([{"id": "b1", "values": _vec(1, 0.3)}, {"id": "b2", "values": _vec(0, 0, 1)}], namespace="b")
+    index.upsert([{"id": "c1", "values": _vec(1)}], namespace="c")
+
+    matches = query_index(index, _vec(1), top_k=3, namespace=["a", "b"])
+    assert [m.id for m in matches] == ["a1", "b1", "a2"]
+    assert all(x.score >= y.score for x, y in zip(matches, matches[1:]))
+    assert [m.id for m in query_index(index, _vec(1), top_k=1, namespace="c")] == ["c1"]
@@ -0,0 +1,100 @@
+# tests/test_quantization.py
+import json
+
+import numpy as np
+import pytest
+
+from src.vectorstore.quantization import QuantizedCodes, QUANTIZATIONS
+from src.vectorstore.local_store import LocalIndex
+
+
+def _unit(n, dim, seed=0):
+    m = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+def test_float16_and_int8_scores_track_exact():
+    m, q = _unit(300, 64), _unit(1, 64, seed=1)[0]
+    exact = m @ q
+    f16 = QuantizedCodes.encode("float16", m)
+    i8 = QuantizedCodes.encode("int8", m)
+    assert np.abs(f16.scores(q) - exact).max() < 1e-2
+    assert np.abs(i8.scores(q) - exact).max() < 5e-2
+    # decoded int8 codes round-trip within one quantization step per dimension
+    assert np.all(np.abs(i8.codes * i8.scale - m) <= i8.scale / 2 + 1e-6)
+
+
+def test_int8_encodes_with_per_dimension_scale():
+    m = np.array([[0.5, -1.0], [-0.25, 0.0]], dtype=np.float32)
+    codes = QuantizedCodes.encode("int8", m)
+    assert codes.codes.dtype == np.int8
+    assert codes.scale.tolist() == pytest.approx([0.5 / 127, 1.0 / 127])
+    assert codes.codes.tolist() == [[127, -127], [-64, 0]]
+
+
+def test_binary_scores_are_negative_hamming():
+    m = np.array([[1, -1, 1, -1], [1, 1, 1, 1]], dtype=np.float32)
+    codes = QuantizedCodes.encode("binary", m)
+    assert codes.codes.shape == (2, 1)
+    assert codes.scores(np.array([1, -1, 1, -1], dtype=np.float32)).tolist() == [0.0, -2.0]
+
+
+def test_scores_on_row_subset():
+    m, q = _unit(50, 16), _unit(1, 16, seed=2)[0]
+    rows = np.array([3, 10, 42])
+    for kind in QUANTIZATIONS:
+        codes = QuantizedCodes.encode(kind, m)
+        assert codes.scores(q, rows) == pytest.approx(codes.scores(q)[rows])
+
+
+def test_nbytes_per_kind():
+    m = _unit(10, 64)
+    assert QuantizedCodes.encode("none", m).nbytes == 10 * 64 * 4
+    assert QuantizedCodes.encode("float16", m).nbytes == 10 * 64 * 2
+    assert QuantizedCodes.encode("int8", m).nbytes == 10 * 64 + 64 * 4
+    assert QuantizedCodes.encode("binary", m).nbytes == 10 * 8
+
+
+def test_unknown_kind_rejected():
+    with pytest.raises(ValueError):
+        QuantizedCodes.encode("int4", _unit(2, 8))
+
+
+@pytest.mark.parametrize("kind", QUANTIZATIONS)
+def test_rescored_query_returns_exact_scores(kind):
+    m, q = _unit(500, 32), _unit(1, 32, seed=3)[0]
+    index = LocalIndex(dim=32, quantization=kind)
+    index.upsert([{"id": f"v{i}", "values": v.tolist(), "metadata": {"n": i}} for i, v in enumerate(m)])
+    res = index.query(vector=q.tolist(), top_k=5, include_metadata=True)
+    exact = np.argsort(-(m @ q))[:5]
+    assert [r.id for r in res.matches][0] == f"v{exact[0]}"
+    for r in res.matches:
+        assert r.score == pytest.approx(float(m[int(r.id[1:])] @ q), abs=1e-5)
+
+
+@pytest.mark.parametrize("kind", ["none", "int8"])
+def test_save_load_round_trip(tmp_path, kind):
+    m, q = _unit(100, 16), _unit(1, 16, seed=4)[0]
+    index = LocalIndex(dim=16, quantization=kind)
+    index.upsert([{"id": f"v{i}", "values": v.tolist(), "metadata": {"book_slug": "b", "n": i}}
+                  for i, v in enumerate(m)], namespace="b")
+    index.save(str(tmp_path / "idx"))
+    for mmap in (True, False):
+        loaded = LocalIndex.load(str(tmp_path / "idx"), mmap=mmap)
+        assert loaded.quantization == kind
+        a = index.query(vector=q.tolist(), top_k=5, namespace="b", filter={"n": {"$lt": 50}}, include_metadata=True)
+        b = loaded.query(vector=q.tolist(), top_k=5, namespace="b", filter={"n": {"$lt": 50}}, include_metadata=True)
+        assert [x.id for x in a.matches] == [x.id for x in b.matches]
+        assert b.matches[0].metadata["book_slug"] == "b"
+
+
+def test_load_old_npz_layout(tmp_path):
+    m = _unit(3, 8)
+    manifest = {"dim": 8, "namespaces": [{"name": "default", "ids": ["a", "b", "c"],
+                                          "metas": [{"n": 0}, {"n": 1}, {"n": 2}]}]}
+    np.savez(tmp_path / "old", m0=m, manifest=np.frombuffer(json.dumps(manifest).encode(), dtype=np.uint8))
+    loaded = LocalIndex.load(str(tmp_path / "old"))  # np.savez appended .npz
+    res = loaded.query(vector=m[1].tolist(), top_k=1, include_metadata=True)
+    assert res.matches[0].id == "b" and res.matches[0].metadata == {"n": 1}
+    loaded.upsert([{"id": "d", "values": m[0].tolist()}])
+    assert loaded.describe_index_stats()["total_vector_count"] == 4
@@ -0,0 +1,99 @@
+# tests/test_rag_batch.py
+import asyncio
+import threading
+
+import pytest
+
+from src.pipeline import rag_pipeline
+
+
+QUESTIONS = [f"question {i}?" for i in range(5)]
+
+
+def _num(q):
+    return int(q.split()[1].rstrip("?"))
+
+
+@pytest.fixture
+def batch(monkeypatch, tmp_path):
+    """rag_batch over fake embeddings/index/LLM; question i retrieves chunk c<i>."""
+    chunks = tmp_path / "chunks.jsonl"
+    chunks.write_text("")
+    id2doc = {f"c{i}": {"text": f"passage {i}", "book_slug": "b"} for i in range(len(QUESTIONS))}
+    calls = {"embed": [], "fail_embed": set(), "fail_query": set(), "fail_llm": set(), "query_hook": None}
+
+    def embed_texts(qs, batch_size):
+        calls["embed"].append([_num(q) for q in qs])
+        if calls["fail_embed"] & {_num(q) for q in qs}:
+            raise RuntimeError("embed down")
+        return [[float(_num(q))] for q in qs]
+
+    def dense_candidates(index, emb, *args):
+        i = int(emb[0])
+        if calls["query_hook"]:
+            calls["query_hook"](i)
+        if i in calls["fail_query"]:
+            raise RuntimeError("query down")
+        return [{"id": f"c{i}", "score": 0.9, "metadata": {"book_slug": "b", "page_start": i, "page_end": i, "chunk_index": 0}}]
+
+    async def respond_async(prompt, **kwargs):
+        i = next(i for i in range(len(QUESTIONS)) if QUESTIONS[i] in prompt)
+        if i in calls["fail_llm"]:
+            raise RuntimeError("llm down")
+        return {"output_text": f"answer {i}"}
+
+    monkeypatch.setattr(rag_pipeline, "DEFAULT_BATCH", 2)
+    monkeypatch.setattr(rag_pipeline, "load_id_to_text_cached", lambda path: id2doc)
+    monkeypatch.setattr(rag_pipeline, "embed_texts", embed_texts)
+    monkeypatch.setattr(rag_pipeline, "get_vector_index", lambda: object())
+    monkeypatch.setattr(rag_pipeline, "dense_candidates", dense_candidates)
+    monkeypatch.setattr(rag_pipeline, "respond_async", respond_async)
+    return str(chunks), calls
+
+
+def test_every_question_answered_once_in_its_slot(batch):
+    path, calls = batch
+    out = rag_pipeline.answer_questions(path, QUESTIONS, reranker="none", hybrid=False)
+    assert [r["index"] for r in out] == list(range(len(QUESTIONS)))
+    assert [r["question"] for r in out] == QUESTIONS
+    assert [r["answer"] for r in out] == [f"answer {i}" for i in range(len(QUESTIONS))]
+    assert [r["sources"][0]["id"] for r in out] == [f"c{i}" for i in range(len(QUESTIONS))]
+    assert calls["embed"] == [[0, 1], [2, 3], [4]]
+
+
+def test_failures_stay_with_their_own_questions(batch):
+    path, calls = batch
+    calls["fail_embed"] = {2}  # fails the whole second wave (2, 3)
+    calls["fail_query"] = {0}
+    calls["fail_llm"] = {4}
+    out = rag_pipeline.answer_questions(path, QUESTIONS, reranker="none", hybrid=False)
+    assert [r["index"] for r in out] == list(range(len(QUESTIONS)))
+    assert out[0]["error"].startswith("Pinecone query failed")
+    assert out[1]["answer"] == "answer 1"
+    assert out[2]["error"].startswith("embedding failed") and out[3]["error"].startswith("embedding failed")
+    assert out[4]["error"].startswith("LLM call failed") and out[4]["sources"][0]["id"] == "c4"
+
+
+def test_first_answer_streams_before_later_waves_are_retrieved(batch):
+    path, calls = batch
+    first_out = threading.Event()
+    waited = []
+
+    def hold_later_waves(i):
+        if i >= 2:
+            waited.append(first_out.wait(timeout=5))
+
+    calls["query_hook"] = hold_later_waves
+
+    async def run():
+        seen = []
+        async for item in rag_pipeline.rag_batch(path, QUESTIONS, reranker="none", hybrid=False):
+            if not seen:
+                first_out.set()
+            seen.append(item)
+        return seen
+
+    seen = asyncio.run(run())
+    assert seen[0]["index"] in (0, 1)
+    assert waited and all(waited)
+    assert sorted(r["index"] for r in seen) == list(range(len(QUESTIONS)))
@@ -0,0 +1,53 @@
+# tests/test_warmup.py
+import asyncio
+import threading
+
+import pytest
+
+from src.api import warmup
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(warmup, "_state", {"status": "pending", "steps": {}, "seconds": None, "ready_after_s": None})
+
+
+def _status(app_module):
+    return app_module.readyz().status_code
+
+
+def test_readyz_is_503_until_warmup_finishes(monkeypatch, fresh_state):
+    from src.api import app as app_module
+    release = threading.Event()
+
+    def slow():
+        release.wait(timeout=5)
+
+    monkeypatch.setattr(warmup, "STEPS", {"slow": slow})
+
+    async def run():
+        seen = [_status(app_module)]
+        task = asyncio.create_task(warmup.run_warmup(["slow"]))
+        await asyncio.sleep(0.05)
+        seen.append(_status(app_module))
+        release.set()
+        await task
+        seen.append(_status(app_module))
+        return seen
+
+    assert asyncio.run(run()) == [503, 503, 200]
+    assert warmup._state["steps"]["slow"]["ok"] is True
+
+
+def test_failed_step_blocks_readiness_only_when_strict(monkeypatch, fresh_state):
+    from src.api import app as app_module
+
+    def boom():
+        raise RuntimeError("index down")
+
+    monkeypatch.setattr(warmup, "STEPS", {"index": boom})
+    asyncio.run(warmup.run_warmup(["index"]))
+    assert warmup._state["status"] == "failed"
+    assert _status(app_module) == 200
+    monkeypatch.setattr(warmup, "WARMUP_STRICT", True)
+    assert _status(app_module) == 503